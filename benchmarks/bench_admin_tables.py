@@ -0,0 +1,144 @@
+"""/admin/tables 통계 집계 벤치마크
+
+임시 SQLite 파일에 주문 데이터를 채운 뒤, 테이블별 반복 쿼리(기존 방식)와
+집합 기반 집계(get_table_order_stats)의 쿼리 수와 소요 시간을 비교합니다.
+(기존 방식은 HAVING 집계로 조리 완료 여부를 계산하므로 두 결과가 같아야 합니다)
+
+    python benchmarks/bench_admin_tables.py [주문 수 ...]   # 기본값: 10000 100000
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+_scratch = tempfile.TemporaryDirectory()
+os.environ.setdefault("DATABASE_PATH", os.path.join(_scratch.name, "app.db"))
+
+from sqlalchemy import create_engine, event, func, case, insert
+from sqlalchemy.orm import sessionmaker
+
+import main
+from main import Order, OrderItem, MenuItem, TABLE_IDS, get_kst_now, get_kst_today_start, get_table_order_stats
+
+
+def seed(session, order_count: int):
+    """무작위 주문/주문 아이템 데이터 생성"""
+    main.init_menu_data(session)
+    menu = session.query(MenuItem).all()
+    rng = random.Random(42)
+    now = get_kst_now()
+    orders, items = [], []
+    for order_id in range(1, order_count + 1):
+        status = rng.choices(["pending", "confirmed", "cancelled"], weights=[1, 8, 1])[0]
+        created_at = now - timedelta(minutes=rng.randint(0, 60 * 24 * 7))
+        orders.append({
+            "id": order_id,
+            "table_id": rng.choice(TABLE_IDS),
+            "menu": {},
+            "amount": rng.randint(1, 20) * 1000,
+            "payment_status": status,
+            "is_cancelled": status == "cancelled",
+            "created_at": created_at,
+            "confirmed_at": created_at if status == "confirmed" else None,
+        })
+        for menu_item in rng.sample(menu, 3):
+            items.append({
+                "order_id": order_id,
+                "menu_item_id": menu_item.id,
+                "quantity": 1,
+                "cooking_status": rng.choice(["pending", "cooking", "completed", "completed"]),
+            })
+    session.execute(insert(Order), orders)
+    session.execute(insert(OrderItem), items)
+    main.backfill_kitchen_progress(session.connection())
+    session.commit()
+
+
+def legacy_table_stats(db, table_ids):
+    """기존 /admin/tables 구현 (테이블마다 7개의 쿼리)"""
+    completed_having = (
+        (func.count(case(((OrderItem.menu_item_id.isnot(None)) & (MenuItem.category != "table"), 1), else_=None)) == 0) |
+        (func.count(case(((OrderItem.menu_item_id.isnot(None)) & (MenuItem.category != "table"), 1), else_=None)) ==
+         func.sum(case(((OrderItem.menu_item_id.isnot(None)) & (MenuItem.category != "table") & (OrderItem.cooking_status == "completed"), 1), else_=0)))
+    )
+    latest = db.query(
+        Order.table_id,
+        func.max(Order.created_at).label('latest_order_time'),
+        func.count(Order.id).label('total_orders')
+    ).group_by(Order.table_id).subquery()
+    stats = {}
+    for table_id in table_ids:
+        info = db.query(latest).filter(latest.c.table_id == table_id).first()
+        confirmed = db.query(Order).filter(
+            Order.table_id == table_id, Order.payment_status == "confirmed", Order.is_cancelled == False
+        )
+        stats[table_id] = {
+            'table_id': table_id,
+            'latest_order_time': info.latest_order_time if info else None,
+            'total_orders': info.total_orders if info else 0,
+            'pending_count': db.query(Order).filter(
+                Order.table_id == table_id, Order.payment_status == "pending", Order.is_cancelled == False
+            ).count(),
+            'cooking_count': confirmed.join(OrderItem).join(MenuItem).filter(
+                OrderItem.cooking_status.in_(["pending", "cooking"]), MenuItem.category != "table"
+            ).distinct().count(),
+            'completed_total': confirmed.outerjoin(OrderItem).outerjoin(MenuItem).group_by(Order.id).having(completed_having).count(),
+            'completed_today': confirmed.filter(Order.confirmed_at >= get_kst_today_start()).outerjoin(OrderItem).outerjoin(MenuItem).group_by(Order.id).having(completed_having).count(),
+            'cancelled_count': db.query(Order).filter(Order.table_id == table_id, Order.is_cancelled == True).count(),
+            'total_amount': db.query(func.sum(Order.amount)).filter(
+                Order.table_id == table_id, Order.payment_status == "confirmed", Order.is_cancelled == False
+            ).scalar() or 0,
+        }
+    return stats
+
+
+def measure(engine, session, func_, repeat=3):
+    """쿼리 수와 최소 소요 시간(ms) 측정"""
+    counter = {"queries": 0}
+
+    def before_cursor_execute(*args):
+        counter["queries"] += 1
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        best = None
+        result = None
+        for _ in range(repeat):
+            counter["queries"] = 0
+            started = time.perf_counter()
+            result = func_(session, TABLE_IDS)
+            elapsed = (time.perf_counter() - started) * 1000
+            best = elapsed if best is None else min(best, elapsed)
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return counter["queries"], best, result
+
+
+def run(order_count: int):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        engine = create_engine(f"sqlite:///{os.path.join(temp_dir, 'bench.db')}")
+        main.Base.metadata.create_all(bind=engine)
+        main.run_migrations(engine)
+        session = sessionmaker(bind=engine)()
+        try:
+            seed(session, order_count)
+            legacy_queries, legacy_ms, legacy = measure(engine, session, legacy_table_stats)
+            queries, ms, current = measure(engine, session, get_table_order_stats)
+            assert legacy == current, "집계 결과가 기존 구현과 다릅니다"
+        finally:
+            session.close()
+            engine.dispose()
+    print(f"{order_count:>8} orders | legacy: {legacy_queries:>4} queries {legacy_ms:>9.1f} ms"
+          f" | aggregate: {queries:>2} queries {ms:>8.1f} ms | x{legacy_ms / ms:.1f}")
+
+
+if __name__ == "__main__":
+    counts = [int(arg) for arg in sys.argv[1:]] or [10000, 100000]
+    for count in counts:
+        run(count)
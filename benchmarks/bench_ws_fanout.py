@@ -0,0 +1,93 @@
+"""WebSocket 브로드캐스트 팬아웃 벤치마크
+
+빠른 클라이언트 여러 개와 느린 클라이언트(전송마다 지연) 몇 개를 흉내 낸 소켓에
+메시지를 연속으로 브로드캐스트하고, 빠른 클라이언트가 모든 메시지를 받기까지의
+시간을 기존 순차 전송 방식과 비교합니다.
+
+    python benchmarks/bench_ws_fanout.py [빠른 수] [느린 수] [메시지 수]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+_scratch = tempfile.TemporaryDirectory()
+os.environ.setdefault("DATABASE_PATH", os.path.join(_scratch.name, "app.db"))
+
+import main
+
+SLOW_SEND_SECONDS = 0.2
+BROADCAST_INTERVAL_SECONDS = 0.001  # 실제로는 요청마다 따로 브로드캐스트됨
+
+
+class FakeWebSocket:
+    def __init__(self, delay, expected):
+        self.delay = delay
+        self.expected = expected
+        self.received = 0
+        self.done = asyncio.Event()
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, message):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.received += 1
+        if self.received == self.expected:
+            self.done.set()
+
+    async def close(self, code=1000, reason=None):
+        pass
+
+
+async def legacy_broadcast(sockets, message):
+    """변경 전 방식: 한 소켓씩 순서대로 await"""
+    for websocket in sockets:
+        await websocket.send_text(message)
+
+
+async def run_legacy(fast, slow, messages):
+    sockets = [FakeWebSocket(0, messages) for _ in range(fast)] + [FakeWebSocket(SLOW_SEND_SECONDS, messages) for _ in range(slow)]
+    started = time.perf_counter()
+    for n in range(messages):
+        await legacy_broadcast(sockets, f"message {n}")
+        await asyncio.sleep(BROADCAST_INTERVAL_SECONDS)
+    await asyncio.gather(*(websocket.done.wait() for websocket in sockets[:fast]))
+    return time.perf_counter() - started, None
+
+
+async def run_queued(fast, slow, messages):
+    manager = main.ConnectionManager()
+    sockets = [FakeWebSocket(0, messages) for _ in range(fast)] + [FakeWebSocket(SLOW_SEND_SECONDS, messages) for _ in range(slow)]
+    for table_id, websocket in enumerate(sockets, start=1):
+        await manager.connect(websocket, table_id)
+    started = time.perf_counter()
+    for n in range(messages):
+        await manager.broadcast_to_all(f"message {n}")
+        await asyncio.sleep(BROADCAST_INTERVAL_SECONDS)
+    await asyncio.wait_for(asyncio.gather(*(websocket.done.wait() for websocket in sockets[:fast])), 60)
+    elapsed = time.perf_counter() - started
+    metrics = manager.get_broadcast_metrics()
+    for table_id, websocket in enumerate(sockets, start=1):
+        manager.disconnect(websocket, table_id)
+    return elapsed, metrics
+
+
+def main_bench(fast=50, slow=2, messages=20):
+    print(f"{fast} fast + {slow} slow ({SLOW_SEND_SECONDS * 1000:.0f}ms/send) consumers, {messages} messages, queue size {main.WS_SEND_QUEUE_SIZE}")
+    legacy, _ = asyncio.run(run_legacy(fast, slow, messages))
+    queued, metrics = asyncio.run(run_queued(fast, slow, messages))
+    print(f"sequential send_text : fast consumers done in {legacy * 1000:8.1f} ms")
+    print(f"per-connection queues: fast consumers done in {queued * 1000:8.1f} ms")
+    print(f"metrics: {metrics}")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:4]]
+    main_bench(*args)
@@ -0,0 +1,142 @@
+"""프로세스 간 백플레인 검사
+
+같은 임시 DB를 쓰는 uvicorn 프로세스 두 개를 BACKPLANE=sqlite로 동시에 띄우고,
+한 프로세스에 연결된 WebSocket이 다른 프로세스에서 발생한 이벤트와 접속 상태,
+메뉴 변경을 받는지 확인합니다. 프로세스 간 전달 지연도 함께 출력합니다.
+
+    python benchmarks/check_backplane.py
+"""
+import base64
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+from websockets.sync.client import connect
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+AUTH = ("admin", os.getenv("ADMIN_PASSWORD", "your-secure-password"))
+ADMIN_HEADERS = {"Authorization": "Basic " + base64.b64encode(":".join(AUTH).encode()).decode()}
+PORTS = (18101, 18102)
+TIMEOUT_SECONDS = 5
+
+
+def start_workers(scratch):
+    env = dict(os.environ, BACKPLANE="sqlite", DATABASE_PATH=os.path.join(scratch, "app.db"))
+    workers = [
+        subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        for port in PORTS
+    ]
+    deadline = time.monotonic() + 30
+    for port in PORTS:
+        while True:
+            try:
+                httpx.get(f"http://127.0.0.1:{port}/ws-test").raise_for_status()
+                break
+            except httpx.HTTPError:
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"worker on port {port} did not start")
+                time.sleep(0.2)
+    return workers
+
+
+def open_socket(port, table_id, channels, headers=None):
+    websocket = connect(f"ws://127.0.0.1:{port}/ws/{table_id}", additional_headers=headers)
+    websocket.send(json.dumps({"type": "subscribe", "channels": channels}))
+    reply = json.loads(websocket.recv(TIMEOUT_SECONDS))
+    assert reply["type"] == "subscribed" and not reply["rejected"], reply
+    return websocket
+
+
+def receive_type(websocket, event_type):
+    deadline = time.monotonic() + TIMEOUT_SECONDS
+    while True:
+        event = json.loads(websocket.recv(max(deadline - time.monotonic(), 0.01)))
+        if event.get("type") == event_type:
+            return event
+
+
+def wait_until(predicate):
+    deadline = time.monotonic() + TIMEOUT_SECONDS
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.1)
+    return True
+
+
+def check():
+    a, b = (f"http://127.0.0.1:{port}" for port in PORTS)
+    failures = []
+    with tempfile.TemporaryDirectory() as scratch:
+        workers = start_workers(scratch)
+        try:
+            menu_ids = list(httpx.get(f"{a}/api/menu-data").json()["menu_items"])
+            if len(menu_ids) != len(set(menu_ids)) or not menu_ids:
+                failures.append("initial menu was not created exactly once")
+
+            kitchen = open_socket(PORTS[0], 0, ["kitchen"], ADMIN_HEADERS)
+            guest = open_socket(PORTS[1], 7, ["chat.global", "menu"])
+
+            latencies = []
+            for _ in range(20):
+                started = time.perf_counter()
+                httpx.post(f"{b}/submit_order", data={"table_id": 7, "menu": json.dumps({menu_ids[4]: 1})})
+                receive_type(kitchen, "new_order")
+                latencies.append(time.perf_counter() - started)
+            latencies.sort()
+            print(f"order on B -> kitchen socket on A: median {latencies[len(latencies) // 2] * 1000:.1f} ms, max {latencies[-1] * 1000:.1f} ms")
+
+            httpx.post(f"{a}/chat/send", data={"table_id": 3, "message": "안녕하세요", "nickname": "셋째"})
+            if receive_type(guest, "chat_message")["nickname"] != "셋째":
+                failures.append("chat message from A did not reach guest on B")
+
+            def online_on_a():
+                return {table["table_id"]: table["nickname"] for table in httpx.get(f"{a}/chat/online-tables").json()["online_tables"]}
+
+            if not wait_until(lambda: 7 in online_on_a()):
+                failures.append("table 7 connected to B is not online on A")
+            if not wait_until(lambda: httpx.get(f"{b}/api/menu-data").status_code == 200):
+                failures.append("B stopped answering")
+
+            httpx.post(f"{a}/chat/send", data={"table_id": 7, "message": "닉네임", "nickname": "일곱째"})
+            if not wait_until(lambda: online_on_a().get(7) == "일곱째"):
+                failures.append("nickname set on A is not visible for table 7")
+
+            # 메뉴 삭제는 이미지 파일도 지우므로, 기본 메뉴 대신 이미지 없는 메뉴를 만들어 삭제
+            httpx.post(f"{a}/admin/menu/add", auth=AUTH, data={
+                "name_kr": "백플레인 확인용", "name_en": "backplane_check", "price": 1000, "category": "drinks"
+            })
+            receive_type(guest, "menu_updated")
+            removed_id = next(
+                item_id for item_id, name in httpx.get(f"{a}/api/menu-data").json()["menu_names"].items()
+                if name == "백플레인 확인용"
+            )
+            httpx.post(f"{a}/admin/menu/delete/{removed_id}", auth=AUTH)
+            receive_type(guest, "menu_updated")
+            if not wait_until(lambda: removed_id not in httpx.get(f"{b}/api/menu-data").json()["menu_items"]):
+                failures.append("menu change on A did not refresh B's menu cache")
+
+            guest.close()
+            if not wait_until(lambda: 7 not in online_on_a()):
+                failures.append("table 7 still online on A after disconnecting from B")
+            kitchen.close()
+        finally:
+            for worker in workers:
+                worker.terminate()
+                worker.wait()
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    print("backplane OK" if not failures else f"{len(failures)} failures")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(check())
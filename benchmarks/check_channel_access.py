@@ -0,0 +1,79 @@
+"""WebSocket 채널 구독 권한 검사
+
+임시 DB로 앱을 띄우고 인증 없는 /ws/0, 관리자 인증(Basic 인증 또는 보드 토큰)을 거친 /ws/0,
+손님 테이블 소켓이 각 채널을 구독할 수 있는지 확인합니다.
+
+- 인증 없는 /ws/0은 주방/관리자 보드와 테이블/주문 채널을 구독할 수 없는지
+- 관리자 소켓은 모든 채널을 구독할 수 있는지
+- 손님은 자기 테이블과 자기 주문 채널만 구독할 수 있는지
+
+    python benchmarks/check_channel_access.py
+"""
+import base64
+import json
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+_scratch = tempfile.TemporaryDirectory()
+os.environ["DATABASE_PATH"] = os.path.join(_scratch.name, "orders.db")
+os.environ.setdefault("METRICS_PORT", "0")
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+AUTH = ("admin", os.getenv("ADMIN_PASSWORD", "your-secure-password"))
+ADMIN_HEADERS = {"authorization": "Basic " + base64.b64encode(":".join(AUTH).encode()).decode()}
+WRONG_HEADERS = {"authorization": "Basic " + base64.b64encode(b"admin:wrong").decode()}
+
+STAFF = ["kitchen", "admin.orders", "admin.waiting", "admin.tables"]
+PUBLIC = ["chat.global", "menu", "presence"]
+
+
+def main_check():
+    from fastapi.testclient import TestClient
+
+    import main
+
+    failures = []
+    with TestClient(main.app) as client:
+        menu_id = next(iter(client.get("/api/menu-data").json()["menu_items"]))
+        for table_id in (3, 5):
+            client.post("/submit_order", data={"table_id": table_id, "menu": json.dumps({menu_id: 1})})
+        own_order, other_order = "order.1", "order.2"
+
+        def subscribe(path, channels, headers=None):
+            with client.websocket_connect(path, headers={"upgrade": "websocket", **(headers or {})}) as websocket:
+                websocket.send_text(json.dumps({"type": "subscribe", "channels": channels}))
+                while True:
+                    reply = json.loads(websocket.receive_text())
+                    if reply.get("type") == "subscribed":
+                        return set(reply["rejected"])
+
+        channels = STAFF + PUBLIC + ["table.3", own_order, other_order]
+        cases = [
+            ("/ws/0 without credentials", "/ws/0", None, STAFF + ["table.3", own_order, other_order]),
+            ("/ws/0 with wrong password", "/ws/0", WRONG_HEADERS, STAFF + ["table.3", own_order, other_order]),
+            ("/ws/0 with wrong token", "/ws/0?token=0", None, STAFF + ["table.3", own_order, other_order]),
+            ("/ws/0 with basic auth", "/ws/0", ADMIN_HEADERS, []),
+            ("/ws/0 with board token", f"/ws/0?token={main.admin_socket_token()}", None, []),
+            ("/ws/3 guest", "/ws/3", None, STAFF + [other_order]),
+            ("/ws/5 guest", "/ws/5", None, STAFF + ["table.3", own_order]),
+            ("/ws/3 guest with basic auth", "/ws/3", ADMIN_HEADERS, STAFF + [other_order]),
+        ]
+        for name, path, headers, expected in cases:
+            rejected = subscribe(path, channels, headers)
+            print(f"{name:32} rejected {sorted(rejected)}")
+            if rejected != set(expected):
+                failures.append(f"{name}: rejected {sorted(rejected)}, expected {sorted(expected)}")
+
+    for failure in failures:
+        print("FAILED:", failure)
+    print(f"{len(cases)} sockets checked, {len(failures)} problems")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_check())
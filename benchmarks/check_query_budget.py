@@ -0,0 +1,94 @@
+"""페이지별 쿼리 수 상한 검사
+
+임시 SQLite 파일에 주문을 충분히 쌓은 뒤 주방/관리자 화면을 렌더링하면서 실행된
+SQL 문 수를 셉니다. 템플릿의 지연 로딩(N+1)이 다시 생기면 주문 수에 비례해 쿼리가
+늘어나므로 상한을 넘고 실패합니다.
+
+    python benchmarks/check_query_budget.py [주문 수]
+"""
+import json
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+_scratch = tempfile.TemporaryDirectory()
+os.environ.setdefault("DATABASE_PATH", os.path.join(_scratch.name, "app.db"))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+import main
+
+AUTH = ("admin", os.getenv("ADMIN_PASSWORD", "your-secure-password"))
+
+# 페이지별 허용 쿼리 수 (주문 수와 무관해야 함)
+QUERY_BUDGETS = {
+    "/order?table=1": 0,
+    "/kitchen": 5,
+    "/admin/orders": 4,
+    "/admin/tables": 1,
+    "/admin/table/1": 2,
+    "/admin/table/1?status=cooking": 2,
+    "/admin/table/1?status=completed": 2,
+    "/admin/waiting": 3,
+    # 보드 재연결 시의 스냅샷은 페이지와 같은 조회를 사용
+    "/admin/board/state?board=kitchen": 5,
+    "/admin/board/state?board=admin.orders": 4,
+    "/admin/board/state?board=admin.tables": 1,
+    "/admin/board/state?board=admin.waiting": 3,
+    # 최근 채팅은 메모리 캐시에서 응답
+    "/chat/3": 0,
+    "/chat/messages?table_id=3": 0,
+    "/chat/messages?table_id=3&after_id=100": 0,
+}
+
+
+def seed(client, order_count):
+    """세트 메뉴를 포함한 주문과 채팅을 만들고 일부 주문은 결제 확인/조리/취소 처리"""
+    menu = client.get("/api/menu-data").json()["menu_items"]
+    set_ids = [item_id for item_id, item in menu.items() if item["category"] == "set_menu"]
+    dish_ids = [item_id for item_id, item in menu.items() if item["category"] == "main_dishes"]
+    for n in range(order_count):
+        order_menu = {set_ids[n % len(set_ids)]: 1, dish_ids[n % len(dish_ids)]: 2}
+        client.post("/submit_order", data={"table_id": n % 10 + 1, "menu": json.dumps(order_menu)})
+    for n in range(order_count):
+        client.post("/chat/send", data={"table_id": n % 10 + 1, "message": "안녕하세요"})
+        client.post("/chat/send", data={"table_id": n % 10 + 1, "message": "귓속말", "target_table_id": 3})
+    for order_id in range(1, order_count + 1, 2):
+        client.post(f"/admin/orders/confirm/{order_id}", auth=AUTH, follow_redirects=False)
+    for order_id in range(1, order_count + 1, 6):
+        client.post(f"/kitchen/update-status/{order_id}", data={"status": "completed"}, auth=AUTH, follow_redirects=False)
+    for order_id in range(3, order_count + 1, 10):
+        client.post(f"/admin/orders/cancel/{order_id}", auth=AUTH, follow_redirects=False)
+
+
+def check(order_count=60):
+    failures = 0
+    with TestClient(main.app) as client:
+        seed(client, order_count)
+        counter = {"queries": 0}
+
+        def count(*args):
+            counter["queries"] += 1
+
+        event.listen(main.engine, "before_cursor_execute", count)
+        try:
+            for path, budget in QUERY_BUDGETS.items():
+                counter["queries"] = 0
+                response = client.get(path, auth=AUTH)
+                response.raise_for_status()
+                status = "ok" if counter["queries"] <= budget else "OVER BUDGET"
+                if counter["queries"] > budget:
+                    failures += 1
+                print(f"{path:<40} {counter['queries']:>4} queries (budget {budget:>2}) {status}")
+        finally:
+            event.remove(main.engine, "before_cursor_execute", count)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(check(int(sys.argv[1]) if len(sys.argv) > 1 else 60))
@@ -0,0 +1,110 @@
+"""핫 경로 쿼리의 EXPLAIN QUERY PLAN 회귀 검사
+
+임시 SQLite 파일로 앱을 띄워 주문/주방/채팅/웨이팅 화면을 한 번씩 요청하고,
+그 과정에서 실행된 SELECT 문마다 EXPLAIN QUERY PLAN을 실행합니다.
+인덱스 없이 전체 테이블을 훑는(SCAN <table>) 계획이 큰 테이블에서 나오면 실패합니다.
+
+    python benchmarks/check_query_plans.py [-v]
+"""
+import json
+import os
+import re
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+_scratch = tempfile.TemporaryDirectory()
+os.environ.setdefault("DATABASE_PATH", os.path.join(_scratch.name, "app.db"))
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+import main
+
+# 주문이 쌓일수록 커지는 테이블 (메뉴처럼 작은 테이블은 전체 스캔을 허용)
+LARGE_TABLES = {"orders", "order_items", "chat_messages", "waiting"}
+FULL_SCAN = re.compile(r"^SCAN (\w+)(?! USING)")
+AUTH = ("admin", os.getenv("ADMIN_PASSWORD", "your-secure-password"))
+
+
+def exercise(client):
+    """핫 경로 요청을 한 바퀴 실행"""
+    menu_ids = list(client.get("/api/menu-data").json()["menu_items"])
+    for table_id in range(1, 21):
+        client.post("/submit_order", data={"table_id": table_id, "menu": json.dumps({menu_ids[1]: 1, menu_ids[4]: 2})})
+        client.post("/chat/send", data={"table_id": table_id, "message": "안녕하세요"})
+        client.post("/chat/send", data={"table_id": table_id, "message": "귓속말", "target_table_id": table_id % 20 + 1})
+        client.post("/waiting/add", data={"name": f"손님{table_id}", "phone": f"010-0000-{table_id:04d}", "party_size": 2})
+    # 대기 중 주문이 전체의 일부일 때의 플랜을 보도록 대부분은 결제 확인 처리
+    for order_id in range(1, 18):
+        client.post(f"/admin/orders/confirm/{order_id}", auth=AUTH, follow_redirects=False)
+    client.post("/kitchen/update-item-status/3", data={"status": "cooking"}, auth=AUTH, follow_redirects=False)
+    client.post("/kitchen/update-item-status/3", data={"status": "completed"}, auth=AUTH, follow_redirects=False)
+    client.post("/kitchen/update-status/2", data={"status": "completed"}, auth=AUTH, follow_redirects=False)
+    client.post("/kitchen/cancel-item/6", data={"reason": "품절"}, auth=AUTH, follow_redirects=False)
+    client.post("/admin/orders/cancel/12", auth=AUTH, follow_redirects=False)
+    client.post("/admin/waiting/call/1", auth=AUTH)
+    client.post("/admin/waiting/seat/1", data={"table_id": 3}, auth=AUTH)
+    client.post("/update_payment_status", json={"table_id": 3, "status": "pending"})
+
+    with main.engine.connect() as connection:
+        connection.exec_driver_sql("ANALYZE")
+
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(main.engine, "before_cursor_execute", capture)
+    try:
+        client.get("/order?table=3")
+        client.get("/admin/orders", auth=AUTH)
+        client.get("/admin/tables", auth=AUTH)
+        client.get("/kitchen", auth=AUTH)
+        for status in ("", "?status=cooking", "?status=completed", "?status=pending"):
+            client.get(f"/admin/table/3{status}", auth=AUTH)
+        client.get("/admin/waiting", auth=AUTH)
+        client.get("/chat/3")
+        client.get("/chat/messages?table_id=3")
+        client.get("/chat/messages?table_id=3&after_id=5")
+        client.get("/chat/messages?before_id=30")
+        client.post("/waiting/add", data={"name": "검사", "phone": "010-9999-9999", "party_size": 2})
+        client.post("/update_payment_status", json={"table_id": 4, "status": "pending"})
+    finally:
+        event.remove(main.engine, "before_cursor_execute", capture)
+    return statements
+
+
+def main_check(verbose=False):
+    failures = []
+    seen = set()
+    with TestClient(main.app) as client:
+        statements = exercise(client)
+        raw = main.engine.raw_connection()
+        try:
+            cursor = raw.cursor()
+            for statement, parameters in statements:
+                if statement in seen:
+                    continue
+                seen.add(statement)
+                plan = [row[3] for row in cursor.execute(f"EXPLAIN QUERY PLAN {statement}", parameters)]
+                scans = [line for line in plan if (m := FULL_SCAN.match(line)) and m.group(1) in LARGE_TABLES]
+                if verbose or scans:
+                    print(" ".join(statement.split())[:160])
+                    for line in plan:
+                        print(f"    {line}")
+                if scans:
+                    failures.append((statement, scans))
+        finally:
+            raw.close()
+
+    print(f"{len(seen)} distinct SELECT statements checked, {len(failures)} with full table scans")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_check(verbose="-v" in sys.argv))
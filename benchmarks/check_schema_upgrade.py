@@ -0,0 +1,156 @@
+"""기존 orders.db 업그레이드 검사
+
+마이그레이션이 생기기 전 버전의 스키마로 만든 임시 SQLite 파일에 주문/메뉴/채팅/웨이팅 데이터를 넣고,
+그 파일로 앱을 띄워 모든 마이그레이션이 순서대로 적용되는지 확인합니다.
+
+- 적용된 마이그레이션 버전이 SCHEMA_MIGRATIONS 전체와 같은지
+- 모델에 정의된 컬럼과 인덱스가 모두 DB에 있는지
+- 기존 주문의 주방 진행 카운터와 세트 구성이 채워졌는지
+- 주요 화면이 기존 데이터로 정상 응답하는지
+
+    python benchmarks/check_schema_upgrade.py
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+_scratch = tempfile.TemporaryDirectory()
+DATABASE_PATH = os.path.join(_scratch.name, "orders.db")
+os.environ["DATABASE_PATH"] = DATABASE_PATH
+os.environ.setdefault("METRICS_PORT", "0")
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+AUTH = ("admin", os.getenv("ADMIN_PASSWORD", "your-secure-password"))
+
+# 마이그레이션 도입 전 create_all이 만들던 스키마
+BASELINE_SCHEMA = """
+CREATE TABLE orders (
+    id INTEGER NOT NULL, table_id INTEGER, menu JSON, amount INTEGER, payment_status VARCHAR,
+    is_cancelled BOOLEAN, cancelled_at DATETIME, cancellation_reason VARCHAR, created_at DATETIME,
+    confirmed_at DATETIME, PRIMARY KEY (id)
+);
+CREATE INDEX ix_orders_id ON orders (id);
+CREATE TABLE chat_messages (
+    id INTEGER NOT NULL, table_id INTEGER, message VARCHAR, nickname VARCHAR, is_global BOOLEAN,
+    target_table_id INTEGER, created_at DATETIME, PRIMARY KEY (id)
+);
+CREATE INDEX ix_chat_messages_id ON chat_messages (id);
+CREATE INDEX ix_chat_messages_table_id ON chat_messages (table_id);
+CREATE TABLE menu_items (
+    id INTEGER NOT NULL, name_kr VARCHAR, name_en VARCHAR, price INTEGER, category VARCHAR,
+    description VARCHAR, image_filename VARCHAR, is_active BOOLEAN, created_at DATETIME,
+    updated_at DATETIME, PRIMARY KEY (id)
+);
+CREATE INDEX ix_menu_items_id ON menu_items (id);
+CREATE UNIQUE INDEX ix_menu_items_name_en ON menu_items (name_en);
+CREATE UNIQUE INDEX ix_menu_items_name_kr ON menu_items (name_kr);
+CREATE TABLE waiting (
+    id INTEGER NOT NULL, name VARCHAR NOT NULL, phone VARCHAR NOT NULL, party_size INTEGER NOT NULL,
+    status VARCHAR, notes TEXT, created_at DATETIME, called_at DATETIME, seated_at DATETIME,
+    cancelled_at DATETIME, table_id INTEGER, PRIMARY KEY (id)
+);
+CREATE INDEX ix_waiting_id ON waiting (id);
+CREATE TABLE order_items (
+    id INTEGER NOT NULL, order_id INTEGER, menu_item_id INTEGER, quantity INTEGER, cooking_status VARCHAR,
+    is_set_component BOOLEAN, parent_set_name VARCHAR, notes TEXT, started_at DATETIME,
+    completed_at DATETIME, cancelled_at DATETIME, cancellation_reason VARCHAR, PRIMARY KEY (id),
+    FOREIGN KEY(order_id) REFERENCES orders (id), FOREIGN KEY(menu_item_id) REFERENCES menu_items (id)
+);
+CREATE INDEX ix_order_items_id ON order_items (id);
+"""
+
+BASELINE_DATA = """
+INSERT INTO menu_items VALUES
+    (1, '상차림비(인당)', 'table', 6000, 'table', NULL, NULL, 1, '2025-05-01 18:00:00', NULL),
+    (2, '🌟 두근두근 2인 세트', '🌟 2-person set', 35000, 'set_menu', NULL, NULL, 1, '2025-05-01 18:00:00', NULL),
+    (3, '숲속 삼겹살', 'pork belly', 15000, 'main_dishes', NULL, NULL, 1, '2025-05-01 18:00:00', NULL),
+    (4, '셰프 프랭클린의 두부김치', 'tofu kimchi', 12000, 'main_dishes', NULL, NULL, 1, '2025-05-01 18:00:00', NULL),
+    (5, '숲속 바람 사이다', 'cider', 2000, 'drinks', NULL, NULL, 1, '2025-05-01 18:00:00', NULL);
+INSERT INTO orders VALUES
+    (1, 3, '{"3": 1, "1": 2}', 27000, 'confirmed', 0, NULL, NULL, '2025-05-01 19:00:00', '2025-05-01 19:01:00'),
+    (2, 5, '{"4": 1}', 12000, 'confirmed', 0, NULL, NULL, '2025-05-01 19:05:00', '2025-05-01 19:06:00'),
+    (3, 7, '{"5": 1}', 2000, 'pending', 0, NULL, NULL, '2025-05-01 19:10:00', NULL);
+INSERT INTO order_items VALUES
+    (1, 1, 3, 1, 'cooking', 0, NULL, NULL, '2025-05-01 19:02:00', NULL, NULL, NULL),
+    (2, 1, 1, 2, 'completed', 0, NULL, NULL, NULL, '2025-05-01 19:00:00', NULL, NULL),
+    (3, 2, 4, 1, 'completed', 0, NULL, NULL, '2025-05-01 19:07:00', '2025-05-01 19:15:00', NULL, NULL),
+    (4, 3, 5, 1, 'pending', 0, NULL, NULL, NULL, NULL, NULL, NULL);
+INSERT INTO chat_messages VALUES (1, 3, '안녕하세요', '테이블3', 1, NULL, '2025-05-01 19:03:00');
+INSERT INTO waiting VALUES (1, '손님', '010-0000-0001', 2, 'waiting', NULL, '2025-05-01 19:20:00', NULL, NULL, NULL, NULL);
+"""
+
+# 기존 주문의 주방 진행 카운터 (주문 ID: 상태, 남은 수, 완료 수), 상차림비는 세지 않음
+EXPECTED_KITCHEN_PROGRESS = {1: ("cooking", 1, 0), 2: ("completed", 0, 1), 3: ("cooking", 1, 0)}
+
+
+def create_baseline_db():
+    connection = sqlite3.connect(DATABASE_PATH)
+    try:
+        connection.executescript(BASELINE_SCHEMA + BASELINE_DATA)
+    finally:
+        connection.close()
+
+
+def main_check():
+    create_baseline_db()
+
+    # 앱을 불러오는 시점에 테이블 생성과 마이그레이션이 실행됨
+    from fastapi.testclient import TestClient
+    from sqlalchemy import inspect, select
+
+    import main
+
+    failures = []
+    with main.engine.connect() as connection:
+        applied = set(connection.execute(select(main.SchemaMigration.version)).scalars())
+        expected = {version for version, _, _ in main.SCHEMA_MIGRATIONS}
+        if applied != expected:
+            failures.append(f"applied migrations {sorted(applied)}, expected {sorted(expected)}")
+
+        inspector = inspect(connection)
+        for table in main.Base.metadata.sorted_tables:
+            columns = {column["name"] for column in inspector.get_columns(table.name)}
+            indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for column in table.columns:
+                if column.name not in columns:
+                    failures.append(f"missing column {table.name}.{column.name}")
+            for index in table.indexes:
+                if index.name not in indexes:
+                    failures.append(f"missing index {index.name}")
+
+        progress = {
+            order_id: (status, remaining, completed)
+            for order_id, status, remaining, completed in connection.exec_driver_sql(
+                "SELECT id, kitchen_status, kitchen_remaining_count, kitchen_completed_count FROM orders"
+            )
+        }
+        if progress != EXPECTED_KITCHEN_PROGRESS:
+            failures.append(f"kitchen progress {progress}, expected {EXPECTED_KITCHEN_PROGRESS}")
+
+        components = connection.exec_driver_sql(
+            "SELECT count(*) FROM set_menu_components WHERE set_menu_id = 2"
+        ).scalar()
+        if not components:
+            failures.append("set menu components were not seeded")
+
+    with TestClient(main.app) as client:
+        for path in ("/order?table=3", "/kitchen", "/admin/orders", "/admin/tables", "/admin/table/3",
+                     "/admin/waiting", "/admin/menu", "/chat/messages?table_id=3"):
+            response = client.get(path, auth=AUTH)
+            print(f"{path:40} {response.status_code}")
+            if response.status_code != 200:
+                failures.append(f"{path} returned {response.status_code}")
+
+    for failure in failures:
+        print("FAILED:", failure)
+    print(f"{len(main.SCHEMA_MIGRATIONS)} migrations applied to a baseline database, {len(failures)} problems")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_check())
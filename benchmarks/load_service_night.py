@@ -0,0 +1,235 @@
+"""영업 시간 부하 테스트
+
+앱을 같은 프로세스에서 임시 SQLite 파일로 띄우고, 영업 중의 요청을 동시에 흉내 냅니다.
+
+- 손님: 테이블마다 /order 로딩, 세트 메뉴를 포함한 주문, 채팅 읽기/보내기, 접속 목록
+- 관리자: 주문 관리 화면과 보드 상태를 읽고 결제 대기 주문을 확인, 테이블 현황 조회
+- 주방: 주방 화면과 보드 상태를 읽고 아이템을 조리 중 -> 완료로 변경
+- 웨이팅: /waiting/add 등록과 웨이팅 관리 화면 조회
+
+엔드포인트별 p50/p95/p99 응답 시간과 처리량을 출력하고, 저장된 기준값
+(benchmarks/service_night_baseline.json)이 있으면 비교합니다. 기준값은 측정한
+머신에 따라 다르므로 같은 머신에서 --save-baseline으로 다시 저장한 뒤 비교하세요.
+
+    pip install -r benchmarks/requirements.txt   # httpx
+    python benchmarks/load_service_night.py [--tables 50] [--rounds 4] [--seed 1]
+    python benchmarks/load_service_night.py --save-baseline
+    python benchmarks/load_service_night.py --check [--tolerance 0.25]   # p95가 기준보다 25% 넘게 느리면 실패
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)
+
+_scratch = tempfile.TemporaryDirectory()
+os.environ.setdefault("DATABASE_PATH", os.path.join(_scratch.name, "app.db"))
+os.environ.setdefault("METRICS_PORT", "0")
+os.environ.setdefault("LOG_LEVEL", "ERROR")
+
+import httpx
+
+import main
+
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "service_night_baseline.json")
+AUTH = ("admin", os.getenv("ADMIN_PASSWORD", "your-secure-password"))
+MIN_CHECK_SAMPLES = 100  # --check에서 비교할 최소 요청 수
+CHAT_LINES = ["안녕하세요", "여기 맛있어요", "건배!", "몇 번 테이블이세요?", "오늘 사람 많네요"]
+
+
+class Recorder:
+    """엔드포인트 이름별 응답 시간과 오류 수"""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+
+    async def request(self, client, name, method, url, **kwargs):
+        started = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        self.latencies.setdefault(name, []).append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            self.errors[name] = self.errors.get(name, 0) + 1
+        return response
+
+
+async def guest(client, recorder, rng, table_id, rounds, menu):
+    """한 테이블의 손님: 방문마다 메뉴를 보고 주문한 뒤 채팅"""
+    set_ids = [item_id for item_id, item in menu.items() if item["category"] == "set_menu"]
+    other_ids = [item_id for item_id, item in menu.items() if item["category"] not in ("set_menu", "table")]
+    for _ in range(rounds):
+        await recorder.request(client, "GET /order", "GET", f"/order?table={table_id}")
+        order = {item_id: rng.randint(1, 2) for item_id in rng.sample(other_ids, rng.randint(1, 3))}
+        if rng.random() < 0.5:
+            order[rng.choice(set_ids)] = 1
+        await recorder.request(client, "POST /submit_order", "POST", "/submit_order",
+                               data={"table_id": table_id, "menu": json.dumps(order)})
+        await recorder.request(client, "GET /chat/messages", "GET", f"/chat/messages?table_id={table_id}")
+        for _ in range(rng.randint(1, 3)):
+            data = {"table_id": table_id, "message": rng.choice(CHAT_LINES)}
+            if rng.random() < 0.2:
+                data["target_table_id"] = rng.randint(1, len(main.TABLE_IDS))
+            await recorder.request(client, "POST /chat/send", "POST", "/chat/send", data=data)
+        await recorder.request(client, "GET /chat/online-tables", "GET", "/chat/online-tables")
+
+
+def board_keys(state, section, prefix):
+    return [int(row["key"][len(prefix):]) for row in state["snapshot"]["sections"][section]]
+
+
+async def admin(client, recorder, done):
+    """관리자: 결제 대기 주문을 확인 (손님이 모두 끝나면 남은 주문까지 확인하고 종료)"""
+    while True:
+        finished = done.is_set()
+        await recorder.request(client, "GET /admin/orders", "GET", "/admin/orders", auth=AUTH)
+        response = await recorder.request(client, "GET /admin/board/state?board=admin.orders", "GET",
+                                          "/admin/board/state?board=admin.orders", auth=AUTH)
+        pending = board_keys(response.json(), "pending", "order-")
+        for order_id in pending[:5]:
+            await recorder.request(client, "POST /admin/orders/confirm/{order_id}", "POST",
+                                   f"/admin/orders/confirm/{order_id}", auth=AUTH)
+        await recorder.request(client, "GET /admin/tables", "GET", "/admin/tables", auth=AUTH)
+        if finished and not pending:
+            return
+        await asyncio.sleep(0.01)
+
+
+async def kitchen(client, recorder, done):
+    """주방: 대기 아이템은 조리 중으로, 조리 중인 아이템은 완료로"""
+    started = set()
+    while True:
+        finished = done.is_set()
+        await recorder.request(client, "GET /kitchen", "GET", "/kitchen", auth=AUTH)
+        response = await recorder.request(client, "GET /admin/board/state?board=kitchen", "GET",
+                                          "/admin/board/state?board=kitchen", auth=AUTH)
+        items = board_keys(response.json(), "cooking", "item-")
+        for item_id in items[:8]:
+            status = "completed" if item_id in started else "cooking"
+            started.add(item_id)
+            await recorder.request(client, "POST /kitchen/update-item-status/{item_id}", "POST",
+                                   f"/kitchen/update-item-status/{item_id}", data={"status": status}, auth=AUTH)
+        if finished and not items:
+            return
+        await asyncio.sleep(0.01)
+
+
+async def waiting(client, recorder, rng, count):
+    """웨이팅: 입구 태블릿의 등록과 관리 화면 조회"""
+    for n in range(count):
+        await recorder.request(client, "POST /waiting/add", "POST", "/waiting/add", data={
+            "name": f"손님{n}", "phone": f"010-{n // 10000:04d}-{n % 10000:04d}", "party_size": rng.randint(1, 6),
+        })
+        if n % 5 == 0:
+            await recorder.request(client, "GET /admin/waiting", "GET", "/admin/waiting", auth=AUTH)
+        await asyncio.sleep(0.005)
+
+
+async def run(tables, rounds, seed):
+    await main.app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://testserver") as client:
+            menu = (await client.get("/api/menu-data")).json()["menu_items"]
+            recorder = Recorder()
+            done = asyncio.Event()
+            rng = random.Random(seed)
+            guests = [
+                guest(client, recorder, random.Random(rng.random()), table_id, rounds, menu)
+                for table_id in main.TABLE_IDS[:tables]
+            ]
+            staff = [
+                asyncio.create_task(admin(client, recorder, done)),
+                asyncio.create_task(kitchen(client, recorder, done)),
+                asyncio.create_task(waiting(client, recorder, random.Random(rng.random()), tables * rounds // 2)),
+            ]
+            started = time.perf_counter()
+            await asyncio.gather(*guests)
+            done.set()
+            await asyncio.gather(*staff)
+            return recorder, time.perf_counter() - started
+    finally:
+        await main.app.router.shutdown()
+
+
+def percentile(sorted_values, p):
+    """최근접 순위 백분위수"""
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+def summarize(recorder, elapsed):
+    results = {}
+    for name, latencies in sorted(recorder.latencies.items()):
+        values = sorted(latencies)
+        results[name] = {
+            "count": len(values),
+            "errors": recorder.errors.get(name, 0),
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+            "rps": round(len(values) / elapsed, 1),
+        }
+    return results
+
+
+def report(results, elapsed, baseline):
+    total = sum(result["count"] for result in results.values())
+    print(f"{total} requests in {elapsed:.2f}s ({total / elapsed:.1f} req/s)")
+    print(f"{'endpoint':48} {'count':>6} {'err':>4} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>7}  vs baseline p95")
+    for name, result in results.items():
+        line = (f"{name:48} {result['count']:6} {result['errors']:4} {result['p50_ms']:8.2f} "
+                f"{result['p95_ms']:8.2f} {result['p99_ms']:8.2f} {result['rps']:7.1f}")
+        base = baseline.get(name) if baseline else None
+        if base and base["p95_ms"]:
+            line += f"  {(result['p95_ms'] - base['p95_ms']) / base['p95_ms']:+.0%}"
+        print(line)
+
+
+def regressions(results, baseline, tolerance):
+    """기준값보다 p95가 tolerance를 넘게 느려진 엔드포인트 (표본이 적은 엔드포인트는 편차가 커서 제외)"""
+    return [
+        name for name, result in results.items()
+        if name in baseline and result["count"] >= MIN_CHECK_SAMPLES
+        and result["p95_ms"] > baseline[name]["p95_ms"] * (1 + tolerance)
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="영업 시간 부하 테스트")
+    parser.add_argument("--tables", type=int, default=50)
+    parser.add_argument("--rounds", type=int, default=4, help="테이블당 방문(주문) 수")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--save-baseline", action="store_true", help="이번 결과를 기준값으로 저장")
+    parser.add_argument("--check", action="store_true", help="기준값보다 느려졌거나 오류가 있으면 종료 코드 1")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    recorder, elapsed = asyncio.run(run(args.tables, args.rounds, args.seed))
+    results = summarize(recorder, elapsed)
+
+    baseline = None
+    if os.path.exists(BASELINE_PATH) and not args.save_baseline:
+        with open(BASELINE_PATH, encoding="utf-8") as f:
+            baseline = json.load(f)["endpoints"]
+    report(results, elapsed, baseline)
+
+    if args.save_baseline:
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump({"tables": args.tables, "rounds": args.rounds, "seed": args.seed, "endpoints": results},
+                      f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"baseline saved to {os.path.relpath(BASELINE_PATH, ROOT)}")
+
+    failed = [name for name, result in results.items() if result["errors"]]
+    if args.check and baseline:
+        failed += regressions(results, baseline, args.tolerance)
+    if failed:
+        print("FAILED:", ", ".join(sorted(set(failed))))
+    sys.exit(1 if args.check and failed else 0)
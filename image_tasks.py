@@ -0,0 +1,117 @@
+"""이미지 처리 풀에서 실행하는 작업 (QR 코드 렌더링, 메뉴 이미지 변환, 정적 자산 압축)
+
+main은 이 모듈을 불러온 직후(스레드를 만들기 전)에 풀의 워커를 fork하므로, 워커가 실행하는 함수는
+모두 여기에 있어야 합니다. main에 정의된 함수는 fork 시점의 워커에는 아직 없습니다.
+"""
+import gzip
+import hashlib
+import os
+from io import BytesIO
+from typing import List, Tuple
+
+import qrcode
+from PIL import Image, ImageOps
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+def write_file_atomic(path: str, data: bytes):
+    """임시 파일에 쓴 뒤 교체 (다른 워커 프로세스가 같은 파일을 동시에 써도 깨진 파일이 보이지 않음)"""
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+def compress_static_asset(path: str, encodings: List[Tuple[str, str]]) -> List[str]:
+    """자산의 압축 사본을 만들고 실제로 쓸 인코딩 목록 반환 (이미지 처리 풀에서 실행)
+
+    압축해도 10% 넘게 줄지 않으면 사본을 만들지 않습니다.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    available = []
+    for encoding, suffix in encodings:
+        if not os.path.exists(path + suffix):
+            if encoding == "br":
+                compressed = brotli.compress(data, quality=11)
+            else:
+                compressed = gzip.compress(data, compresslevel=9, mtime=0)
+            if len(compressed) > len(data) * 0.9:
+                continue
+            write_file_atomic(path + suffix, compressed)
+        available.append(encoding)
+    return available
+
+def render_qr_png(url: str, box_size: int) -> bytes:
+    """QR 코드 PNG를 렌더링 (프로세스 풀에서 실행)"""
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=box_size,
+        border=4,
+    )
+    qr.add_data(url)
+    qr.make(fit=True)
+
+    buffer = BytesIO()
+    qr.make_image(fill_color="black", back_color="white").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+# 메뉴 이미지 변형 폭과 품질
+MENU_IMAGE_WIDTHS = (320, 640, 960)
+MENU_IMAGE_WEBP_QUALITY = 80
+MENU_IMAGE_JPEG_QUALITY = 82
+
+def menu_image_widths(original_width: int) -> List[int]:
+    """원본 폭에 맞는 변형 폭 (원본보다 크게 늘리지 않음)"""
+    widths = [width for width in MENU_IMAGE_WIDTHS if width < original_width]
+    if original_width <= MENU_IMAGE_WIDTHS[-1]:
+        widths.append(original_width)
+    return widths
+
+def process_menu_image(data: bytes, directory: str) -> Tuple[str, List[int]]:
+    """이미지를 폭별 WebP/JPEG로 저장하고 (가장 큰 JPEG 파일명, 폭 목록) 반환 (이미지 처리 풀에서 실행)
+
+    이미 같은 내용의 변형이 모두 있으면 다시 인코딩하지 않습니다.
+    """
+    digest = hashlib.sha256(data).hexdigest()[:16]
+    image = Image.open(BytesIO(data))  # 여기까지는 헤더만 읽음
+    # EXIF 방향이 5~8이면 90도 회전되어 가로/세로가 바뀜
+    rotated = image.getexif().get(0x0112, 1) in (5, 6, 7, 8)
+    widths = menu_image_widths(image.height if rotated else image.width)
+    missing = [
+        width for width in widths
+        if not all(os.path.exists(os.path.join(directory, f"{digest}-{width}.{extension}")) for extension in ("webp", "jpg"))
+    ]
+    if missing:
+        image = ImageOps.exif_transpose(image)
+
+    for width in missing:
+        webp_path = os.path.join(directory, f"{digest}-{width}.webp")
+        jpeg_path = os.path.join(directory, f"{digest}-{width}.jpg")
+        has_alpha = image.mode in ("RGBA", "LA", "PA") or "transparency" in image.info
+        resized = image.convert("RGBA" if has_alpha else "RGB")
+        if width != image.width:
+            resized = resized.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+
+        buffer = BytesIO()
+        resized.save(buffer, format="WEBP", quality=MENU_IMAGE_WEBP_QUALITY, method=4)
+        write_file_atomic(webp_path, buffer.getvalue())
+
+        if has_alpha:
+            # JPEG는 투명도가 없으므로 흰 배경에 합성
+            background = Image.new("RGB", resized.size, "white")
+            background.paste(resized, mask=resized.getchannel("A"))
+            resized = background
+        buffer = BytesIO()
+        resized.save(buffer, format="JPEG", quality=MENU_IMAGE_JPEG_QUALITY, optimize=True, progressive=True)
+        write_file_atomic(jpeg_path, buffer.getvalue())
+
+    return f"{digest}-{widths[-1]}.jpg", widths
+
+def process_menu_image_file(path: str, directory: str) -> Tuple[str, List[int]]:
+    """파일로 있는 이미지를 변환 (큰 원본을 프로세스 사이로 넘기지 않도록 자식 프로세스에서 읽음)"""
+    with open(path, "rb") as f:
+        return process_menu_image(f.read(), directory)
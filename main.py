@@ -1,17 +1,20 @@
 from fastapi import FastAPI, Request, Form, Depends, HTTPException, status, UploadFile, File
-from fastapi.responses import HTMLResponse, RedirectResponse, FileResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, FileResponse, StreamingResponse, Response
 from fastapi.templating import Jinja2Templates
 from fastapi.staticfiles import StaticFiles
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, JSON, Boolean, ForeignKey, Text, func, case
+from sqlalchemy import create_engine, event, inspect, select, insert, update, delete, Column, Integer, String, Float, DateTime, JSON, Boolean, ForeignKey, Text, Index, func, case
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, Session, relationship
+from sqlalchemy.orm import sessionmaker, Session, relationship, contains_eager, selectinload
 from datetime import datetime
 import json
 import os
-import qrcode
-from io import BytesIO
+from PIL import Image, UnidentifiedImageError
 import base64
+import hmac
 import secrets
 import shutil
 from typing import Optional, List, Dict, Tuple, Any
@@ -22,6 +25,136 @@ import datetime as dt # Import datetime as dt to avoid conflict if datetime was
 from pydantic import BaseModel
 from pytz import timezone
 import time
+import threading
+import asyncio
+import contextvars
+import contextlib
+import socket
+import functools
+import uvicorn
+import bisect
+import heapq
+import logging
+import logging.handlers
+import queue
+import sys
+import atexit
+import hashlib
+import mimetypes
+import re
+import multiprocessing
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from dataclasses import dataclass
+from collections import deque
+
+from image_tasks import (
+    brotli, write_file_atomic, compress_static_asset, render_qr_png, process_menu_image, process_menu_image_file
+)
+
+# 이미지 처리 프로세스 풀 (QR 코드 렌더링, 메뉴 이미지 변환, 정적 자산 압축)
+# PIL 작업은 GIL을 잡으므로 이벤트 루프나 DB 스레드가 아닌 별도 프로세스에서 실행합니다.
+# 로그/DB 스레드가 생긴 뒤에 fork하면 다른 스레드가 잡고 있던 잠금이 복사되어 자식이 멈출 수 있으므로
+# 스레드를 만들기 전인 지금 워커를 모두 fork해 둡니다. fork 풀은 첫 작업을 받을 때 워커를 한꺼번에 만들고
+# 그 뒤로는 새로 만들지 않으므로 빈 작업 하나를 넣습니다.
+# (spawn/forkserver는 자식이 실행 스크립트와 main을 다시 불러와 DB 초기화까지 반복함)
+# 자식은 fork 시점에 이미 불러온 image_tasks의 함수만 실행하고, 요청 처리를 밀어내지 않도록 우선순위를 낮춤
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "2"))
+IMAGE_WORKER_NICE = 10
+image_executor = ProcessPoolExecutor(
+    max_workers=IMAGE_WORKERS,
+    mp_context=multiprocessing.get_context("fork"),
+    initializer=os.nice,
+    initargs=(IMAGE_WORKER_NICE,)
+)
+image_executor.submit(os.getpid)
+
+# 로깅 설정
+# 로그 레코드는 큐에만 넣고, 포맷과 출력은 QueueListener 스레드가 처리 (요청/이벤트 루프에서 stdout을 기다리지 않음)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")  # 하위 시스템별 레벨 (예: "ws=DEBUG,backplane=WARNING")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")  # text | json
+LOG_SAMPLE_EVERY = int(os.getenv("LOG_SAMPLE_EVERY", "100"))  # 고빈도 로그는 같은 메시지 N개 중 하나만 출력
+
+SAMPLED = {"sample_every": LOG_SAMPLE_EVERY}  # 고빈도 로그 호출에 extra=SAMPLED로 전달
+
+class JsonLogFormatter(logging.Formatter):
+    """한 줄에 JSON 객체 하나씩 출력 (로그 수집기용)"""
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+class SamplingFilter(logging.Filter):
+    """extra={"sample_every": N}가 붙은 로그는 (로거, 메시지)별로 N개 중 첫 번째만 통과"""
+    def __init__(self):
+        super().__init__()
+        self.counts: Dict[Tuple[str, str], int] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        every = getattr(record, "sample_every", 1)
+        if every <= 1:
+            return True
+        key = (record.name, str(record.msg))
+        count = self.counts.get(key, 0)
+        self.counts[key] = count + 1
+        if count % every:
+            return False
+        record.msg = f"{record.msg} (sampled 1/{every})"
+        return True
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """레코드를 포맷하지 않고 그대로 큐에 넣음 (포맷은 리스너 스레드에서)"""
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+def setup_logging() -> Optional[logging.handlers.QueueListener]:
+    """app.* 로거를 큐 핸들러에 연결하고 출력 스레드를 시작"""
+    app_logger = logging.getLogger("app")
+    if app_logger.handlers:
+        return None
+    app_logger.setLevel(LOG_LEVEL)
+    app_logger.propagate = False
+    for entry in LOG_LEVELS.split(","):
+        name, _, level = entry.partition("=")
+        if name.strip() and level.strip():
+            logging.getLogger(f"app.{name.strip()}").setLevel(level.strip().upper())
+
+    output = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == "json":
+        output.setFormatter(JsonLogFormatter())
+    else:
+        output.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    log_queue = queue.SimpleQueue()
+    handler = DeferredQueueHandler(log_queue)
+    handler.addFilter(SamplingFilter())
+    app_logger.addHandler(handler)
+
+    listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+log_listener = setup_logging()
+
+# 하위 시스템별 로거 (LOG_LEVELS의 이름과 같음)
+db_log = logging.getLogger("app.db")
+orders_log = logging.getLogger("app.orders")
+menu_log = logging.getLogger("app.menu")
+waiting_log = logging.getLogger("app.waiting")
+board_log = logging.getLogger("app.board")
+ws_log = logging.getLogger("app.ws")
+chat_log = logging.getLogger("app.chat")
+backplane_log = logging.getLogger("app.backplane")
+metrics_log = logging.getLogger("app.metrics")
+static_log = logging.getLogger("app.static")
 
 # FastAPI 앱 생성
 app = FastAPI()
@@ -33,6 +166,7 @@ class OnlineTableInfo(BaseModel):
 
 class OnlineTablesResponse(BaseModel):
     online_tables: List[OnlineTableInfo]
+    version: int = 0  # 접속 상태 버전 (WebSocket presence 이벤트의 version과 같음)
 
 class GiftOrderRequest(BaseModel):
     from_table_id: int
@@ -72,9 +206,181 @@ def to_kst_filter(dt):
     
     return dt.strftime("%Y-%m-%d %H:%M") # KST format
 
+# 정적 자산 빌드
+# static 아래의 자산(css/js/images/fonts/sounds, favicon)을 시작할 때 내용 해시를 붙인 이름으로
+# static/dist에 복사하고 manifest.json에 원래 경로 -> 해시 경로를 기록합니다.
+# 템플릿은 static_url('css/style.css')로 해시 주소를 쓰며, 해시 주소는 내용이 바뀌면 주소도 바뀌므로
+# 1년짜리 immutable 캐시로 응답합니다. 압축할 만한 자산은 gzip(과 brotli 모듈이 있으면 brotli) 사본을
+# 백그라운드로 미리 만들어 두고 Accept-Encoding에 맞춰 그대로 보냅니다.
+STATIC_DIR = "static"
+STATIC_BUILD_DIR = os.path.join(STATIC_DIR, "dist")
+STATIC_ASSET_PATHS = ("css", "js", "images", "fonts", "sounds", "favicon.ico")
+STATIC_COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".svg", ".ttf", ".otf", ".ico", ".json", ".txt"}
+STATIC_COMPRESS_MIN_BYTES = 1024
+STATIC_IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+STATIC_CSS_URL_PATTERN = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+# 내용 해시 이름으로 저장되는 메뉴 이미지 변형 ({해시}-{폭}.webp|jpg)도 immutable로 응답
+STATIC_HASHED_UPLOAD_PATTERN = re.compile(r"^uploads/[0-9a-f]{16}-\d+\.(webp|jpg)$")
+
+def static_encodings() -> List[Tuple[str, str]]:
+    """미리 만들 압축 사본 (인코딩, 파일 접미사), 선호 순서"""
+    encodings = [("gzip", ".gz")]
+    if brotli is not None:
+        encodings.insert(0, ("br", ".br"))
+    return encodings
+
+class StaticAssets:
+    """정적 자산 매니페스트 (원래 경로 -> static 기준 해시 경로)와 자산별 압축 사본 목록"""
+
+    def __init__(self, directory: str, build_directory: str):
+        self.directory = directory
+        self.build_directory = build_directory
+        self.manifest: Dict[str, str] = {}
+        self.encodings: Dict[str, List[str]] = {}  # 해시 경로: 사용할 수 있는 압축 인코딩
+
+    def _sources(self) -> List[str]:
+        sources = []
+        for name in STATIC_ASSET_PATHS:
+            path = os.path.join(self.directory, name)
+            if os.path.isfile(path):
+                sources.append(name)
+            for root, _, files in os.walk(path):
+                for filename in files:
+                    sources.append(os.path.relpath(os.path.join(root, filename), self.directory).replace(os.sep, "/"))
+        # CSS는 다른 자산의 해시 주소로 url()을 바꾼 뒤 해시를 계산해야 하므로 마지막에
+        return sorted(sources, key=lambda source: (source.endswith(".css"), source))
+
+    @staticmethod
+    def _rewrite_css(source: str, data: bytes, manifest: Dict[str, str]) -> bytes:
+        """CSS의 상대 url()을 해시 경로로 교체 (static/dist 안에서도 같은 상대 위치가 되도록)"""
+        base = os.path.dirname(source)
+
+        def replace(match):
+            quote, url = match.group(1), match.group(2)
+            if url.startswith(("data:", "http:", "https:", "/", "#")):
+                return match.group(0)
+            path, _, suffix = url.partition("?")
+            target = os.path.normpath(os.path.join(base, path)).replace(os.sep, "/")
+            hashed = manifest.get(target)
+            if hashed is None:
+                return match.group(0)
+            relative = os.path.relpath(hashed, os.path.dirname(f"dist/{source}")).replace(os.sep, "/")
+            return f"url({quote}{relative}{quote})"
+
+        return STATIC_CSS_URL_PATTERN.sub(replace, data.decode("utf-8")).encode("utf-8")
+
+    def build(self):
+        """해시 이름 사본과 manifest.json 생성 (이미 있는 사본은 그대로 둠)"""
+        manifest = {}
+        encodings = {}
+        for source in self._sources():
+            with open(os.path.join(self.directory, source), "rb") as f:
+                data = f.read()
+            if source.endswith(".css"):
+                data = self._rewrite_css(source, data, manifest)
+            stem, extension = os.path.splitext(source)
+            hashed = f"dist/{stem}.{hashlib.sha256(data).hexdigest()[:10]}{extension}"
+            target = os.path.join(self.directory, hashed)
+            if not os.path.exists(target):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                write_file_atomic(target, data)
+            manifest[source] = hashed
+            encodings[hashed] = [
+                encoding for encoding, suffix in static_encodings() if os.path.exists(target + suffix)
+            ]
+
+        os.makedirs(self.build_directory, exist_ok=True)
+        write_file_atomic(
+            os.path.join(self.build_directory, "manifest.json"),
+            json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8")
+        )
+        self.manifest = manifest
+        self.encodings = encodings
+        static_log.info("Static assets built: %d files", len(manifest))
+
+    def pending_compression(self) -> List[str]:
+        """압축 사본을 아직 만들지 않은 해시 경로"""
+        wanted = len(static_encodings())
+        return [
+            hashed for hashed, available in self.encodings.items()
+            if len(available) < wanted
+            and os.path.splitext(hashed)[1] in STATIC_COMPRESSIBLE_EXTENSIONS
+            and os.path.getsize(os.path.join(self.directory, hashed)) >= STATIC_COMPRESS_MIN_BYTES
+        ]
+
+    def url(self, path: str) -> str:
+        """자산의 해시 주소 (매니페스트에 없으면 원래 주소)"""
+        return f"/static/{self.manifest.get(path, path)}"
+
+static_assets = StaticAssets(STATIC_DIR, STATIC_BUILD_DIR)
+
+def accepted_encodings(header: str) -> set:
+    """Accept-Encoding 헤더에서 받을 수 있는 인코딩 (q=0은 제외)"""
+    accepted = set()
+    for part in header.split(","):
+        encoding, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        if encoding:
+            accepted.add(encoding.strip().lower())
+    return accepted
+
+class AssetStaticFiles(StaticFiles):
+    """/static 서빙: 해시 주소는 immutable 캐시와 미리 압축한 사본으로, 그 외는 매번 재검증"""
+
+    async def get_response(self, path: str, scope) -> Response:
+        immutable = path in static_assets.encodings or STATIC_HASHED_UPLOAD_PATTERN.match(path) is not None
+        if not immutable:
+            response = await super().get_response(path, scope)
+            response.headers.setdefault("Cache-Control", "no-cache")
+            return response
+
+        available = static_assets.encodings.get(path, [])
+        if available:
+            accepted = accepted_encodings(dict(scope["headers"]).get(b"accept-encoding", b"").decode("latin-1"))
+            for encoding, suffix in static_encodings():
+                if encoding in available and encoding in accepted:
+                    full_path, stat_result = self.lookup_path(path + suffix)
+                    if stat_result is None:
+                        break
+                    response = FileResponse(
+                        full_path,
+                        stat_result=stat_result,
+                        method=scope["method"],
+                        media_type=guess_media_type(path),
+                        headers={"Content-Encoding": encoding}
+                    )
+                    break
+            else:
+                response = await super().get_response(path, scope)
+            response.headers["Vary"] = "Accept-Encoding"
+        else:
+            response = await super().get_response(path, scope)
+        response.headers["Cache-Control"] = STATIC_IMMUTABLE_CACHE_CONTROL
+        return response
+
+def guess_media_type(path: str) -> str:
+    return mimetypes.guess_type(path)[0] or "application/octet-stream"
+
+async def precompress_static_assets():
+    """압축 사본이 없는 자산을 이미지 처리 풀에서 압축 (시작할 때 백그라운드로 한 번)"""
+    loop = asyncio.get_running_loop()
+    encodings = static_encodings()
+    try:
+        pending = static_assets.pending_compression()
+        for hashed in pending:
+            static_assets.encodings[hashed] = await loop.run_in_executor(
+                image_executor, compress_static_asset, os.path.join(STATIC_DIR, hashed), encodings
+            )
+        if pending:
+            static_log.info("Precompressed %d static assets", len(pending))
+    except Exception:
+        static_log.exception("Static asset precompression failed")
+
 # 정적 파일과 템플릿 설정
-app.mount("/static", StaticFiles(directory="static"), name="static")
+app.mount("/static", AssetStaticFiles(directory=STATIC_DIR), name="static")
 templates = Jinja2Templates(directory="templates")
+templates.env.globals["static_url"] = static_assets.url
 
 # 커스텀 Jinja2 필터 추가
 def format_currency(value):
@@ -127,6 +433,43 @@ templates.env.filters["format_currency"] = format_currency
 templates.env.filters["kst"] = to_kst_filter # Register the new KST filter
 templates.env.filters["simplify_menu"] = simplify_menu_name # Register the menu simplifier filter
 
+def sort_key_filter(value):
+    """보드 행 정렬용 숫자 키 (날짜는 초 단위, 없으면 0)"""
+    if value is None:
+        return 0
+    if isinstance(value, datetime):
+        return (value.replace(tzinfo=None) - datetime(1970, 1, 1)).total_seconds()
+    return value
+
+templates.env.filters["sort_key"] = sort_key_filter
+
+@dataclass(frozen=True)
+class MenuImage:
+    """템플릿용 메뉴 이미지 주소 (예전 이미지는 srcset 없이 원본만)"""
+    src: str  # 가장 큰 JPEG
+    thumbnail: str  # 가장 작은 JPEG (관리 화면 썸네일)
+    webp_srcset: Optional[str] = None
+    jpeg_srcset: Optional[str] = None
+
+def menu_image_filter(item) -> Optional[MenuImage]:
+    """메뉴 아이템의 이미지 주소와 srcset (이미지가 없으면 None)"""
+    if not item.image_filename:
+        return None
+    if not item.image_widths:
+        src = f"/static/uploads/{item.image_filename}"
+        return MenuImage(src=src, thumbnail=src)
+
+    digest = item.image_filename.rsplit("-", 1)[0]
+    widths = item.image_widths
+    return MenuImage(
+        src=f"/static/uploads/{digest}-{widths[-1]}.jpg",
+        thumbnail=f"/static/uploads/{digest}-{widths[0]}.jpg",
+        webp_srcset=", ".join(f"/static/uploads/{digest}-{width}.webp {width}w" for width in widths),
+        jpeg_srcset=", ".join(f"/static/uploads/{digest}-{width}.jpg {width}w" for width in widths)
+    )
+
+templates.env.filters["menu_image"] = menu_image_filter
+
 # 관리자 인증 설정
 security = HTTPBasic()
 ADMIN_USERNAME = os.getenv("ADMIN_USERNAME", "admin")
@@ -144,6 +487,32 @@ def verify_admin(credentials: HTTPBasicCredentials = Depends(security)):
         )
     return credentials.username
 
+def has_admin_credentials(authorization: Optional[str]) -> bool:
+    """Authorization 헤더가 관리자 계정의 HTTP Basic 인증인지 (Depends를 쓸 수 없는 WebSocket 핸드셰이크용)"""
+    scheme, _, encoded = (authorization or "").partition(" ")
+    if scheme.lower() != "basic":
+        return False
+    try:
+        username, _, password = base64.b64decode(encoded, validate=True).partition(b":")
+    except ValueError:
+        return False
+    return (secrets.compare_digest(username, ADMIN_USERNAME.encode())
+            & secrets.compare_digest(password, ADMIN_PASSWORD.encode()))
+
+def admin_socket_token() -> str:
+    """관리자 화면이 /ws/0에 붙일 토큰 (브라우저가 WebSocket 핸드셰이크에 Basic 인증을 싣지 않는 경우용)
+
+    관리자 계정으로 만든 HMAC이므로 비밀번호를 바꾸면 함께 바뀝니다.
+    """
+    return hmac.new(ADMIN_PASSWORD.encode(), f"ws:{ADMIN_USERNAME}".encode(), hashlib.sha256).hexdigest()
+
+def is_admin_websocket(websocket: WebSocket) -> bool:
+    """관리자 인증(Basic 인증 또는 ?token=)을 거친 WebSocket인지"""
+    token = websocket.query_params.get("token")
+    if token is not None:
+        return secrets.compare_digest(token.encode(), admin_socket_token().encode())
+    return has_admin_credentials(websocket.headers.get("authorization"))
+
 # QR 코드 저장 디렉토리 생성
 QR_DIR = "static/qr"
 os.makedirs(QR_DIR, exist_ok=True)
@@ -152,12 +521,80 @@ os.makedirs(QR_DIR, exist_ok=True)
 UPLOAD_DIR = "static/uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+# 테이블 수 설정 (테이블 번호는 1번부터 TABLE_COUNT번까지)
+TABLE_COUNT = int(os.getenv("TABLE_COUNT", "50"))
+TABLE_IDS = list(range(1, TABLE_COUNT + 1))
+
 # 데이터베이스 설정
-SQLALCHEMY_DATABASE_URL = "sqlite:///./orders.db"
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+# DATABASE_URL이 있으면 그대로 사용하고, 없으면 DATABASE_PATH의 SQLite 파일을 사용합니다.
+# (fly.io에서는 볼륨이 마운트된 /app/data 아래에 두어야 재배포 후에도 데이터가 유지됩니다)
+DATABASE_PATH = os.getenv("DATABASE_PATH", "./orders.db")
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", f"sqlite:///{DATABASE_PATH}")
+
+# DB 작업 스레드 수 (요청 세션은 run_db 작업이 끝날 때마다 연결을 돌려주므로 커넥션 풀 크기도 여기에 맞춥니다)
+DB_WORKERS = int(os.getenv("DB_WORKERS", "4"))
+
+# SQLite 연결 설정
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))  # 잠금 대기 시간
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # 메모리 맵 크기 (바이트)
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-20000"))  # 페이지 캐시 (음수는 KiB 단위, 약 20MB)
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """새 SQLite 연결마다 WAL 모드와 성능 관련 PRAGMA 적용"""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")  # 읽기와 쓰기가 서로를 막지 않도록
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute("PRAGMA synchronous=NORMAL")  # WAL 모드에서는 NORMAL로도 손상되지 않음
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+    finally:
+        cursor.close()
+
+def create_db_engine(database_url: str):
+    """데이터베이스 엔진 생성 (SQLite인 경우 WAL/PRAGMA와 풀 크기 설정 적용)"""
+    if not database_url.startswith("sqlite"):
+        return create_engine(database_url, pool_size=DB_WORKERS, max_overflow=DB_WORKERS)
+
+    database_path = make_url(database_url).database
+    if database_path and database_path != ":memory:":
+        os.makedirs(os.path.dirname(os.path.abspath(database_path)), exist_ok=True)
+
+    sqlite_engine = create_engine(
+        database_url,
+        connect_args={
+            "check_same_thread": False,  # DB 스레드 풀의 여러 스레드에서 연결을 공유
+            "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000
+        },
+        # DB 스레드마다 연결 하나 + 시작 시 작업 등 여유분
+        pool_size=DB_WORKERS,
+        max_overflow=2
+    )
+    event.listen(sqlite_engine, "connect", apply_sqlite_pragmas)
+    return sqlite_engine
+
+engine = create_db_engine(SQLALCHEMY_DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# uvicorn --workers 등으로 여러 프로세스가 동시에 뜰 때 테이블 생성/마이그레이션/초기 데이터가 겹치지 않도록 잠금
+STARTUP_LOCK_PATH = os.getenv("STARTUP_LOCK_PATH", f"{os.path.abspath(DATABASE_PATH)}.lock")
+
+@contextlib.contextmanager
+def startup_lock():
+    """시작 작업용 프로세스 간 파일 잠금 (fcntl이 없는 환경에서는 잠금 없이 진행)"""
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    with open(STARTUP_LOCK_PATH, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
 # Order 모델 정의 (기존 주문 정보 유지)
 class Order(Base):
     __tablename__ = "orders"
@@ -172,10 +609,25 @@ class Order(Base):
     cancellation_reason = Column(String, nullable=True)  # 취소 사유
     created_at = Column(DateTime, default=get_kst_now)
     confirmed_at = Column(DateTime, nullable=True)
+
+    # 주방 진행 상황 (조리가 필요한 아이템 기준, 아이템 상태가 바뀔 때 같은 트랜잭션에서 갱신)
+    kitchen_status = Column(String, default="completed")  # 'cooking': 남은 조리 아이템 있음, 'completed': 없음
+    kitchen_remaining_count = Column(Integer, default=0)  # 조리 대기/조리 중 아이템 수
+    kitchen_completed_count = Column(Integer, default=0)  # 조리 완료 아이템 수
     
     # 관계 설정
     order_items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # 주문 관리/주방 화면의 상태별 목록 (결제 확인 순, 주문 순 정렬)
+        Index("ix_orders_status_cancelled_confirmed", "payment_status", "is_cancelled", "confirmed_at"),
+        Index("ix_orders_status_cancelled_created", "payment_status", "is_cancelled", "created_at"),
+        Index("ix_orders_status_kitchen_confirmed", "payment_status", "is_cancelled", "kitchen_status", "confirmed_at"),
+        Index("ix_orders_cancelled_cancelled_at", "is_cancelled", "cancelled_at"),
+        # 테이블별 주문 내역/최신 주문 조회
+        Index("ix_orders_table_created", "table_id", "created_at"),
+    )
+
 # 개별 메뉴 아이템 주문 관리를 위한 새 모델
 class OrderItem(Base):
     __tablename__ = "order_items"
@@ -197,6 +649,14 @@ class OrderItem(Base):
     order = relationship("Order", back_populates="order_items")
     menu_item = relationship("MenuItem")
 
+    __table_args__ = (
+        # 주문별 아이템 조인 (조리 상태 필터까지 인덱스에서 처리)
+        Index("ix_order_items_order_status", "order_id", "cooking_status", "menu_item_id"),
+        # 주방 화면의 최근 완료/취소 목록
+        Index("ix_order_items_status_completed", "cooking_status", "completed_at"),
+        Index("ix_order_items_status_cancelled", "cooking_status", "cancelled_at"),
+    )
+
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
 
@@ -208,6 +668,12 @@ class ChatMessage(Base):
     target_table_id = Column(Integer, nullable=True)  # 개별 채팅 시 대상 테이블 (향후 확장용)
     created_at = Column(DateTime, default=get_kst_now)
 
+    __table_args__ = (
+        # 전체 채팅 최근 목록, 개인 메시지 수신함
+        Index("ix_chat_messages_global_id", "is_global", "id"),
+        Index("ix_chat_messages_target_table_id", "target_table_id"),
+    )
+
 class MenuItem(Base):
     __tablename__ = "menu_items"
 
@@ -217,11 +683,26 @@ class MenuItem(Base):
     price = Column(Integer)
     category = Column(String)  # 'drinks', 'main_dishes', 'side_dishes'
     description = Column(String, nullable=True)  # 메뉴 설명
-    image_filename = Column(String, nullable=True)  # 이미지 파일명
+    image_filename = Column(String, nullable=True)  # 이미지 파일명 (변환된 이미지는 가장 큰 JPEG)
+    image_widths = Column(JSON, nullable=True)  # 변환된 이미지의 폭 목록 (None이면 원본 그대로인 예전 이미지)
     is_active = Column(Boolean, default=True)
     created_at = Column(DateTime, default=get_kst_now)
     updated_at = Column(DateTime, default=get_kst_now, onupdate=get_kst_now)
 
+class SetMenuComponent(Base):
+    __tablename__ = "set_menu_components"
+
+    id = Column(Integer, primary_key=True, index=True)
+    set_menu_id = Column(Integer, ForeignKey("menu_items.id"), nullable=False)  # 세트 메뉴
+    component_menu_id = Column(Integer, ForeignKey("menu_items.id"), nullable=True)  # None이면 뽑기권 같은 특별 아이템
+    quantity = Column(Integer, nullable=False)  # 세트 한 개당 수량
+    notes_label = Column(String, nullable=True)  # 특별 아이템 이름 (주문 아이템 메모 "{이름} {수량}개")
+    position = Column(Integer, default=0)  # 구성 순서
+
+    __table_args__ = (
+        Index("ix_set_menu_components_set_position", "set_menu_id", "position"),
+    )
+
 class Waiting(Base):
     __tablename__ = "waiting"
 
@@ -237,30 +718,106 @@ class Waiting(Base):
     cancelled_at = Column(DateTime, nullable=True)  # 취소 시간
     table_id = Column(Integer, nullable=True)  # 배정된 테이블 번호
 
-# 데이터베이스 테이블 생성
-Base.metadata.create_all(bind=engine)
+    __table_args__ = (
+        # 대기 목록과 오늘 통계
+        Index("ix_waiting_status_created", "status", "created_at"),
+        Index("ix_waiting_created", "created_at"),
+        # 웨이팅 등록 시 중복 전화번호 확인
+        Index("ix_waiting_phone_status", "phone", "status"),
+    )
 
-# 의존성
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+class SchemaMigration(Base):
+    __tablename__ = "schema_migrations"
+
+    version = Column(Integer, primary_key=True)
+    name = Column(String)
+    applied_at = Column(DateTime, default=get_kst_now)
+
+# 스키마 마이그레이션
+# create_all은 새 테이블만 만들고 기존 orders.db에 인덱스나 컬럼을 추가하지 않으므로,
+# 기존 DB에 필요한 변경은 버전별 마이그레이션으로 추가합니다. (운영 중인 DB에도 안전하게 적용 가능)
+# 마이그레이션이 만드는 인덱스는 이름으로 고정합니다. 모델의 인덱스 전체를 만들면 이후 마이그레이션에서
+# 추가되는 컬럼을 쓰는 인덱스까지 먼저 만들려다 실패하기 때문입니다.
+HOT_PATH_INDEXES = (
+    "ix_orders_status_cancelled_confirmed",
+    "ix_orders_status_cancelled_created",
+    "ix_orders_cancelled_cancelled_at",
+    "ix_orders_table_created",
+    "ix_order_items_order_status",
+    "ix_order_items_status_completed",
+    "ix_order_items_status_cancelled",
+    "ix_chat_messages_global_id",
+    "ix_chat_messages_target_table_id",
+    "ix_waiting_status_created",
+    "ix_waiting_created",
+    "ix_waiting_phone_status",
+)
+
+def create_indexes(connection, names):
+    """모델에 정의된 인덱스 중 주어진 이름의 인덱스만 생성 (이미 있으면 건너뜀)"""
+    indexes = {index.name: index for table in Base.metadata.tables.values() for index in table.indexes}
+    for name in names:
+        indexes[name].create(bind=connection, checkfirst=True)
+
+def migrate_hot_path_indexes(connection):
+    """핫 쿼리 경로용 복합 인덱스 생성"""
+    create_indexes(connection, HOT_PATH_INDEXES)
+    if connection.dialect.name == "sqlite":
+        connection.exec_driver_sql("ANALYZE")  # 새 인덱스를 쿼리 플래너가 활용하도록 통계 갱신
+
+def backfill_kitchen_progress(connection):
+    """주문 아이템으로부터 주문별 주방 진행 카운터를 다시 계산"""
+    connection.exec_driver_sql("""
+        UPDATE orders SET
+            kitchen_remaining_count = (
+                SELECT count(*) FROM order_items JOIN menu_items ON menu_items.id = order_items.menu_item_id
+                WHERE order_items.order_id = orders.id AND menu_items.category != 'table'
+                  AND order_items.cooking_status IN ('pending', 'cooking')
+            ),
+            kitchen_completed_count = (
+                SELECT count(*) FROM order_items JOIN menu_items ON menu_items.id = order_items.menu_item_id
+                WHERE order_items.order_id = orders.id AND menu_items.category != 'table'
+                  AND order_items.cooking_status = 'completed'
+            )
+    """)
+    connection.exec_driver_sql("""
+        UPDATE orders SET kitchen_status = CASE WHEN kitchen_remaining_count > 0 THEN 'cooking' ELSE 'completed' END
+    """)
+
+def migrate_kitchen_progress(connection):
+    """주문에 주방 진행 상황 컬럼 추가 및 기존 주문 채우기"""
+    existing_columns = {column["name"] for column in inspect(connection).get_columns("orders")}
+    for column_sql in (
+        "kitchen_status VARCHAR DEFAULT 'completed'",
+        "kitchen_remaining_count INTEGER DEFAULT 0",
+        "kitchen_completed_count INTEGER DEFAULT 0",
+    ):
+        if column_sql.split()[0] not in existing_columns:
+            connection.exec_driver_sql(f"ALTER TABLE orders ADD COLUMN {column_sql}")
+    backfill_kitchen_progress(connection)
+    create_indexes(connection, ("ix_orders_status_kitchen_confirmed",))
+
+def migrate_menu_image_widths(connection):
+    """메뉴에 변환된 이미지 폭 컬럼 추가 (기존 이미지는 시작할 때 변환)"""
+    existing_columns = {column["name"] for column in inspect(connection).get_columns("menu_items")}
+    if "image_widths" not in existing_columns:
+        connection.exec_driver_sql("ALTER TABLE menu_items ADD COLUMN image_widths JSON")
 
-# 세트 메뉴 구성 정보 정의
-SET_MENU_COMPONENTS = {
+# 세트 메뉴 기본 구성 (메뉴 이름 기준)
+# 세트 구성은 set_menu_components 테이블에 메뉴 ID로 저장되며, 이 값은 테이블이 비어 있을 때
+# 한 번만 옮겨 담는 초기 데이터입니다. 이후 변경은 메뉴 관리 화면에서 합니다.
+DEFAULT_SET_MENU_COMPONENTS = {
     "🌟 두근두근 2인 세트": {
         "숲속 삼겹살": 2,
         "셰프 프랭클린의 두부김치": 1,
-        "음료": 2,  # 실제로는 특정 음료를 선택하게 할 수 있음
+        "숲속 바람 사이다": 2,  # 기본 음료 (메뉴 관리에서 변경 가능)
         "랜덤 뽑기권": 1
     },
     "🌟 단짝 4인 세트": {
         "숲속 삼겹살": 3,
         "셰프 프랭클린의 두부김치": 1,
         "너굴의 비밀 레시비 김볶밥": 1,
-        "음료": 4,
+        "숲속 바람 사이다": 4,
         "랜덤 뽑기권": 2
     },
     "🌟 모여봐요 6인 세트": {
@@ -269,67 +826,128 @@ SET_MENU_COMPONENTS = {
         "너굴의 비밀 레시비 김볶밥": 1,
         "둘기가 숨어먹는 콘치즈": 1,
         "마을 장터 나초": 1,
-        "음료": 6,
+        "숲속 바람 사이다": 6,
         "랜덤 뽑기권": 4
     }
 }
 
+# 메뉴가 아닌 세트 구성 요소 (주문 아이템 메모로만 표시)
+SPECIAL_SET_COMPONENTS = {"랜덤 뽑기권"}
+
+def seed_set_menu_components(connection):
+    """세트 구성 테이블이 비어 있으면 기본 구성을 메뉴 ID로 바꿔 채움"""
+    if connection.execute(select(SetMenuComponent.id).limit(1)).first() is not None:
+        return
+    menu_name_to_id = dict(connection.execute(
+        select(MenuItem.name_kr, MenuItem.id).where(MenuItem.is_active == True)
+    ).all())
+    rows = []
+    for set_name, components in DEFAULT_SET_MENU_COMPONENTS.items():
+        set_menu_id = menu_name_to_id.get(set_name)
+        if set_menu_id is None:
+            continue
+        for position, (component_name, quantity) in enumerate(components.items()):
+            if component_name in SPECIAL_SET_COMPONENTS:
+                component_menu_id, notes_label = None, component_name
+            elif component_name in menu_name_to_id:
+                component_menu_id, notes_label = menu_name_to_id[component_name], None
+            else:
+                continue
+            rows.append({
+                "set_menu_id": set_menu_id,
+                "component_menu_id": component_menu_id,
+                "quantity": quantity,
+                "notes_label": notes_label,
+                "position": position,
+            })
+    if rows:
+        connection.execute(insert(SetMenuComponent), rows)
+
+SCHEMA_MIGRATIONS = [
+    (1, "hot path indexes", migrate_hot_path_indexes),
+    (2, "materialized kitchen progress", migrate_kitchen_progress),
+    (3, "set menu components", seed_set_menu_components),
+    (4, "menu image widths", migrate_menu_image_widths),
+]
+
+def run_migrations(bind):
+    """아직 적용되지 않은 스키마 마이그레이션을 순서대로 적용"""
+    with bind.connect() as connection:
+        applied = set(connection.execute(select(SchemaMigration.version)).scalars())
+
+    for version, name, migrate in SCHEMA_MIGRATIONS:
+        if version in applied:
+            continue
+        try:
+            with bind.begin() as connection:
+                migrate(connection)
+                connection.execute(insert(SchemaMigration).values(version=version, name=name, applied_at=get_kst_now()))
+            db_log.info("Applied schema migration %s: %s", version, name)
+        except IntegrityError:
+            # 다른 워커 프로세스가 같은 마이그레이션을 먼저 적용한 경우
+            db_log.info("Schema migration %s already applied by another process", version)
+
+# 데이터베이스 테이블 생성 및 마이그레이션
+with startup_lock():
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+# 정적 자산 해시 사본과 매니페스트 생성
+with startup_lock():
+    static_assets.build()
+
+# DB 작업 전용 스레드 풀
+# 모든 핸들러는 async def이고 이벤트 루프 하나가 WebSocket까지 모두 처리하므로,
+# 동기 SQLAlchemy 세션 작업은 반드시 run_db()를 통해 이 풀에서 실행합니다.
+db_executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="db")
+
+# 요청 세션과 그 세션을 연 태스크
+# 요청 세션이 연결을 요청이 끝날 때까지 잡고 있으면 브로드캐스트나 렌더링을 기다리는 동안에도 풀을 차지하므로,
+# 그 요청의 run_db 작업이 끝날 때마다 세션을 닫아 연결을 풀에 돌려줍니다.
+# (같은 세션으로 다음 작업을 하면 새 연결로 다시 시작하며, 앞서 읽은 객체는 분리된 상태로 남습니다)
+request_session: contextvars.ContextVar[Optional[Tuple[asyncio.Task, Session]]] = contextvars.ContextVar("request_session", default=None)
+
+def run_and_release(session: Session, func):
+    """DB 스레드에서 작업을 실행한 뒤 세션을 닫음 (커밋하지 않은 변경은 롤백됨)"""
+    try:
+        return func()
+    finally:
+        session.close()
+
+async def run_db(func, *args, **kwargs):
+    """동기 DB 작업을 전용 스레드 풀에서 실행하고 결과를 기다립니다."""
+    loop = asyncio.get_running_loop()
+    call = functools.partial(func, *args, **kwargs)
+    # 요청을 처리하는 태스크에서 부른 경우에만 요청 세션을 닫음 (그 요청에서 만든 백그라운드 태스크는 제외)
+    owner = request_session.get()
+    if owner is not None and owner[0] is asyncio.current_task():
+        call = functools.partial(run_and_release, owner[1], call)
+    context = contextvars.copy_context()  # 요청 단위 contextvar를 워커 스레드에서도 유지
+    return await loop.run_in_executor(db_executor, functools.partial(context.run, call))
+
+# 의존성
+async def get_db():
+    db = SessionLocal()
+    request_session.set((asyncio.current_task(), db))
+    try:
+        yield db
+    finally:
+        await run_db(db.close)
+
 def decompose_set_menu(menu_items: Dict[str, int], db: Session) -> List[Dict]:
-    """세트 메뉴를 개별 구성 요소로 분해"""
+    """세트 메뉴를 개별 구성 요소로 분해 (메뉴 스냅샷의 전개표를 사용하므로 SQL 없음)"""
+    expansions = menu_cache.get(db).expansions
     decomposed_items = []
-    
-    # 메뉴 이름으로 ID 매핑 생성
-    menu_name_to_id = {}
-    all_menu_items = db.query(MenuItem).filter(MenuItem.is_active == True).all()
-    for item in all_menu_items:
-        menu_name_to_id[item.name_kr] = item.id
-    
     for item_id, quantity in menu_items.items():
-        menu_item = db.query(MenuItem).filter(MenuItem.id == int(item_id)).first()
-        if not menu_item:
-            continue
-            
-        if menu_item.name_kr in SET_MENU_COMPONENTS:
-            # 세트 메뉴인 경우 구성 요소로 분해
-            set_components = SET_MENU_COMPONENTS[menu_item.name_kr]
-            for component_name, component_quantity in set_components.items():
-                if component_name == "음료":
-                    # 음료는 기본 음료로 설정 (추후 선택 가능하게 확장 가능)
-                    default_drink_id = menu_name_to_id.get("숲속 바람 사이다")
-                    if default_drink_id:
-                        decomposed_items.append({
-                            "menu_item_id": default_drink_id,
-                            "quantity": component_quantity * quantity,
-                            "is_set_component": True,
-                            "parent_set_name": menu_item.name_kr
-                        })
-                elif component_name == "랜덤 뽑기권":
-                    # 뽑기권은 별도 처리 (실제 메뉴가 아님)
-                    decomposed_items.append({
-                        "menu_item_id": None,  # 특별 아이템
-                        "quantity": component_quantity * quantity,
-                        "is_set_component": True,
-                        "parent_set_name": menu_item.name_kr,
-                        "notes": f"랜덤 뽑기권 {component_quantity * quantity}개"
-                    })
-                else:
-                    component_id = menu_name_to_id.get(component_name)
-                    if component_id:
-                        decomposed_items.append({
-                            "menu_item_id": component_id,
-                            "quantity": component_quantity * quantity,
-                            "is_set_component": True,
-                            "parent_set_name": menu_item.name_kr
-                        })
-        else:
-            # 일반 메뉴인 경우 그대로 추가
+        for expanded in expansions.get(int(item_id), ()):
+            item_quantity = expanded.quantity * quantity
             decomposed_items.append({
-                "menu_item_id": int(item_id),
-                "quantity": quantity,
-                "is_set_component": False,
-                "parent_set_name": None
+                "menu_item_id": expanded.menu_item_id,
+                "quantity": item_quantity,
+                "is_set_component": expanded.is_set_component,
+                "parent_set_name": expanded.parent_set_name,
+                "notes": f"{expanded.notes_label} {item_quantity}개" if expanded.notes_label else None
             })
-    
     return decomposed_items
 
 # 초기 메뉴 데이터 생성 함수
@@ -428,15 +1046,107 @@ def init_menu_data(db: Session):
             ),
         ]
         db.add_all(initial_menu)
+        db.flush()
+        seed_set_menu_components(db.connection())
         db.commit()
 
 # 메뉴 데이터 초기화
-init_menu_data(next(get_db()))
+with startup_lock(), SessionLocal() as init_db:
+    init_menu_data(init_db)
+
+# 메뉴 스냅샷 캐시
+# 메뉴는 하룻밤에 몇 번만 바뀌므로, 활성 메뉴를 한 번만 조회해 필요한 구조를 미리 만들어 두고
+# 메뉴가 변경될 때(추가/수정/삭제)만 새 스냅샷으로 교체합니다.
+MENU_CATEGORY_ORDER = ["table", "set_menu", "main_dishes", "drinks", "side_dishes"]
+
+MENU_CATEGORY_DISPLAY_NAMES = {
+    "table": "상차림비",
+    "set_menu": "세트 메뉴",
+    "main_dishes": "메인 요리",
+    "drinks": "음료",
+    "side_dishes": "사이드 메뉴"
+}
+
+@dataclass(frozen=True)
+class MenuItemView:
+    """세션과 분리된 읽기 전용 메뉴 아이템 (템플릿에서 MenuItem 대신 사용)"""
+    id: int
+    name_kr: str
+    name_en: str
+    price: int
+    category: str
+    description: Optional[str]
+    image_filename: Optional[str]
+    image_widths: Optional[List[int]]
+    is_active: bool
+
+@dataclass(frozen=True)
+class ExpandedItem:
+    """메뉴 한 개를 주문하면 만들어지는 주문 아이템 (세트 메뉴는 구성 요소마다 하나)"""
+    menu_item_id: Optional[int]  # None이면 뽑기권 같은 특별 아이템
+    quantity: int
+    is_set_component: bool
+    parent_set_name: Optional[str]
+    notes_label: Optional[str] = None  # 특별 아이템 메모 ("{라벨} {수량}개")
+
+def build_menu_expansions(all_items: List[MenuItem], components: List[SetMenuComponent]) -> Dict[int, Tuple[ExpandedItem, ...]]:
+    """메뉴 ID별로 주문 시 만들어질 주문 아이템을 미리 계산 (세트 메뉴는 set_menu_components대로 분해)"""
+    active_ids = {item.id for item in all_items if item.is_active}
+    components_by_set = {}
+    for component in components:
+        components_by_set.setdefault(component.set_menu_id, []).append(component)
+
+    expansions = {}
+    for item in all_items:
+        # 세트 메뉴 분류가 아닌 메뉴는 구성 행이 남아 있어도 분해하지 않음
+        set_components = components_by_set.get(item.id) if item.category == "set_menu" else None
+        if not set_components:
+            expansions[item.id] = (ExpandedItem(item.id, 1, False, None),)
+            continue
+        expansions[item.id] = tuple(
+            ExpandedItem(
+                component.component_menu_id,
+                component.quantity,
+                True,
+                item.name_kr,
+                component.notes_label if component.component_menu_id is None else None
+            )
+            for component in set_components
+            # 삭제(비활성)된 메뉴를 가리키는 구성 요소는 주방에 보내지 않음
+            if component.component_menu_id is None or component.component_menu_id in active_ids
+        )
+    return expansions
 
-# 메뉴 관련 함수들 (리팩토링된 버전)
-def get_menu_data(db: Session) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str], Dict[str, List[MenuItem]], Dict[str, str]]:
-    """활성화된 메뉴 데이터를 다양한 형식으로 반환합니다."""
-    active_items = db.query(MenuItem).filter(MenuItem.is_active == True).order_by(MenuItem.id).all()
+@dataclass(frozen=True)
+class MenuSnapshot:
+    """특정 버전의 활성 메뉴로부터 미리 만들어 둔 조회용 구조"""
+    version: int
+    items_by_id: Dict[int, MenuItemView]
+    category_by_id: Dict[int, str]  # 비활성 메뉴 포함 (과거 주문의 아이템 분류용)
+    menu_item_details_for_js: Dict[str, Dict[str, Any]]
+    menu_names_by_id: Dict[str, str]
+    menu_items_grouped_by_category: Dict[str, List[MenuItemView]]
+    category_display_names: Dict[str, str]
+    expansions: Dict[int, Tuple[ExpandedItem, ...]]  # 메뉴 ID: 주문 아이템 전개 (비활성 메뉴 포함)
+
+def build_menu_snapshot(db: Session, version: int) -> MenuSnapshot:
+    """메뉴를 한 번 조회해 스냅샷을 만듭니다."""
+    all_items = db.query(MenuItem).order_by(MenuItem.id).all()
+    set_components = db.query(SetMenuComponent).order_by(SetMenuComponent.set_menu_id, SetMenuComponent.position).all()
+    active_items = [
+        MenuItemView(
+            id=item.id,
+            name_kr=item.name_kr,
+            name_en=item.name_en,
+            price=item.price,
+            category=item.category,
+            description=item.description,
+            image_filename=item.image_filename,
+            image_widths=item.image_widths,
+            is_active=item.is_active
+        )
+        for item in all_items if item.is_active
+    ]
 
     # order.js 에 전달될 메뉴 아이템 정보 (ID를 키로, 아이템 상세 정보를 값으로 하는 딕셔너리)
     menu_item_details_for_js = {
@@ -451,211 +1161,741 @@ def get_menu_data(db: Session) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str
     }
     menu_names_by_id = {str(item.id): item.name_kr for item in active_items}
 
-    # order.html 및 카테고리 기반 뷰를 위한 구조
-    # 카테고리 순서 정의 (order.html 표시 순서)
-    category_order = ["table", "set_menu", "main_dishes", "drinks", "side_dishes"]
-    
-    menu_items_grouped_by_category = {category: [] for category in category_order}
+    # order.html 및 카테고리 기반 뷰를 위한 구조 (카테고리 순서 = order.html 표시 순서)
+    menu_items_grouped_by_category = {category: [] for category in MENU_CATEGORY_ORDER}
     for item in active_items:
         if item.category in menu_items_grouped_by_category:
             menu_items_grouped_by_category[item.category].append(item)
 
     # 세트메뉴는 2인 -> 4인 -> 6인 순서로 정렬
-    if menu_items_grouped_by_category["set_menu"]:
-        menu_items_grouped_by_category["set_menu"].sort(key=lambda x: (
-            0 if "2인" in x.name_kr else
-            1 if "4인" in x.name_kr else
-            2 if "6인" in x.name_kr else
-            3
-        ))
+    menu_items_grouped_by_category["set_menu"].sort(key=lambda x: (
+        0 if "2인" in x.name_kr else
+        1 if "4인" in x.name_kr else
+        2 if "6인" in x.name_kr else
+        3
+    ))
 
     # 빈 카테고리 키는 유지하되, 리스트가 비어있음을 order.html에서 처리
+    return MenuSnapshot(
+        version=version,
+        items_by_id={item.id: item for item in active_items},
+        category_by_id={item.id: item.category for item in all_items},
+        menu_item_details_for_js=menu_item_details_for_js,
+        menu_names_by_id=menu_names_by_id,
+        menu_items_grouped_by_category=menu_items_grouped_by_category,
+        category_display_names=dict(MENU_CATEGORY_DISPLAY_NAMES),
+        expansions=build_menu_expansions(all_items, set_components)
+    )
 
-    category_display_names = {
-        "table": "상차림비",
-        "set_menu": "세트 메뉴",
-        "main_dishes": "메인 요리",
-        "drinks": "음료",
-        "side_dishes": "사이드 메뉴"
-    }
-    
-    return menu_item_details_for_js, menu_names_by_id, menu_items_grouped_by_category, category_display_names
-
-def generate_qr_code(url: str, table_id: int) -> str:
-    """QR 코드를 생성하고 저장된 경로를 반환합니다."""
-    qr = qrcode.QRCode(
-        version=1,
-        error_correction=qrcode.constants.ERROR_CORRECT_L,
-        box_size=10,
-        border=4,
+class MenuCache:
+    """프로세스 전역 메뉴 스냅샷 보관소
+
+    읽기는 현재 스냅샷 참조만 반환하므로 SQL이 발생하지 않습니다.
+    메뉴를 변경한 핸들러는 커밋 후 refresh()를 호출해 새 버전으로 교체합니다.
+    """
+
+    def __init__(self):
+        self._snapshot: Optional[MenuSnapshot] = None
+        self._version = 0
+        self._lock = threading.Lock()
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def current(self) -> Optional[MenuSnapshot]:
+        """DB 세션 없이 읽는 현재 스냅샷 (아직 없으면 None)"""
+        return self._snapshot
+
+    def get(self, db: Session) -> MenuSnapshot:
+        """현재 스냅샷 반환 (아직 없으면 한 번만 생성)"""
+        snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self.refresh(db)
+        return snapshot
+
+    def refresh(self, db: Session) -> MenuSnapshot:
+        """DB에서 메뉴를 다시 읽어 버전을 올린 새 스냅샷으로 원자적으로 교체"""
+        with self._lock:
+            self._version += 1
+            snapshot = build_menu_snapshot(db, self._version)
+            self._snapshot = snapshot
+        return snapshot
+
+menu_cache = MenuCache()
+
+# 첫 요청이 이벤트 루프에서 메뉴를 조회하지 않도록 미리 스냅샷 생성
+with SessionLocal() as init_db:
+    menu_cache.refresh(init_db)
+
+def get_menu_data(db: Session) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, str], Dict[str, List[MenuItemView]], Dict[str, str]]:
+    """활성화된 메뉴 데이터를 다양한 형식으로 반환합니다. (캐시된 스냅샷, 반환값은 수정하지 말 것)"""
+    snapshot = menu_cache.get(db)
+    return (
+        snapshot.menu_item_details_for_js,
+        snapshot.menu_names_by_id,
+        snapshot.menu_items_grouped_by_category,
+        snapshot.category_display_names
     )
-    qr.add_data(url)
-    qr.make(fit=True)
 
-    img = qr.make_image(fill_color="black", back_color="white")
-    filename = f"table_{table_id}.png"
-    filepath = os.path.join(QR_DIR, filename)
-    img.save(filepath)
-    
-    return filepath
+# 주문별 주방 진행 상황
+# 아이템 상태가 바뀔 때마다 주문의 카운터를 증감시켜, "조리 중"/"완료" 주문 조회를
+# HAVING 집계 대신 kitchen_status 인덱스 조회로 처리합니다.
+KITCHEN_ACTIVE_STATUSES = ("pending", "cooking")
 
-@app.get("/", response_class=HTMLResponse)
-async def home(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
+def is_kitchen_item(menu_item_id: Optional[int], category_by_id: Dict[int, str]) -> bool:
+    """조리가 필요한 아이템인지 (뽑기권 등 특별 아이템과 상차림비 제외)"""
+    return menu_item_id is not None and category_by_id.get(menu_item_id) != "table"
 
-# 채팅 페이지(구현 예정정)
-@app.get("/chat", response_class=HTMLResponse)
-async def chat(request: Request):
-    return templates.TemplateResponse("chat.html", {"request": request})
+def kitchen_progress_delta(old_status: Optional[str], new_status: Optional[str]) -> Tuple[int, int]:
+    """조리 상태 변화에 따른 (남은 아이템 수, 완료 아이템 수) 증감"""
+    remaining_delta = (new_status in KITCHEN_ACTIVE_STATUSES) - (old_status in KITCHEN_ACTIVE_STATUSES)
+    completed_delta = (new_status == "completed") - (old_status == "completed")
+    return remaining_delta, completed_delta
 
-@app.post("/chat/send")
-async def send_chat_message(
-    request: Request,
-    table_id: int = Form(...),
-    message: str = Form(...),
-    nickname: str = Form(None),
-    target_table_id: int = Form(None),  # 개인 메시지 대상 테이블 ID
-    db: Session = Depends(get_db)
-):
-    """채팅 메시지 전송 (전체 채팅 또는 개인 메시지)"""
-    try:
-        # 닉네임 설정 (없으면 기본값)
-        if nickname:
-            manager.set_nickname(table_id, nickname)
-            display_nickname = nickname
-        else:
-            display_nickname = manager.get_nickname(table_id)
-        
-        # 개인 메시지인지 전체 메시지인지 판단
-        is_private = target_table_id is not None
-        
-        # 메시지를 데이터베이스에 저장
-        chat_message = ChatMessage(
-            table_id=table_id,
-            message=message,
-            nickname=display_nickname,
-            is_global=not is_private,  # 개인 메시지면 False, 전체 메시지면 True
-            target_table_id=target_table_id if is_private else None
-        )
-        db.add(chat_message)
-        db.commit()
-        db.refresh(chat_message)
-        
-        # WebSocket으로 실시간 전송
-        message_data = {
-            "type": "chat_message",
-            "id": chat_message.id,
-            "table_id": table_id,
-            "nickname": display_nickname,
-            "message": message,
-            "created_at": chat_message.created_at.isoformat(),
-            "formatted_time": to_kst_filter(chat_message.created_at),
-            "is_private": is_private,
-            "target_table_id": target_table_id
-        }
-        
-        if is_private:
-            # 개인 메시지인 경우 보낸 사람과 받는 사람에게만 전송
-            await manager.broadcast_to_table(table_id, json.dumps(message_data))  # 보낸 사람
-            await manager.broadcast_to_table(target_table_id, json.dumps(message_data))  # 받는 사람
-        else:
-            # 전체 메시지인 경우 모든 사람에게 전송
-            await manager.broadcast_to_all(json.dumps(message_data))
-        
-        return {"success": True, "message_id": chat_message.id, "is_private": is_private}
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
+def apply_kitchen_progress(db: Session, order_id: int, remaining_delta: int, completed_delta: int):
+    """주문의 주방 진행 카운터와 상태를 원자적으로 갱신 (호출한 트랜잭션에 포함됨)"""
+    if not remaining_delta and not completed_delta:
+        return
+    db.execute(
+        update(Order).where(Order.id == order_id).values(
+            kitchen_remaining_count=Order.kitchen_remaining_count + remaining_delta,
+            kitchen_completed_count=Order.kitchen_completed_count + completed_delta,
+            kitchen_status=case((Order.kitchen_remaining_count + remaining_delta > 0, "cooking"), else_="completed")
+        ).execution_options(synchronize_session=False)
+    )
 
-@app.get("/chat/messages")
-async def get_chat_messages(
-    table_id: int = None,  # 현재 사용자의 테이블 ID 추가
-    limit: int = 50,
-    before_id: int = None,
-    after_id: int = None,  # 특정 ID 이후의 메시지만 조회
-    db: Session = Depends(get_db)
-):
-    """채팅 메시지 목록 조회 (전체 메시지 + 관련된 개인 메시지)"""
-    
-    if table_id:
-        # 전체 메시지 + 해당 테이블과 관련된 개인 메시지
-        query = db.query(ChatMessage).filter(
-            (ChatMessage.is_global == True) |  # 전체 메시지
-            (ChatMessage.table_id == table_id) |  # 내가 보낸 개인 메시지
-            (ChatMessage.target_table_id == table_id)  # 나에게 온 개인 메시지
-        )
-    else:
-        # table_id가 없으면 전체 메시지만
-        query = db.query(ChatMessage).filter(ChatMessage.is_global == True)
-    
-    if before_id:
-        query = query.filter(ChatMessage.id < before_id)
-    
-    if after_id:
-        query = query.filter(ChatMessage.id > after_id)
-    
-    # after_id가 지정된 경우 오름차순, 그렇지 않으면 내림차순
-    if after_id:
-        messages = query.order_by(ChatMessage.created_at.asc()).limit(limit).all()
-    else:
-        messages = query.order_by(ChatMessage.created_at.desc()).limit(limit).all()
-        messages = list(reversed(messages))  # 시간 순으로 정렬
-    
-    return {
-        "messages": [
-            {
-                "id": msg.id,
-                "table_id": msg.table_id,
-                "nickname": msg.nickname,
-                "message": msg.message,
-                "created_at": msg.created_at.isoformat(),
-                "formatted_time": to_kst_filter(msg.created_at),
-                "is_private": not msg.is_global,
-                "target_table_id": msg.target_table_id
-            }
-            for msg in messages
-        ]
-    }
+def set_order_items_cooking_status(db: Session, order_id: int, items: List[OrderItem], status: str) -> None:
+    """같은 주문의 아이템들의 조리 상태를 바꾸고 주문의 진행 카운터를 한 번에 갱신"""
+    category_by_id = menu_cache.get(db).category_by_id
+    remaining_delta = completed_delta = 0
+    for item in items:
+        if is_kitchen_item(item.menu_item_id, category_by_id):
+            item_remaining, item_completed = kitchen_progress_delta(item.cooking_status, status)
+            remaining_delta += item_remaining
+            completed_delta += item_completed
+        item.cooking_status = status
+    db.flush()
+    apply_kitchen_progress(db, order_id, remaining_delta, completed_delta)
 
-@app.get("/chat/online-tables", response_model=OnlineTablesResponse)
-async def get_online_tables():
-    """현재 온라인인 테이블 목록 조회"""
-    try:
-        online_tables = manager.get_online_tables()
-        table_info = []
-        for table_id in online_tables:
-            try:
-                nickname = manager.get_nickname(table_id)
-                # nickname이 None이거나 빈 문자열인 경우 기본값 사용
-                if not nickname:
-                    nickname = f"테이블{table_id}"
-                
-                table_info.append(OnlineTableInfo(
-                    table_id=table_id,
-                    nickname=str(nickname)  # 문자열로 확실히 변환
-                ))
-            except Exception as e:
-                print(f"Error processing table {table_id}: {str(e)}")
-                # 개별 테이블 처리 오류 시 기본값으로 추가
-                table_info.append(OnlineTableInfo(
-                    table_id=table_id,
-                    nickname=f"테이블{table_id}"
-                ))
-        
-        return OnlineTablesResponse(online_tables=table_info)
-    except Exception as e:
-        print(f"Error in get_online_tables: {str(e)}")
-        # 오류 발생 시 빈 목록 반환
-        return OnlineTablesResponse(online_tables=[])
+# QR 코드 캐시
+# QR 이미지는 (주문 URL, 크기)의 해시를 이름으로 QR_DIR에 저장해 두고 재사용합니다.
+# 주소나 크기가 바뀌면 키도 바뀌므로 따로 무효화할 필요가 없습니다.
+# 캐시에 없는 이미지는 이미지 처리 풀에서 렌더링합니다.
+QR_DEFAULT_BOX_SIZE = 10
+QR_MAX_BOX_SIZE = 40
+QR_MEMORY_CACHE_SIZE = 512  # 메모리에 둘 PNG 수 (테이블당 1~2KB)
+QR_DISK_CACHE_SIZE = int(os.getenv("QR_DISK_CACHE_SIZE", "1000"))  # QR_DIR에 둘 PNG 수 (넘으면 오래된 것부터 삭제)
+QR_DISK_CACHE_KEEP = QR_DISK_CACHE_SIZE * 9 // 10  # 정리할 때 남길 수 (정리 직후의 저장마다 다시 정리하지 않도록 여유를 둠)
 
-@app.get("/chat/{table_id}", response_class=HTMLResponse)
+# QR 코드에 넣을 주문 페이지 주소 (예: https://dongsuldongsul.fly.dev/)
+# 비워 두면 요청의 주소를 쓰되, Host 헤더로 임의의 주소가 캐시에 쌓이지 않도록 QR_ALLOWED_HOSTS의 호스트만 따르고
+# 그 밖의 호스트로 온 요청은 QR_FALLBACK_BASE_URL을 씁니다.
+PUBLIC_BASE_URL = os.getenv("PUBLIC_BASE_URL", "")
+QR_ALLOWED_HOSTS = {host.strip() for host in os.getenv("QR_ALLOWED_HOSTS", "localhost,127.0.0.1").split(",") if host.strip()}
+QR_FALLBACK_BASE_URL = os.getenv("QR_FALLBACK_BASE_URL", "http://localhost:8000/")
+
+def qr_cache_key(url: str, box_size: int) -> str:
+    return hashlib.sha256(f"{box_size}\n{url}".encode()).hexdigest()[:32]
+
+class QRCodeCache:
+    """내용 주소 기반 QR 이미지 캐시 (메모리 -> QR_DIR 파일 -> 프로세스 풀 렌더링 순으로 조회)
+
+    같은 키를 동시에 요청하면 렌더링은 한 번만 하고 결과를 함께 기다립니다.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._memory: Dict[str, bytes] = {}
+        self._pending: Dict[str, asyncio.Future] = {}
+        # 마지막 정리 이후 디스크에 있다고 보는 PNG 수 (None이면 아직 세지 않음)
+        # 저장할 때마다 디렉토리를 훑지 않고 이 수가 QR_DISK_CACHE_SIZE에 이를 때만 훑어서 정리함
+        self._disk_count: Optional[int] = None
+        self._disk_lock = threading.Lock()  # _store는 기본 스레드 풀에서 동시에 실행됨
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.png")
+
+    def _read(self, key: str) -> Optional[bytes]:
+        try:
+            with open(self._path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _remember(self, key: str, png: bytes):
+        if len(self._memory) >= QR_MEMORY_CACHE_SIZE:
+            self._memory.pop(next(iter(self._memory)))
+        self._memory[key] = png
+
+    def _store(self, key: str, png: bytes):
+        """PNG를 저장하고, 파일 수가 QR_DISK_CACHE_SIZE에 이르면 오래전에 만든 파일부터 삭제"""
+        write_file_atomic(self._path(key), png)
+        with self._disk_lock:
+            if self._disk_count is not None and self._disk_count < QR_DISK_CACHE_SIZE:
+                self._disk_count += 1
+                return
+            self._disk_count = self._evict()
+
+    def _evict(self) -> int:
+        """QR_DISK_CACHE_KEEP개만 남기고 오래된 PNG를 삭제한 뒤 남은 수 반환
+
+        다른 워커 프로세스가 같은 디렉토리에 쓴 파일도 여기서 함께 셉니다.
+        """
+        entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith(".png")]
+        if len(entries) < QR_DISK_CACHE_SIZE:
+            return len(entries)
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - QR_DISK_CACHE_KEEP]:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+        return QR_DISK_CACHE_KEEP
+
+    async def _load(self, key: str, url: str, box_size: int) -> bytes:
+        loop = asyncio.get_running_loop()
+        png = await loop.run_in_executor(None, self._read, key)
+        if png is None:
+            png = await loop.run_in_executor(image_executor, render_qr_png, url, box_size)
+            await loop.run_in_executor(None, self._store, key, png)
+        self._remember(key, png)
+        return png
+
+    async def get(self, url: str, box_size: int) -> Tuple[str, bytes]:
+        """(캐시 키, PNG) 반환"""
+        key = qr_cache_key(url, box_size)
+        png = self._memory.get(key)
+        if png is not None:
+            return key, png
+
+        future = self._pending.get(key)
+        if future is None:
+            future = asyncio.ensure_future(self._load(key, url, box_size))
+            self._pending[key] = future
+            future.add_done_callback(lambda _: self._pending.pop(key, None))
+        # 요청 하나가 취소돼도 같은 이미지를 기다리는 다른 요청의 렌더링은 계속됨
+        return key, await asyncio.shield(future)
+
+qr_cache = QRCodeCache(QR_DIR)
+
+class ZipStreamBuffer:
+    """ZipFile이 쓴 바이트를 모아 두었다가 조각으로 넘겨주는 버퍼
+
+    tell/seek이 없으므로 ZipFile은 스트리밍 모드(데이터 디스크립터)로 씁니다.
+    """
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+def table_order_urls(request: Request, table_ids: List[int]) -> List[str]:
+    """QR 코드에 넣을 테이블 주문 주소 (PUBLIC_BASE_URL이 없으면 허용된 호스트의 요청 주소, 그 외에는 QR_FALLBACK_BASE_URL 기준)"""
+    if PUBLIC_BASE_URL:
+        base_url = PUBLIC_BASE_URL
+    elif request.url.hostname in QR_ALLOWED_HOSTS:
+        base_url = str(request.base_url)
+    else:
+        static_log.warning("QR requested via untrusted host %r, using %s (set PUBLIC_BASE_URL)",
+                           request.url.hostname, QR_FALLBACK_BASE_URL)
+        base_url = QR_FALLBACK_BASE_URL
+    return [f"{base_url.rstrip('/')}/order?table={table_id}" for table_id in table_ids]
+
+async def stream_qr_zip(urls: List[str], box_size: int):
+    """모든 테이블의 QR 코드를 ZIP으로 스트리밍 (렌더링은 미리 모두 시작하고 테이블 순서대로 기록)"""
+    loads = [asyncio.ensure_future(qr_cache.get(url, box_size)) for url in urls]
+    buffer = ZipStreamBuffer()
+    try:
+        # PNG는 이미 압축되어 있으므로 다시 압축하지 않음
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_STORED) as zip_file:
+            for table_id, load in zip(TABLE_IDS, loads):
+                _, png = await load
+                zip_file.writestr(f"table_{table_id}_qr.png", png)
+                yield buffer.take()
+        yield buffer.take()  # 중앙 디렉터리
+    finally:
+        for load in loads:
+            load.cancel()
+
+# 메뉴 이미지
+# 업로드한 이미지는 이미지 처리 풀에서 폭별 WebP/JPEG로 변환해 내용 해시 이름으로 저장합니다.
+#   {해시}-{폭}.webp, {해시}-{폭}.jpg
+# image_filename에는 가장 큰 JPEG를, image_widths에는 만든 폭 목록을 저장하고 템플릿은 srcset으로 고릅니다.
+# image_widths가 없는 예전 이미지(원본 그대로 저장된 파일)는 시작할 때 한 번 변환합니다.
+MENU_IMAGE_MAX_BYTES = int(os.getenv("MENU_IMAGE_MAX_BYTES", str(10 * 1024 * 1024)))
+MENU_IMAGE_UPLOAD_PATHS = ("/admin/menu/add", "/admin/menu/update/")
+
+# 변형 파일 이름 ({내용 해시}-{폭}.webp|jpg). 변형은 저장소에 넣지 않고 원본에서 다시 만듭니다.
+MENU_IMAGE_VARIANT_PATTERN = re.compile(r"^[0-9a-f]{16}-\d+\.(webp|jpg)$")
+
+def menu_image_originals_by_digest(directory: str) -> Dict[str, str]:
+    """업로드 디렉토리의 원본(변형이 아닌) 이미지를 내용 해시 -> 경로로 (변형 파일명의 해시와 같은 방식)"""
+    originals = {}
+    for entry in os.scandir(directory):
+        if entry.is_file() and not MENU_IMAGE_VARIANT_PATTERN.match(entry.name):
+            with open(entry.path, "rb") as f:
+                originals[hashlib.sha256(f.read()).hexdigest()[:16]] = entry.path
+    return originals
+
+def menu_image_paths(image_filename: Optional[str], image_widths: Optional[List[int]]) -> List[str]:
+    """메뉴 이미지가 쓰는 파일 경로 (변형 전체, 예전 이미지는 원본 하나)"""
+    if not image_filename:
+        return []
+    if not image_widths:
+        return [os.path.join(UPLOAD_DIR, image_filename)]
+    digest = image_filename.rsplit("-", 1)[0]
+    return [
+        os.path.join(UPLOAD_DIR, f"{digest}-{width}.{extension}")
+        for width in image_widths for extension in ("webp", "jpg")
+    ]
+
+def remove_menu_image(db: Session, item_id: int, image_filename: Optional[str], image_widths: Optional[List[int]]):
+    """메뉴의 이미지 파일 삭제 (같은 내용의 이미지를 다른 메뉴가 쓰고 있으면 남겨 둠)"""
+    if not image_filename:
+        return
+    shared = db.query(MenuItem.id).filter(
+        MenuItem.image_filename == image_filename, MenuItem.id != item_id
+    ).first()
+    if shared:
+        return
+    for path in menu_image_paths(image_filename, image_widths):
+        if os.path.exists(path):
+            os.remove(path)
+
+def discard_menu_upload(db: Session, item_id: int, image_filename: Optional[str], image_widths: Optional[List[int]]):
+    """DB에 저장하지 못한 업로드 이미지의 변형 삭제 (변환은 커밋 전에 하므로 실패하면 파일만 남음)
+
+    같은 내용의 이미지를 이미 쓰는 메뉴가 있으면 남겨 둡니다. 새 메뉴는 아직 ID가 없으므로 item_id에 0을 넘깁니다.
+    """
+    try:
+        remove_menu_image(db, item_id, image_filename, image_widths)
+    except Exception:
+        menu_log.exception("Failed to remove unsaved menu image %s", image_filename)
+
+async def read_menu_upload(image: UploadFile) -> bytes:
+    """업로드 파일을 MENU_IMAGE_MAX_BYTES까지만 읽음"""
+    if not image.content_type or not image.content_type.startswith("image/"):
+        raise HTTPException(status_code=400, detail="이미지 파일만 업로드 가능합니다.")
+    data = await image.read(MENU_IMAGE_MAX_BYTES + 1)
+    if len(data) > MENU_IMAGE_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="이미지 파일이 너무 큽니다.")
+    return data
+
+async def save_menu_upload(image: UploadFile) -> Tuple[str, List[int]]:
+    """업로드 이미지를 변환해 저장하고 (image_filename, image_widths) 반환"""
+    data = await read_menu_upload(image)
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(image_executor, process_menu_image, data, UPLOAD_DIR)
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+        menu_log.info("Rejected menu image %r: %s", image.filename, e)
+        raise HTTPException(status_code=400, detail="이미지를 읽을 수 없습니다.")
+
+class UploadSizeLimitMiddleware:
+    """메뉴 이미지 업로드 요청 본문을 받는 동안 크기를 세어 한도를 넘으면 바로 413으로 중단
+
+    본문 전체를 임시 파일에 받은 뒤가 아니라 받는 도중에 끊으므로 큰 파일이 디스크를 채우지 않습니다.
+    """
+
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or not scope["path"].startswith(MENU_IMAGE_UPLOAD_PATHS):
+            await self.app(scope, receive, send)
+            return
+
+        declared = dict(scope["headers"]).get(b"content-length")
+        received = 0
+
+        async def receive_limited():
+            nonlocal received
+            if declared is not None and int(declared) > self.max_bytes:
+                raise HTTPException(status_code=413, detail="이미지 파일이 너무 큽니다.")
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise HTTPException(status_code=413, detail="이미지 파일이 너무 큽니다.")
+            return message
+
+        await self.app(scope, receive_limited, send)
+
+# 이미지 외 폼 필드 몫으로 여유를 둠
+app.add_middleware(UploadSizeLimitMiddleware, max_bytes=MENU_IMAGE_MAX_BYTES + 64 * 1024)
+
+async def migrate_legacy_menu_images():
+    """image_widths가 없는 예전 메뉴 이미지를 변형으로 변환 (시작할 때 백그라운드로 한 번, 원본 파일은 남겨 둠)
+
+    변환된 메뉴인데 변형 파일이 없으면 (새로 받은 저장소나 새 배포 이미지) 같은 내용의 원본에서 다시 만듭니다.
+    """
+    def load_legacy():
+        with SessionLocal() as db:
+            return db.query(MenuItem.id, MenuItem.image_filename).filter(
+                MenuItem.image_filename.isnot(None), MenuItem.image_widths.is_(None)
+            ).all()
+
+    def load_missing_digests():
+        with SessionLocal() as db:
+            rows = db.query(MenuItem.image_filename, MenuItem.image_widths).filter(
+                MenuItem.image_filename.isnot(None), MenuItem.image_widths.isnot(None)
+            ).all()
+        return {
+            image_filename.rsplit("-", 1)[0] for image_filename, image_widths in rows
+            if not all(os.path.exists(path) for path in menu_image_paths(image_filename, image_widths))
+        }
+
+    loop = asyncio.get_running_loop()
+
+    async def regenerate_missing():
+        missing = await run_db(load_missing_digests)
+        if not missing:
+            return
+        originals = await loop.run_in_executor(None, menu_image_originals_by_digest, UPLOAD_DIR)
+        regenerated = [
+            loop.run_in_executor(image_executor, process_menu_image_file, originals[digest], UPLOAD_DIR)
+            for digest in missing if digest in originals
+        ]
+        await asyncio.gather(*regenerated)
+        if len(regenerated) < len(missing):
+            menu_log.warning("No original image for %d menu image variant sets", len(missing) - len(regenerated))
+        menu_log.info("Regenerated %d menu image variant sets", len(regenerated))
+
+    async def convert(filename: str):
+        try:
+            return await loop.run_in_executor(
+                image_executor, process_menu_image_file, os.path.join(UPLOAD_DIR, filename), UPLOAD_DIR
+            )
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError) as e:
+            menu_log.warning("Could not convert menu image %s: %s", filename, e)
+            return None
+
+    def save(converted):
+        with SessionLocal() as db:
+            for item_id, (image_filename, image_widths) in converted.items():
+                db.execute(
+                    update(MenuItem)
+                    .where(MenuItem.id == item_id, MenuItem.image_widths.is_(None))
+                    .values(image_filename=image_filename, image_widths=image_widths)
+                )
+            db.commit()
+            menu_cache.refresh(db)
+
+    try:
+        await regenerate_missing()
+        legacy = await run_db(load_legacy)
+        results = await asyncio.gather(*(convert(filename) for _, filename in legacy))
+        converted = {item_id: result for (item_id, _), result in zip(legacy, results) if result}
+        if not converted:
+            return
+        await run_db(save, converted)
+        menu_log.info("Converted %d legacy menu images", len(converted))
+        await manager.publish([CHANNEL_MENU], {"type": "menu_updated", "version": menu_cache.version})
+    except Exception:
+        menu_log.exception("Legacy menu image conversion failed")
+
+@app.get("/", response_class=HTMLResponse)
+async def home(request: Request):
+    return templates.TemplateResponse("index.html", {"request": request})
+
+# 최근 채팅 캐시
+# 채팅 화면과 폴링은 거의 항상 "최근 N개"나 "특정 id 이후"만 요청하므로, 최근 전체 메시지와
+# 테이블별 개인 메시지를 메모리에 두고 SQL 없이 응답합니다. 그보다 오래된 기록만 DB에서 읽습니다.
+CHAT_GLOBAL_CACHE_SIZE = int(os.getenv("CHAT_GLOBAL_CACHE_SIZE", "200"))
+CHAT_PRIVATE_CACHE_SIZE = int(os.getenv("CHAT_PRIVATE_CACHE_SIZE", "50"))  # 테이블별
+CHAT_PRIVATE_WARM_LIMIT = 1000  # 시작 시 캐시에 채우는 최근 개인 메시지 수 (전체 테이블 합계)
+
+def chat_message_view(msg: ChatMessage) -> Dict[str, Any]:
+    """채팅 메시지 API/WebSocket 응답 형식"""
+    return {
+        "id": msg.id,
+        "table_id": msg.table_id,
+        "nickname": msg.nickname,
+        "message": msg.message,
+        "created_at": msg.created_at.isoformat(),
+        "formatted_time": to_kst_filter(msg.created_at),
+        "is_private": not msg.is_global,
+        "target_table_id": msg.target_table_id
+    }
+
+def chat_message_id(message: Dict[str, Any]) -> int:
+    return message["id"]
+
+class ChatTail:
+    """id 순으로 정렬된 최근 메시지 목록
+
+    floor보다 큰 id의 메시지는 빠짐없이 들어 있습니다. 가득 차서 오래된 메시지가
+    밀려나면 floor가 그 id로 올라갑니다.
+    """
+
+    def __init__(self, size: int, floor: int):
+        self.messages: deque = deque(maxlen=size)
+        self.floor = floor
+
+    def add(self, message: Dict[str, Any]):
+        message_id = message["id"]
+        if message_id <= self.floor:
+            return
+        # 보통은 맨 뒤에 붙지만, 다른 워커에서 온 메시지는 조금 늦게 도착할 수 있음
+        position = bisect.bisect_left(self.messages, message_id, key=chat_message_id)
+        if position < len(self.messages) and self.messages[position]["id"] == message_id:
+            return
+        if len(self.messages) == self.messages.maxlen:
+            if position == 0:
+                self.floor = message_id
+                return
+            self.floor = self.messages.popleft()["id"]
+            position -= 1
+        self.messages.insert(position, message)
+
+class ChatCache:
+    """최근 전체 채팅과 테이블별 개인 메시지 (이벤트 루프에서만 사용)
+
+    /chat/send가 저장한 메시지를 바로 추가하고, 다른 워커에서 보낸 메시지는
+    백플레인으로 받은 chat_message 이벤트로 추가합니다.
+    """
+
+    def __init__(self):
+        self.global_tail = ChatTail(CHAT_GLOBAL_CACHE_SIZE, 0)
+        self.private_tails: Dict[int, ChatTail] = {}
+        self.private_floor = 0  # 시작 시 읽은 범위보다 오래된 개인 메시지는 캐시에 없음
+
+    def warm(self, db: Session):
+        """DB에서 최근 메시지를 읽어 캐시를 채움"""
+        global_rows = db.query(ChatMessage).filter(
+            ChatMessage.is_global == True
+        ).order_by(ChatMessage.id.desc()).limit(CHAT_GLOBAL_CACHE_SIZE).all()
+        private_rows = db.query(ChatMessage).filter(
+            ChatMessage.is_global == False
+        ).order_by(ChatMessage.id.desc()).limit(CHAT_PRIVATE_WARM_LIMIT).all()
+
+        self.global_tail = ChatTail(
+            CHAT_GLOBAL_CACHE_SIZE,
+            global_rows[-1].id - 1 if len(global_rows) == CHAT_GLOBAL_CACHE_SIZE else 0
+        )
+        self.private_tails = {}
+        self.private_floor = private_rows[-1].id - 1 if len(private_rows) == CHAT_PRIVATE_WARM_LIMIT else 0
+        for row in reversed(global_rows + private_rows):
+            self.add(chat_message_view(row))
+
+    def _private_tail(self, table_id: int) -> ChatTail:
+        tail = self.private_tails.get(table_id)
+        if tail is None:
+            tail = self.private_tails[table_id] = ChatTail(CHAT_PRIVATE_CACHE_SIZE, self.private_floor)
+        return tail
+
+    def add(self, message: Dict[str, Any]):
+        if message["is_private"]:
+            for table_id in {message["table_id"], message["target_table_id"]}:
+                self._private_tail(table_id).add(message)
+        else:
+            self.global_tail.add(message)
+
+    def ingest(self, message: str):
+        """다른 워커에서 발행된 채팅 이벤트를 캐시에 추가"""
+        event = json.loads(message)
+        if event.pop("type", None) == "chat_message":
+            self.add(event)
+
+    def query(self, table_id: Optional[int], limit: int, before_id: Optional[int] = None,
+              after_id: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        """캐시만으로 답할 수 있으면 id 오름차순 메시지 목록, 아니면 None (DB 조회 필요)"""
+        tails = [self.global_tail]
+        if table_id:
+            tails.append(self.private_tails.get(table_id) or ChatTail(0, self.private_floor))
+        floor = max(tail.floor for tail in tails)  # 이보다 큰 id는 모두 캐시에 있음
+        if after_id is not None and after_id < floor:
+            return None
+        lower = max(floor, after_id or 0)
+        messages = [
+            message for message in heapq.merge(*(tail.messages for tail in tails), key=chat_message_id)
+            if message["id"] > lower and (before_id is None or message["id"] < before_id)
+        ]
+        if after_id is not None:
+            return messages[:limit]
+        if len(messages) >= limit or floor == 0:
+            return messages[max(len(messages) - limit, 0):]
+        return None
+
+chat_cache = ChatCache()
+
+with SessionLocal() as init_db:
+    chat_cache.warm(init_db)
+
+async def load_chat_messages(db: Session, table_id: Optional[int], limit: int, before_id: Optional[int] = None,
+                             after_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """채팅 메시지 조회 (전체 메시지 + 해당 테이블과 관련된 개인 메시지), id 오름차순"""
+    before_id, after_id = before_id or None, after_id or None
+    messages = chat_cache.query(table_id, limit, before_id, after_id)
+    if messages is not None:
+        return messages
+
+    # 캐시보다 오래된 기록은 DB에서 id 기준으로 페이지 조회
+    if table_id:
+        query = db.query(ChatMessage).filter(
+            (ChatMessage.is_global == True) |  # 전체 메시지
+            (ChatMessage.table_id == table_id) |  # 내가 보낸 개인 메시지
+            (ChatMessage.target_table_id == table_id)  # 나에게 온 개인 메시지
+        )
+    else:
+        # table_id가 없으면 전체 메시지만
+        query = db.query(ChatMessage).filter(ChatMessage.is_global == True)
+
+    if before_id:
+        query = query.filter(ChatMessage.id < before_id)
+
+    if after_id:
+        query = query.filter(ChatMessage.id > after_id)
+
+    # after_id가 지정된 경우 그 다음부터, 그렇지 않으면 가장 최근부터
+    if after_id:
+        rows = await run_db(query.order_by(ChatMessage.id.asc()).limit(limit).all)
+    else:
+        rows = await run_db(query.order_by(ChatMessage.id.desc()).limit(limit).all)
+        rows.reverse()  # 시간 순으로 정렬
+    return [chat_message_view(row) for row in rows]
+
+# 채팅 페이지(구현 예정정)
+@app.get("/chat", response_class=HTMLResponse)
+async def chat(request: Request):
+    return templates.TemplateResponse("chat.html", {"request": request})
+
+@app.post("/chat/send")
+async def send_chat_message(
+    request: Request,
+    table_id: int = Form(...),
+    message: str = Form(...),
+    nickname: str = Form(None),
+    target_table_id: int = Form(None),  # 개인 메시지 대상 테이블 ID
+    db: Session = Depends(get_db)
+):
+    """채팅 메시지 전송 (전체 채팅 또는 개인 메시지)"""
+    try:
+        # 닉네임 설정 (없으면 기본값)
+        if nickname:
+            manager.set_nickname(table_id, nickname)
+            display_nickname = nickname
+        else:
+            display_nickname = manager.get_nickname(table_id)
+        
+        # 개인 메시지인지 전체 메시지인지 판단
+        is_private = target_table_id is not None
+        
+        # 메시지를 데이터베이스에 저장
+        chat_message = ChatMessage(
+            table_id=table_id,
+            message=message,
+            nickname=display_nickname,
+            is_global=not is_private,  # 개인 메시지면 False, 전체 메시지면 True
+            target_table_id=target_table_id if is_private else None
+        )
+
+        def save():
+            db.add(chat_message)
+            db.commit()
+            db.refresh(chat_message)
+
+        await run_db(save)
+        message_view = chat_message_view(chat_message)
+        chat_cache.add(message_view)
+        
+        # WebSocket으로 실시간 전송
+        message_data = {"type": "chat_message", **message_view}
+        
+        if is_private:
+            # 개인 메시지인 경우 보낸 사람과 받는 사람에게만 전송
+            await manager.publish([table_channel(table_id), table_channel(target_table_id)], message_data)
+        else:
+            # 전체 메시지인 경우 공개 채팅 구독자에게 전송
+            await manager.publish([CHANNEL_CHAT_GLOBAL], message_data)
+        
+        return {"success": True, "message_id": chat_message.id, "is_private": is_private}
+    except Exception as e:
+        await run_db(db.rollback)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/chat/messages")
+async def get_chat_messages(
+    table_id: int = None,  # 현재 사용자의 테이블 ID 추가
+    limit: int = 50,
+    before_id: int = None,
+    after_id: int = None,  # 특정 ID 이후의 메시지만 조회
+    db: Session = Depends(get_db)
+):
+    """채팅 메시지 목록 조회 (전체 메시지 + 관련된 개인 메시지)
+
+    최근 메시지와 after_id 이후 조회는 메모리 캐시에서, 더 오래된 기록만 DB에서 읽습니다.
+    """
+    return {"messages": await load_chat_messages(db, table_id, limit, before_id, after_id)}
+
+def parse_event_id(event_id: Optional[str]) -> Optional[Tuple[Optional[str], int]]:
+    """SSE 이벤트 id(epoch:seq)를 재연결 위치로 변환"""
+    epoch, _, seq = (event_id or "").rpartition(":")
+    return (epoch, int(seq)) if seq.isdigit() else None
+
+@app.get("/chat/events")
+async def chat_events(request: Request, table_id: int, last_seq: Optional[int] = None, epoch: Optional[str] = None):
+    """WebSocket을 쓸 수 없을 때의 채팅 이벤트 스트림 (Server-Sent Events)
+
+    공개 채팅, 접속 상태, 자기 테이블 채널을 WebSocket과 같은 형식으로 보냅니다. 주기적으로
+    /chat/messages를 묻는 대신 새 이벤트가 생길 때만 응답이 이어집니다.
+    재연결 시 Last-Event-ID 헤더(또는 ?last_seq=&epoch=) 이후의 이벤트를 이어받습니다.
+    """
+    resume = parse_event_id(request.headers.get("last-event-id"))
+    if resume is None and last_seq is not None:
+        resume = (epoch, last_seq)
+    connection = manager.open_stream(table_id, [CHANNEL_CHAT_GLOBAL, CHANNEL_PRESENCE, table_channel(table_id)], resume)
+
+    async def stream():
+        try:
+            async for frame in connection.frames():
+                yield frame
+        finally:
+            manager.close_stream(connection)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"  # 프록시가 응답을 모아 보내지 않도록
+    })
+
+@app.get("/chat/online-tables", response_model=OnlineTablesResponse)
+async def get_online_tables(request: Request, response: Response):
+    """현재 온라인인 테이블 목록 조회
+
+    접속 상태 버전으로 ETag를 붙이므로, 바뀐 것이 없으면 304로 응답합니다.
+    (변경은 WebSocket presence 채널로도 전달됨)
+    """
+    etag = f'"{manager.event_log.epoch}-{manager.presence_version}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return OnlineTablesResponse(
+        version=manager.presence_version,
+        online_tables=[
+            OnlineTableInfo(table_id=table_id, nickname=nickname)
+            for table_id, nickname in manager.presence.items()
+        ]
+    )
+
+@app.get("/chat/{table_id}", response_class=HTMLResponse)
 async def chat_with_table(request: Request, table_id: int, db: Session = Depends(get_db)):
     """특정 테이블 번호로 채팅 페이지 접속"""
     # 최근 채팅 메시지 조회 (최근 50개)
-    recent_messages = db.query(ChatMessage).filter(
-        ChatMessage.is_global == True
-    ).order_by(ChatMessage.created_at.desc()).limit(50).all()
-    recent_messages.reverse()  # 시간 순으로 정렬
+    recent_messages = await load_chat_messages(db, None, 50)
     
     # 현재 온라인인 테이블 목록
     online_tables = manager.get_online_tables()
@@ -668,70 +1908,109 @@ async def chat_with_table(request: Request, table_id: int, db: Session = Depends
     })
 
 @app.get("/generate-qr/{table_id}")
-async def generate_table_qr(table_id: int, request: Request):
-    """특정 테이블의 QR 코드를 생성하고 다운로드합니다."""
-    base_url = request.base_url
-    order_url = f"{base_url}order?table={table_id}"
-    qr_path = generate_qr_code(order_url, table_id)
-    
-    return FileResponse(
-        qr_path,
-        media_type="image/png",
-        filename=f"table_{table_id}_qr.png"
-    )
+async def generate_table_qr(
+    table_id: int,
+    request: Request,
+    size: int = QR_DEFAULT_BOX_SIZE
+):
+    """특정 테이블의 QR 코드를 다운로드합니다. (size: QR 한 칸의 픽셀 수)"""
+    if table_id not in TABLE_IDS:
+        raise HTTPException(status_code=404, detail="Table not found")
+    if not 1 <= size <= QR_MAX_BOX_SIZE:
+        raise HTTPException(status_code=400, detail="Invalid QR size")
+    key, png = await qr_cache.get(table_order_urls(request, [table_id])[0], size)
+    etag = f'"{key}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    headers["Content-Disposition"] = f'attachment; filename="table_{table_id}_qr.png"'
+    return Response(png, media_type="image/png", headers=headers)
 
 @app.get("/generate-all-qr")
-async def generate_all_qr(request: Request):
-    """모든 테이블의 QR 코드를 생성하고 ZIP 파일로 다운로드합니다."""
-    import zipfile
-    import tempfile
-    import os
-    
-    # 임시 디렉토리 생성
-    temp_dir = tempfile.mkdtemp()
-    try:
-        # 임시 ZIP 파일 생성
-        zip_path = os.path.join(temp_dir, "table_qr_codes.zip")
-        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            base_url = request.base_url
-            for table_id in range(1, 51):
-                order_url = f"{base_url}order?table={table_id}"
-                qr_path = generate_qr_code(order_url, table_id)
-                # ZIP 파일에 추가할 때 파일 이름만 사용
-                zip_file.write(qr_path, f"table_{table_id}_qr.png")
-        
-        # FileResponse 생성 시 임시 디렉토리 경로를 background_tasks에 추가
-        response = FileResponse(
-            zip_path,
-            media_type="application/zip",
-            filename="table_qr_codes.zip",
-            background=BackgroundTasks()
-        )
-        
-        # 응답이 완료된 후 임시 디렉토리 삭제
-        response.background.add_task(shutil.rmtree, temp_dir)
-        
-        return response
-    except Exception as e:
-        # 오류 발생 시 임시 디렉토리 삭제
-        shutil.rmtree(temp_dir)
-        raise HTTPException(status_code=500, detail=str(e))
+async def generate_all_qr(
+    request: Request,
+    format: str = "zip",
+    size: int = QR_DEFAULT_BOX_SIZE
+):
+    """모든 테이블의 QR 코드를 ZIP으로 다운로드하거나 (format=sheet) 인쇄용 페이지로 보여줍니다."""
+    if format not in ("zip", "sheet") or not 1 <= size <= QR_MAX_BOX_SIZE:
+        raise HTTPException(status_code=400, detail="Invalid QR format or size")
+    if format == "sheet":
+        return templates.TemplateResponse("qr_sheet.html", {
+            "request": request,
+            "table_ids": TABLE_IDS,
+            "size": size
+        })
 
-@app.get("/order", response_class=HTMLResponse)
-async def order_page(request: Request, table: int, db: Session = Depends(get_db)):
-    menu_item_details_for_js, menu_names_by_id, menu_items_grouped_by_category, category_display_names = get_menu_data(db)
-    
-    return templates.TemplateResponse(
-        "order.html",
-        {
-            "request": request, 
-            "table_id": table, 
-            "menu_items_by_category": menu_items_grouped_by_category,
-            "category_display_names": category_display_names,
-            "menu_item_details_for_js": menu_item_details_for_js
-        }
+    urls = table_order_urls(request, TABLE_IDS)
+    return StreamingResponse(
+        stream_qr_zip(urls, size),
+        media_type="application/zip",
+        headers={"Content-Disposition": 'attachment; filename="table_qr_codes.zip"'}
+    )
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match에 이 ETag가 있는지"""
+    if_none_match = request.headers.get("if-none-match")
+    return if_none_match is not None and (
+        if_none_match.strip() == "*" or etag in (tag.strip() for tag in if_none_match.split(","))
     )
 
+# 주문 페이지 캐시
+# /order에서 테이블마다 다른 값은 테이블 번호뿐이므로, 메뉴 스냅샷마다 테이블 번호 자리에 표시를 넣어
+# 한 번만 렌더링하고 표시를 기준으로 나눈 바이트 조각을 보관합니다. 요청마다 테이블 번호로 이어 붙이기만 합니다.
+# ETag는 렌더링 결과의 해시 + 테이블 번호라서 메뉴 캐시 버전이 다른 워커끼리도 같은 내용이면 같은 값입니다.
+ORDER_PAGE_TABLE_SLOT = "__ORDER_PAGE_TABLE_ID__"
+
+class OrderPageCache:
+    """메뉴 스냅샷별로 미리 렌더링한 order.html 조각과 내용 해시"""
+
+    def __init__(self):
+        self._cached: Optional[Tuple[int, List[bytes], str]] = None  # (메뉴 버전, 조각, 해시)
+
+    def get(self, snapshot: MenuSnapshot) -> Tuple[List[bytes], str]:
+        cached = self._cached
+        if cached is None or cached[0] != snapshot.version:
+            body = templates.get_template("order.html").render(
+                table_id=ORDER_PAGE_TABLE_SLOT,
+                menu_items_by_category=snapshot.menu_items_grouped_by_category,
+                category_display_names=snapshot.category_display_names,
+                menu_item_details_for_js=snapshot.menu_item_details_for_js
+            ).encode("utf-8")
+            cached = (snapshot.version, body.split(ORDER_PAGE_TABLE_SLOT.encode()), hashlib.sha256(body).hexdigest()[:20])
+            self._cached = cached
+        return cached[1], cached[2]
+
+order_page_cache = OrderPageCache()
+
+@app.get("/order", response_class=HTMLResponse)
+async def order_page(request: Request, table: int):
+    """주문 페이지 (메뉴 버전별로 캐시된 페이지에 테이블 번호만 넣음, DB 조회 없음)"""
+    snapshot = menu_cache.current
+    if snapshot is None:
+        def load():
+            with SessionLocal() as db:
+                return menu_cache.get(db)
+        snapshot = await run_db(load)
+
+    if not table:
+        # 테이블 0번은 base.html에서 채팅 링크가 달라지므로 캐시 없이 렌더링
+        return templates.TemplateResponse("order.html", {
+            "request": request,
+            "table_id": table,
+            "menu_items_by_category": snapshot.menu_items_grouped_by_category,
+            "category_display_names": snapshot.category_display_names,
+            "menu_item_details_for_js": snapshot.menu_item_details_for_js
+        })
+
+    parts, digest = order_page_cache.get(snapshot)
+    etag = f'"{digest}-{table}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(str(table).encode().join(parts), headers=headers)
+
 @app.post("/submit_order")
 async def submit_order(
     request: Request,
@@ -740,14 +2019,11 @@ async def submit_order(
     db: Session = Depends(get_db)
 ):
     try:
-        print(f"Received order request - table_id: {table_id}, menu: {menu}")
-        
         # 1. 메뉴 데이터 가져오기
         try:
             menu_item_details_for_js, menu_names_by_id, menu_items_grouped_by_category, category_display_names = get_menu_data(db)
-            print(f"Retrieved menu data - items: {menu_item_details_for_js}, names: {menu_names_by_id}")
-        except Exception as e:
-            print(f"Error getting menu data: {str(e)}")
+        except Exception:
+            orders_log.exception("Error getting menu data")
             raise HTTPException(status_code=500, detail="Failed to retrieve menu data")
         
         # 2. 주문 메뉴 파싱 및 유효성 검사
@@ -755,12 +2031,11 @@ async def submit_order(
             order_menu = json.loads(menu)
             if not isinstance(order_menu, dict):
                 raise ValueError("Menu data must be a dictionary")
-            print(f"Parsed order menu: {order_menu}")
         except json.JSONDecodeError as e:
-            print(f"Invalid JSON format: {str(e)}")
+            orders_log.info("Invalid JSON format in order from table %s: %s", table_id, e)
             raise HTTPException(status_code=400, detail="Invalid menu data format")
         except ValueError as e:
-            print(f"Invalid menu data structure: {str(e)}")
+            orders_log.info("Invalid menu data structure from table %s: %s", table_id, e)
             raise HTTPException(status_code=400, detail=str(e))
         
         # 3. 주문 금액 계산 및 메뉴 유효성 검사
@@ -771,96 +2046,91 @@ async def submit_order(
             try:
                 quantity = int(quantity)
                 if quantity <= 0:
-                    print(f"Warning: Invalid quantity {quantity} for item {item_id}")
+                    orders_log.info("Invalid quantity %s for item %s", quantity, item_id)
                     continue
                     
                 # item_id를 문자열로 변환하여 메뉴 아이템 조회
                 item = menu_item_details_for_js.get(str(item_id))
                 if not item:
-                    print(f"Warning: Menu item not found for ID {item_id}")
+                    orders_log.info("Menu item not found for ID %s", item_id)
                     continue
                     
                 if not item['is_active']:
-                    print(f"Warning: Menu item {item_id} is not active")
+                    orders_log.info("Menu item %s is not active", item_id)
                     continue
                 
                 item_total = item['price'] * quantity
                 total_amount += item_total
                 valid_order_items[item_id] = quantity
-                print(f"Added item {item_id}: {quantity} x {item['price']} = {item_total}")
                 
             except (ValueError, TypeError) as e:
-                print(f"Error processing item {item_id}: {str(e)}")
+                orders_log.info("Skipping order item %s: %s", item_id, e)
                 continue
         
         if not valid_order_items:
             raise HTTPException(status_code=400, detail="No valid items in order")
         
-        print(f"Final order items: {valid_order_items}")
-        print(f"Calculated total amount: {total_amount}")
-        
         # 4. 주문 생성 및 메뉴 분해
-        try:
-            # 기본 주문 생성
-            order = Order(
-                table_id=table_id,
-                menu=valid_order_items,  # 원본 주문 정보 유지
-                amount=total_amount,
-                payment_status="pending"
-            )
-            db.add(order)
-            db.flush()  # ID 생성을 위해 flush
-            
-            # 세트 메뉴 분해 및 OrderItem 생성
+        def create_order():
+            # 세트 메뉴 분해 (메뉴 스냅샷의 전개표 사용)
             decomposed_items = decompose_set_menu(valid_order_items, db)
-            print(f"Decomposed items: {decomposed_items}")
-            
+            category_by_id = menu_cache.get(db).category_by_id
+
+            item_rows = []
             for item_data in decomposed_items:
                 # 특별 아이템 (menu_item_id가 None인 경우) 또는 상차림비는 자동으로 완료 처리
                 if item_data["menu_item_id"] is None:
                     cooking_status = "completed"
                     completed_at = get_kst_now()
+                elif category_by_id.get(item_data["menu_item_id"]) == "table":
+                    cooking_status = "completed"
+                    completed_at = datetime.utcnow()
                 else:
-                    # 상차림비인지 확인 (menu_item_id가 1)
-                    menu_item = db.query(MenuItem).filter(MenuItem.id == item_data["menu_item_id"]).first()
-                    if menu_item and menu_item.category == "table":
-                        cooking_status = "completed"
-                        completed_at = datetime.utcnow()
-                    else:
-                        cooking_status = "pending"
-                        completed_at = None
-                
-                order_item = OrderItem(
-                    order_id=order.id,
-                    menu_item_id=item_data["menu_item_id"],
-                    quantity=item_data["quantity"],
-                    cooking_status=cooking_status,
-                    completed_at=completed_at,
-                    is_set_component=item_data["is_set_component"],
-                    parent_set_name=item_data["parent_set_name"],
-                    notes=item_data.get("notes")
-                )
-                db.add(order_item)
-            
+                    cooking_status = "pending"
+                    completed_at = None
+                item_rows.append({**item_data, "cooking_status": cooking_status, "completed_at": completed_at})
+            kitchen_remaining_count = sum(row["cooking_status"] == "pending" for row in item_rows)
+
+            # 기본 주문 생성 (주방 진행 카운터는 아이템에서 미리 계산)
+            order = Order(
+                table_id=table_id,
+                menu=valid_order_items,  # 원본 주문 정보 유지
+                amount=total_amount,
+                payment_status="pending",
+                kitchen_status="cooking" if kitchen_remaining_count else "completed",
+                kitchen_remaining_count=kitchen_remaining_count,
+                kitchen_completed_count=0
+            )
+            db.add(order)
+            db.flush()  # ID 생성을 위해 flush
+
+            # 주문 아이템은 한 번의 INSERT로 추가
+            if item_rows:
+                db.execute(insert(OrderItem), [{**row, "order_id": order.id} for row in item_rows])
             db.commit()
             db.refresh(order)
-            print(f"Created order with ID: {order.id} and {len(decomposed_items)} order items")
-        except Exception as e:
-            print(f"Database error: {str(e)}")
-            db.rollback()
+            return order, decomposed_items
+
+        try:
+            order, decomposed_items = await run_db(create_order)
+            orders_created.inc("order")
+            orders_log.debug("Created order %s for table %s with %d order items", order.id, table_id, len(decomposed_items))
+        except Exception:
+            orders_log.exception("Failed to create order for table %s", table_id)
+            await run_db(db.rollback)
             raise HTTPException(status_code=500, detail="Failed to create order")
         
         # 5. WebSocket 알림 (실패해도 주문은 성공)
         try:
-            await manager.broadcast(json.dumps({
+            await manager.publish([CHANNEL_KITCHEN, CHANNEL_ADMIN_ORDERS, order_channel(order.id)], {
                 "type": "new_order",
                 "order_id": order.id,
                 "table_id": table_id,
                 "amount": total_amount
-            }))
-            print("WebSocket notification sent")
+            })
         except Exception as ws_error:
-            print(f"WebSocket error (non-critical): {str(ws_error)}")
+            orders_log.warning("WebSocket error (non-critical): %s", ws_error)
+        await publish_order_board(db, "order_added", order.id)
         
         # 6. 주문 성공 페이지 반환
         return templates.TemplateResponse(
@@ -875,171 +2145,132 @@ async def submit_order(
         
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Unexpected error in submit_order: {str(e)}")
-        print(f"Error type: {type(e)}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
-        db.rollback()
+    except Exception:
+        orders_log.exception("Unexpected error in submit_order")
+        await run_db(db.rollback)
         raise HTTPException(status_code=500, detail="Internal server error")
 
-@app.get("/admin/orders", response_class=HTMLResponse)
-async def admin_orders(
-    request: Request,
-    db: Session = Depends(get_db),
-    username: str = Depends(verify_admin)
-):
+BOARD_RECENT_LIMIT = 10  # 주방/주문 관리 화면의 최근 완료/취소 목록 길이
+
+def load_admin_orders_board(db: Session) -> Dict[str, Any]:
+    """주문 관리 화면의 목록들 (페이지 렌더링과 보드 스냅샷에서 함께 사용)"""
     # 메뉴 데이터 가져오기
     menu_item_details_for_js, menu_names_by_id, menu_items_grouped_by_category, category_display_names = get_menu_data(db)
-    
-    # 결제 대기 중인 주문 (취소되지 않은 것만)
+
+    # 결제 대기 중인 주문 (취소되지 않은 것만, 주문 순)
     pending_orders = db.query(Order).filter(
         Order.payment_status == "pending",
         Order.is_cancelled == False
-    ).all()
-    
+    ).order_by(Order.created_at.asc()).all()
+
     # 진행 중인 주문들 (조리가 필요한 아이템이 하나라도 조리 중이거나 대기중인 주문, 취소되지 않은 것만)
     cooking_orders = db.query(Order).filter(
         Order.payment_status == "confirmed",
-        Order.is_cancelled == False
-    ).join(OrderItem).join(MenuItem).filter(
-        OrderItem.cooking_status.in_(["pending", "cooking"]),
-        MenuItem.category != "table"  # 상차림비 제외
-    ).distinct().order_by(Order.confirmed_at.desc()).all()
-    
-    # 완전히 완료된 주문들 (실제 조리가 필요한 아이템들이 모두 완료된 주문)
+        Order.is_cancelled == False,
+        Order.kitchen_status == "cooking"
+    ).order_by(Order.confirmed_at.desc()).all()
+
+    # 완전히 완료된 주문들 (조리가 필요한 아이템(상차림비 제외)이 없거나 남은 아이템이 없는 주문)
     completed_orders = db.query(Order).filter(
         Order.payment_status == "confirmed",
-        Order.is_cancelled == False
-    ).outerjoin(OrderItem).outerjoin(MenuItem).group_by(Order.id).having(
-        # 조리가 필요한 아이템(상차림비 제외)이 없거나, 있다면 모두 완료되어야 함
-        (func.count(case(((OrderItem.menu_item_id.isnot(None)) & (MenuItem.category != "table"), 1), else_=None)) == 0) |
-        (func.count(case(((OrderItem.menu_item_id.isnot(None)) & (MenuItem.category != "table"), 1), else_=None)) == 
-         func.sum(case(((OrderItem.menu_item_id.isnot(None)) & (MenuItem.category != "table") & (OrderItem.cooking_status == "completed"), 1), else_=0)))
-    ).order_by(Order.confirmed_at.desc()).limit(10).all()
-    
+        Order.is_cancelled == False,
+        Order.kitchen_status == "completed"
+    ).order_by(Order.confirmed_at.desc()).limit(BOARD_RECENT_LIMIT).all()
+
     # 취소된 주문들 (최근 10개)
     cancelled_orders = db.query(Order).filter(
         Order.is_cancelled == True
-    ).order_by(Order.cancelled_at.desc()).limit(10).all()
-    
-    return templates.TemplateResponse(
-        "admin_orders.html",
-        {
-            "request": request,
-            "pending_orders": pending_orders,
-            "cooking_orders": cooking_orders,
-            "completed_orders": completed_orders,
-            "cancelled_orders": cancelled_orders,
-            "username": username,
-            "menu_names": menu_names_by_id
-        }
-    )
+    ).order_by(Order.cancelled_at.desc()).limit(BOARD_RECENT_LIMIT).all()
 
-@app.get("/admin/tables", response_class=HTMLResponse)
-async def admin_tables(
+    return {
+        "pending_orders": pending_orders,
+        "cooking_orders": cooking_orders,
+        "completed_orders": completed_orders,
+        "cancelled_orders": cancelled_orders,
+        "menu_names": menu_names_by_id
+    }
+
+@app.get("/admin/orders", response_class=HTMLResponse)
+async def admin_orders(
     request: Request,
     db: Session = Depends(get_db),
     username: str = Depends(verify_admin)
 ):
-    """테이블별 주문 현황 및 시간 확인 페이지"""
-    # 각 테이블의 최신 주문 정보와 통계를 가져오기
-    
-    # 테이블별 최신 주문 시간 조회
-    latest_orders_subquery = (
-        db.query(
-            Order.table_id,
-            func.max(Order.created_at).label('latest_order_time'),
-            func.count(Order.id).label('total_orders')
+    # 렌더링 전에 보드 버전을 읽어 두면, 렌더링 중에 생긴 변경은 페이지가 이 버전 이후로 다시 받아 적용
+    board = board_context(CHANNEL_ADMIN_ORDERS)
+
+    def render():
+        return templates.TemplateResponse(
+            "admin_orders.html",
+            {
+                "request": request,
+                **load_admin_orders_board(db),
+                **board,
+                "username": username
+            }
         )
-        .group_by(Order.table_id)
-        .subquery()
-    )
-    
-    # 테이블별 현재 상태 조회 (결제 대기, 조리 중, 완료 주문 수)
-    table_stats = []
-    
-    # 1번부터 50번까지 테이블 정보 조회
-    for table_id in range(1, 51):
-        # 최신 주문 정보
-        latest_order_info = db.query(latest_orders_subquery).filter(
-            latest_orders_subquery.c.table_id == table_id
-        ).first()
-        
-        # 현재 대기 중인 주문 수
-        pending_count = db.query(Order).filter(
-            Order.table_id == table_id,
-            Order.payment_status == "pending",
-            Order.is_cancelled == False
-        ).count()
-        
-        # 현재 조리 중인 주문 수
-        cooking_count = db.query(Order).filter(
-            Order.table_id == table_id,
-            Order.payment_status == "confirmed",
-            Order.is_cancelled == False
-        ).join(OrderItem).join(MenuItem).filter(
-            OrderItem.cooking_status.in_(["pending", "cooking"]),
-            MenuItem.category != "table"
-        ).distinct().count()
-        
-        # 전체 완료된 주문 수 (취소되지 않은 주문 중 조리가 필요한 아이템들이 모두 완료된 주문)
-        completed_total = db.query(Order).filter(
-            Order.table_id == table_id,
-            Order.payment_status == "confirmed",
-            Order.is_cancelled == False
-        ).outerjoin(OrderItem).outerjoin(MenuItem).group_by(Order.id).having(
-            (func.count(case(((OrderItem.menu_item_id.isnot(None)) & (MenuItem.category != "table"), 1), else_=None)) == 0) |
-            (func.count(case(((OrderItem.menu_item_id.isnot(None)) & (MenuItem.category != "table"), 1), else_=None)) == 
-             func.sum(case(((OrderItem.menu_item_id.isnot(None)) & (MenuItem.category != "table") & (OrderItem.cooking_status == "completed"), 1), else_=0)))
-        ).count()
-        
-        # 오늘 완료된 주문 수
-        today_start = get_kst_today_start()
-        completed_today = db.query(Order).filter(
-            Order.table_id == table_id,
-            Order.payment_status == "confirmed",
-            Order.is_cancelled == False,
-            Order.confirmed_at >= today_start
-        ).outerjoin(OrderItem).outerjoin(MenuItem).group_by(Order.id).having(
-            (func.count(case(((OrderItem.menu_item_id.isnot(None)) & (MenuItem.category != "table"), 1), else_=None)) == 0) |
-            (func.count(case(((OrderItem.menu_item_id.isnot(None)) & (MenuItem.category != "table"), 1), else_=None)) == 
-             func.sum(case(((OrderItem.menu_item_id.isnot(None)) & (MenuItem.category != "table") & (OrderItem.cooking_status == "completed"), 1), else_=0)))
-        ).count()
-        
-        # 취소된 주문 수
-        cancelled_count = db.query(Order).filter(
-            Order.table_id == table_id,
-            Order.is_cancelled == True
-        ).count()
-        
-        # 총 주문 금액 (완료된 주문만)
-        total_amount = db.query(func.sum(Order.amount)).filter(
-            Order.table_id == table_id,
-            Order.payment_status == "confirmed",
-            Order.is_cancelled == False
-        ).scalar() or 0
-        
-        # 온라인 상태 확인
-        is_online = table_id in manager.get_online_tables()
-        nickname = manager.get_nickname(table_id) if is_online else None
-        
-        table_stats.append({
+
+    return await run_db(render)
+
+def get_table_order_stats(db: Session, table_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """테이블별 주문 통계를 집합 기반 쿼리 한 번으로 계산합니다.
+
+    반환값은 table_id를 키로 하는 딕셔너리이며, 주문이 없는 테이블은 0/None 값으로 채워집니다.
+    """
+    table_ids = list(table_ids)
+    stats = {
+        table_id: {
             'table_id': table_id,
-            'latest_order_time': latest_order_info.latest_order_time if latest_order_info else None,
-            'total_orders': latest_order_info.total_orders if latest_order_info else 0,
-            'pending_count': pending_count,
-            'cooking_count': cooking_count,
-            'completed_total': completed_total,
-            'completed_today': completed_today,
-            'cancelled_count': cancelled_count,
-            'total_amount': total_amount,
-            'is_online': is_online,
-            'nickname': nickname
-        })
-    
-    # 요약 통계 계산
-    summary_stats = {
+            'latest_order_time': None,
+            'total_orders': 0,
+            'pending_count': 0,
+            'cooking_count': 0,
+            'completed_total': 0,
+            'completed_today': 0,
+            'cancelled_count': 0,
+            'total_amount': 0
+        }
+        for table_id in table_ids
+    }
+    if not table_ids:
+        return stats
+
+    is_pending = (Order.payment_status == "pending") & (Order.is_cancelled == False)
+    is_confirmed = (Order.payment_status == "confirmed") & (Order.is_cancelled == False)
+    is_completed = is_confirmed & (Order.kitchen_status == "completed")
+    today_start = get_kst_today_start()
+
+    rows = db.query(
+        Order.table_id,
+        func.max(Order.created_at),
+        func.count(Order.id),
+        func.sum(case((is_pending, 1), else_=0)),
+        func.sum(case((is_confirmed & (Order.kitchen_status == "cooking"), 1), else_=0)),
+        func.sum(case((is_completed, 1), else_=0)),
+        func.sum(case((is_completed & (Order.confirmed_at >= today_start), 1), else_=0)),
+        func.sum(case((Order.is_cancelled == True, 1), else_=0)),
+        func.sum(case((is_confirmed, Order.amount), else_=0))
+    ).filter(
+        Order.table_id.in_(table_ids)
+    ).group_by(Order.table_id).all()
+
+    for (table_id, latest_order_time, total_orders, pending_count, cooking_count,
+         completed_total, completed_today, cancelled_count, total_amount) in rows:
+        table = stats[table_id]
+        table['latest_order_time'] = latest_order_time
+        table['total_orders'] = total_orders
+        table['pending_count'] = pending_count or 0
+        table['cooking_count'] = cooking_count or 0
+        table['completed_total'] = completed_total or 0
+        table['completed_today'] = completed_today or 0
+        table['cancelled_count'] = cancelled_count or 0
+        table['total_amount'] = total_amount or 0
+
+    return stats
+
+def summarize_table_stats(table_stats: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """테이블별 통계 목록으로부터 요약 통계를 계산"""
+    return {
         'online_count': sum(1 for table in table_stats if table['is_online']),
         'pending_total': sum(table['pending_count'] for table in table_stats),
         'cooking_total': sum(table['cooking_count'] for table in table_stats),
@@ -1050,13 +2281,37 @@ async def admin_tables(
         'total_orders_sum': sum(table['total_orders'] for table in table_stats),
         'total_revenue': sum(table['total_amount'] for table in table_stats)
     }
-    
+
+def attach_table_presence(table: Dict[str, Any], online_tables: set) -> Dict[str, Any]:
+    """테이블 통계에 온라인 여부와 닉네임(온라인일 때만)을 채움"""
+    table['is_online'] = table['table_id'] in online_tables
+    table['nickname'] = manager.get_nickname(table['table_id']) if table['is_online'] else None
+    return table
+
+@app.get("/admin/tables", response_class=HTMLResponse)
+async def admin_tables(
+    request: Request,
+    db: Session = Depends(get_db),
+    username: str = Depends(verify_admin)
+):
+    """테이블별 주문 현황 및 시간 확인 페이지"""
+    board = board_context(CHANNEL_ADMIN_TABLES)
+    stats_by_table = await run_db(get_table_order_stats, db, TABLE_IDS)
+
+    # 온라인 상태 확인
+    online_tables = set(manager.get_online_tables())
+    table_stats = [attach_table_presence(stats_by_table[table_id], online_tables) for table_id in TABLE_IDS]
+
+    # 요약 통계 계산
+    summary_stats = summarize_table_stats(table_stats)
+
     return templates.TemplateResponse(
         "admin_tables.html",
         {
             "request": request,
             "table_stats": table_stats,
             "summary_stats": summary_stats,
+            **board,
             "username": username
         }
     )
@@ -1067,18 +2322,24 @@ async def confirm_order(
     db: Session = Depends(get_db),
     username: str = Depends(verify_admin)
 ):
-    order = db.query(Order).filter(Order.id == order_id).first()
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
-    
-    if order.is_cancelled:
-        raise HTTPException(status_code=400, detail="Cannot confirm a cancelled order")
-    
-    order.payment_status = "confirmed"
-    order.confirmed_at = get_kst_now()
-    db.commit()
-    
-    return RedirectResponse(url="/admin/orders", status_code=303)
+    def confirm():
+        order = db.query(Order).filter(Order.id == order_id).first()
+        if not order:
+            raise HTTPException(status_code=404, detail="Order not found")
+
+        if order.is_cancelled:
+            raise HTTPException(status_code=400, detail="Cannot confirm a cancelled order")
+
+        order.payment_status = "confirmed"
+        order.confirmed_at = get_kst_now()
+        db.commit()
+
+        return RedirectResponse(url="/admin/orders", status_code=303)
+
+    response = await run_db(confirm)
+    orders_confirmed.inc()
+    await publish_order_board(db, "order_confirmed", order_id)
+    return response
 
 @app.post("/admin/orders/cancel/{order_id}")
 async def cancel_order(
@@ -1088,41 +2349,46 @@ async def cancel_order(
     username: str = Depends(verify_admin)
 ):
     """전체 주문 취소"""
-    order = db.query(Order).filter(Order.id == order_id).first()
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
-    
-    if order.payment_status == "confirmed":
-        # 결제 완료된 주문은 조리 시작 전에만 취소 가능
-        cooking_items = [item for item in order.order_items if item.cooking_status == "cooking"]
-        if cooking_items:
-            raise HTTPException(status_code=400, detail="Cannot cancel order with items already cooking")
-    
-    # 주문 취소 처리
-    order.is_cancelled = True
-    order.payment_status = "cancelled"
-    order.cancelled_at = get_kst_now()
-    order.cancellation_reason = reason or "관리자에 의한 취소"
-    
-    # 모든 주문 아이템 취소 처리
-    for item in order.order_items:
-        if item.cooking_status not in ["completed", "cancelled"]:
-            item.cooking_status = "cancelled"
+    def cancel():
+        order = db.query(Order).filter(Order.id == order_id).first()
+        if not order:
+            raise HTTPException(status_code=404, detail="Order not found")
+
+        if order.payment_status == "confirmed":
+            # 결제 완료된 주문은 조리 시작 전에만 취소 가능
+            cooking_items = [item for item in order.order_items if item.cooking_status == "cooking"]
+            if cooking_items:
+                raise HTTPException(status_code=400, detail="Cannot cancel order with items already cooking")
+
+        # 주문 취소 처리
+        order.is_cancelled = True
+        order.payment_status = "cancelled"
+        order.cancelled_at = get_kst_now()
+        order.cancellation_reason = reason or "관리자에 의한 취소"
+
+        # 모든 주문 아이템 취소 처리
+        cancelled_items = [item for item in order.order_items if item.cooking_status not in ["completed", "cancelled"]]
+        for item in cancelled_items:
             item.cancelled_at = get_kst_now()
             item.cancellation_reason = reason or "주문 취소"
-    
-    db.commit()
-    
-    # WebSocket으로 취소 알림
-    try:
-        await manager.broadcast_to_all(json.dumps({
+        set_order_items_cooking_status(db, order.id, cancelled_items, "cancelled")
+
+        db.commit()
+        return {
             "type": "order_cancelled",
             "order_id": order.id,
             "table_id": order.table_id,
             "reason": order.cancellation_reason
-        }))
+        }
+
+    notification = await run_db(cancel)
+
+    # WebSocket으로 취소 알림
+    try:
+        await manager.publish([CHANNEL_KITCHEN, CHANNEL_ADMIN_ORDERS, order_channel(notification["order_id"])], notification)
     except Exception as e:
-        print(f"WebSocket notification error: {e}")
+        orders_log.warning("WebSocket notification error: %s", e)
+    await publish_order_board(db, "order_cancelled", order_id)
     
     return RedirectResponse(url="/admin/orders", status_code=303)
 
@@ -1134,90 +2400,113 @@ async def cancel_order_item(
     username: str = Depends(verify_admin)
 ):
     """개별 주문 아이템 취소"""
-    order_item = db.query(OrderItem).filter(OrderItem.id == item_id).first()
-    if not order_item:
-        raise HTTPException(status_code=404, detail="Order item not found")
-    
-    if order_item.cooking_status == "completed":
-        raise HTTPException(status_code=400, detail="Cannot cancel completed item")
-    
-    if order_item.cooking_status == "cancelled":
-        raise HTTPException(status_code=400, detail="Item is already cancelled")
-    
-    # 아이템 취소 처리
-    order_item.cooking_status = "cancelled"
-    order_item.cancelled_at = get_kst_now()
-    order_item.cancellation_reason = reason or "개별 아이템 취소"
-    
-    db.commit()
-    
-    # WebSocket으로 아이템 취소 알림
-    try:
-        await manager.broadcast_to_all(json.dumps({
+    def cancel():
+        order_item = db.query(OrderItem).filter(OrderItem.id == item_id).first()
+        if not order_item:
+            raise HTTPException(status_code=404, detail="Order item not found")
+
+        if order_item.cooking_status == "completed":
+            raise HTTPException(status_code=400, detail="Cannot cancel completed item")
+
+        if order_item.cooking_status == "cancelled":
+            raise HTTPException(status_code=400, detail="Item is already cancelled")
+
+        # 아이템 취소 처리
+        set_order_items_cooking_status(db, order_item.order_id, [order_item], "cancelled")
+        order_item.cancelled_at = get_kst_now()
+        order_item.cancellation_reason = reason or "개별 아이템 취소"
+
+        db.commit()
+        return {
             "type": "item_cancelled",
             "item_id": item_id,
             "order_id": order_item.order_id,
             "table_id": order_item.order.table_id,
             "menu_name": order_item.menu_item.name_kr if order_item.menu_item else "특별 아이템",
             "reason": order_item.cancellation_reason
-        }))
+        }
+
+    notification = await run_db(cancel)
+
+    # WebSocket으로 아이템 취소 알림
+    try:
+        await manager.publish([CHANNEL_KITCHEN, CHANNEL_ADMIN_ORDERS, order_channel(notification["order_id"])], notification)
     except Exception as e:
-        print(f"WebSocket notification error: {e}")
+        orders_log.warning("WebSocket notification error: %s", e)
+    await publish_order_board(db, "item_cancelled", notification["order_id"])
     
     return RedirectResponse(url="/kitchen", status_code=303)
 
-@app.get("/kitchen", response_class=HTMLResponse)
-async def kitchen_display(
-    request: Request,
-    db: Session = Depends(get_db),
-    username: str = Depends(verify_admin)
-):
+def load_kitchen_board(db: Session) -> Dict[str, Any]:
+    """주방 화면의 목록들 (페이지 렌더링과 보드 스냅샷에서 함께 사용)"""
     # 메뉴 데이터 가져오기
     menu_item_details_for_js, menu_names_by_id, menu_items_grouped_by_category, category_display_names = get_menu_data(db)
-    
+
+    # 템플릿이 item.order.table_id, item.menu_item.name_kr, order.order_items를 순회하므로
+    # 렌더링 중 지연 로딩(N+1)이 일어나지 않도록 관계를 미리 함께 읽어 둡니다.
+    item_with_order_and_menu = (contains_eager(OrderItem.order), contains_eager(OrderItem.menu_item))
+
     # 결제 확인된 주문의 조리 대기/진행 중인 아이템들 (취소되지 않은 것만)
-    cooking_items = db.query(OrderItem).join(Order).join(MenuItem).filter(
+    cooking_items = db.query(OrderItem).join(Order).join(MenuItem).options(*item_with_order_and_menu).filter(
         Order.payment_status == "confirmed",
         Order.is_cancelled == False,
         OrderItem.cooking_status.in_(["pending", "cooking"]),
         OrderItem.menu_item_id.isnot(None),  # 뽑기권 등 특별 아이템 제외
         MenuItem.category != "table"  # 상차림비 제외
     ).order_by(Order.confirmed_at.desc()).all()
-    
+
     # 결제 대기 중인 주문들 (전체 주문 단위로, 취소되지 않은 것만)
-    pending_orders = db.query(Order).filter(
+    pending_orders = db.query(Order).options(
+        selectinload(Order.order_items).joinedload(OrderItem.menu_item)
+    ).filter(
         Order.payment_status == "pending",
         Order.is_cancelled == False
     ).order_by(Order.created_at.desc()).all()
-    
+
     # 완료된 아이템들 (취소되지 않은 주문의 아이템만, 상차림비 제외)
-    completed_items = db.query(OrderItem).join(Order).join(MenuItem).filter(
+    completed_items = db.query(OrderItem).join(Order).join(MenuItem).options(*item_with_order_and_menu).filter(
         Order.payment_status == "confirmed",
         Order.is_cancelled == False,
         OrderItem.cooking_status == "completed",
         OrderItem.menu_item_id.isnot(None),
         MenuItem.category != "table"  # 상차림비 제외
-    ).order_by(OrderItem.completed_at.desc()).limit(20).all()
-    
+    ).order_by(OrderItem.completed_at.desc()).limit(BOARD_RECENT_LIMIT).all()
+
     # 취소된 아이템들 (최근 10개, 상차림비 제외)
-    cancelled_items = db.query(OrderItem).join(Order).join(MenuItem).filter(
+    cancelled_items = db.query(OrderItem).join(Order).join(MenuItem).options(*item_with_order_and_menu).filter(
         OrderItem.cooking_status == "cancelled",
         OrderItem.menu_item_id.isnot(None),
         MenuItem.category != "table"  # 상차림비 제외
-    ).order_by(OrderItem.cancelled_at.desc()).limit(10).all()
-    
-    return templates.TemplateResponse(
-        "kitchen.html",
-        {
-            "request": request,
-            "cooking_items": cooking_items,
-            "pending_orders": pending_orders,
-            "completed_items": completed_items,
-            "cancelled_items": cancelled_items,
-            "username": username,
-            "menu_names": menu_names_by_id
-        }
-    )
+    ).order_by(OrderItem.cancelled_at.desc()).limit(BOARD_RECENT_LIMIT).all()
+
+    return {
+        "cooking_items": cooking_items,
+        "pending_orders": pending_orders,
+        "completed_items": completed_items,
+        "cancelled_items": cancelled_items,
+        "menu_names": menu_names_by_id
+    }
+
+@app.get("/kitchen", response_class=HTMLResponse)
+async def kitchen_display(
+    request: Request,
+    db: Session = Depends(get_db),
+    username: str = Depends(verify_admin)
+):
+    board = board_context(CHANNEL_KITCHEN)
+
+    def render():
+        return templates.TemplateResponse(
+            "kitchen.html",
+            {
+                "request": request,
+                **load_kitchen_board(db),
+                **board,
+                "username": username
+            }
+        )
+
+    return await run_db(render)
 
 @app.post("/kitchen/update-item-status/{item_id}")
 async def update_item_cooking_status(
@@ -1227,17 +2516,22 @@ async def update_item_cooking_status(
     username: str = Depends(verify_admin)
 ):
     """개별 메뉴 아이템의 조리 상태 업데이트"""
-    order_item = db.query(OrderItem).filter(OrderItem.id == item_id).first()
-    if not order_item:
-        raise HTTPException(status_code=404, detail="Order item not found")
-    
-    order_item.cooking_status = status
-    if status == "cooking" and not order_item.started_at:
-        order_item.started_at = get_kst_now()
-    elif status == "completed":
-        order_item.completed_at = get_kst_now()
-    
-    db.commit()
+    def update():
+        order_item = db.query(OrderItem).filter(OrderItem.id == item_id).first()
+        if not order_item:
+            raise HTTPException(status_code=404, detail="Order item not found")
+
+        set_order_items_cooking_status(db, order_item.order_id, [order_item], status)
+        if status == "cooking" and not order_item.started_at:
+            order_item.started_at = get_kst_now()
+        elif status == "completed":
+            order_item.completed_at = get_kst_now()
+
+        db.commit()
+        return order_item.order_id
+
+    order_id = await run_db(update)
+    await publish_order_board(db, "item_status_changed", order_id)
     return RedirectResponse(url="/kitchen", status_code=303)
 
 @app.post("/kitchen/update-status/{order_id}")
@@ -1248,21 +2542,26 @@ async def update_cooking_status(
     username: str = Depends(verify_admin)
 ):
     """전체 주문의 모든 아이템 상태를 일괄 업데이트 (호환성 유지)"""
-    order = db.query(Order).filter(Order.id == order_id).first()
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
-    
-    # 주문의 모든 아이템 상태 업데이트
-    for order_item in order.order_items:
-        if order_item.menu_item_id:  # 실제 메뉴 아이템만
-            order_item.cooking_status = status
+    def update():
+        order = db.query(Order).filter(Order.id == order_id).first()
+        if not order:
+            raise HTTPException(status_code=404, detail="Order not found")
+
+        # 주문의 모든 아이템 상태 업데이트 (실제 메뉴 아이템만)
+        menu_order_items = [order_item for order_item in order.order_items if order_item.menu_item_id]
+        for order_item in menu_order_items:
             if status == "cooking" and not order_item.started_at:
                 order_item.started_at = get_kst_now()
             elif status == "completed":
                 order_item.completed_at = get_kst_now()
-    
-    db.commit()
-    return RedirectResponse(url="/kitchen", status_code=303)
+        set_order_items_cooking_status(db, order.id, menu_order_items, status)
+
+        db.commit()
+        return RedirectResponse(url="/kitchen", status_code=303)
+
+    response = await run_db(update)
+    await publish_order_board(db, "order_status_changed", order_id)
+    return response
 
 @app.get("/admin/logout")
 async def logout():
@@ -1281,56 +2580,54 @@ async def table_order_history(
     username: str = Depends(verify_admin)
 ):
     """테이블별 주문 내역 조회"""
-    # 메뉴 데이터 가져오기
-    menu_item_details_for_js, menu_names_by_id, menu_items_grouped_by_category, category_display_names = get_menu_data(db)
-    
-    query = db.query(Order).filter(Order.table_id == table_id)
-    
-    # 상태별 필터링
-    if status == "cooking":
-        # 결제 확인된 주문 중 조리가 필요한 아이템이 하나라도 조리 중이거나 대기중인 주문
-        query = query.filter(
-            Order.payment_status == "confirmed",
-            Order.is_cancelled == False
-        ).join(OrderItem).join(MenuItem).filter(
-            OrderItem.cooking_status.in_(["pending", "cooking"]),
-            MenuItem.category != "table"  # 상차림비 제외
-        ).distinct()
-    elif status == "completed":
-        # 실제 조리가 필요한 아이템들이 모두 완료된 주문 (조리가 필요한 아이템이 없는 경우도 포함, 상차림비 제외)
-        query = query.filter(
-            Order.payment_status == "confirmed",
-            Order.is_cancelled == False
-        ).outerjoin(OrderItem).outerjoin(MenuItem).group_by(Order.id).having(
-            (func.count(case(((OrderItem.menu_item_id.isnot(None)) & (MenuItem.category != "table"), 1), else_=None)) == 0) |
-            (func.count(case(((OrderItem.menu_item_id.isnot(None)) & (MenuItem.category != "table"), 1), else_=None)) == 
-             func.sum(case(((OrderItem.menu_item_id.isnot(None)) & (MenuItem.category != "table") & (OrderItem.cooking_status == "completed"), 1), else_=0)))
-        )
-    elif status == "pending":
-        query = query.filter(
-            Order.payment_status == "pending",
-            Order.is_cancelled == False
+    def render():
+        # 메뉴 데이터 가져오기
+        menu_item_details_for_js, menu_names_by_id, menu_items_grouped_by_category, category_display_names = get_menu_data(db)
+
+        query = db.query(Order).filter(Order.table_id == table_id)
+
+        # 상태별 필터링
+        if status == "cooking":
+            # 결제 확인된 주문 중 조리가 필요한 아이템이 하나라도 조리 중이거나 대기중인 주문
+            query = query.filter(
+                Order.payment_status == "confirmed",
+                Order.is_cancelled == False,
+                Order.kitchen_status == "cooking"
+            )
+        elif status == "completed":
+            # 실제 조리가 필요한 아이템들이 모두 완료된 주문 (조리가 필요한 아이템이 없는 경우도 포함, 상차림비 제외)
+            query = query.filter(
+                Order.payment_status == "confirmed",
+                Order.is_cancelled == False,
+                Order.kitchen_status == "completed"
+            )
+        elif status == "pending":
+            query = query.filter(
+                Order.payment_status == "pending",
+                Order.is_cancelled == False
+            )
+
+        # 전체 주문 수 조회
+        total_orders = query.count()
+
+        # 최근 주문 조회
+        orders = query.order_by(Order.created_at.desc()).limit(limit).all()
+
+        return templates.TemplateResponse(
+            "table_history.html",
+            {
+                "request": request,
+                "table_id": table_id,
+                "orders": orders,
+                "total_orders": total_orders,
+                "current_status": status,
+                "current_limit": limit,
+                "username": username,
+                "menu_names": menu_names_by_id  # 메뉴 이름 정보 추가
+            }
         )
-    
-    # 전체 주문 수 조회
-    total_orders = query.count()
-    
-    # 최근 주문 조회
-    orders = query.order_by(Order.created_at.desc()).limit(limit).all()
-    
-    return templates.TemplateResponse(
-        "table_history.html",
-        {
-            "request": request,
-            "table_id": table_id,
-            "orders": orders,
-            "total_orders": total_orders,
-            "current_status": status,
-            "current_limit": limit,
-            "username": username,
-            "menu_names": menu_names_by_id  # 메뉴 이름 정보 추가
-        }
-    )
+
+    return await run_db(render)
 
 @app.get("/admin/menu", response_class=HTMLResponse)
 async def menu_management(
@@ -1339,15 +2636,28 @@ async def menu_management(
     username: str = Depends(verify_admin)
 ):
     """메뉴 관리 페이지"""
-    menu_items = db.query(MenuItem).order_by(MenuItem.category, MenuItem.name_kr).all()
-    return templates.TemplateResponse(
-        "menu_management.html",
-        {
-            "request": request,
-            "menu_items": menu_items,
-            "username": username
-        }
-    )
+    def render():
+        menu_items = db.query(MenuItem).order_by(MenuItem.category, MenuItem.name_kr).all()
+        set_components = {}
+        for component in db.query(SetMenuComponent).order_by(SetMenuComponent.set_menu_id, SetMenuComponent.position):
+            set_components.setdefault(component.set_menu_id, []).append(component)
+        # 세트 구성 요소로 고를 수 있는 메뉴 (세트 메뉴와 상차림비 제외)
+        component_choices = [
+            item for item in menu_items
+            if item.is_active and item.category not in ("set_menu", "table")
+        ]
+        return templates.TemplateResponse(
+            "menu_management.html",
+            {
+                "request": request,
+                "menu_items": menu_items,
+                "set_components": set_components,
+                "component_choices": component_choices,
+                "username": username
+            }
+        )
+
+    return await run_db(render)
 
 @app.post("/admin/menu/add")
 async def add_menu_item(
@@ -1362,37 +2672,34 @@ async def add_menu_item(
     username: str = Depends(verify_admin)
 ):
     """새 메뉴 추가"""
-    try:
-        # 이미지 파일 처리
-        image_filename = None
-        if image:
-            # 파일 확장자 검사
-            if not image.content_type.startswith('image/'):
-                raise HTTPException(status_code=400, detail="이미지 파일만 업로드 가능합니다.")
-            
-            # 파일명 생성 (timestamp + original filename)
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            image_filename = f"{timestamp}_{image.filename}"
-            file_path = os.path.join(UPLOAD_DIR, image_filename)
-            
-            # 파일 저장
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(image.file, buffer)
-
-        menu_item = MenuItem(
-            name_kr=name_kr,
-            name_en=name_en,
-            price=price,
-            category=category,
-            description=description,
-            image_filename=image_filename
-        )
-        db.add(menu_item)
-        db.commit()
+    # 이미지는 이미지 처리 풀에서 변환 (빈 파일 입력은 이미지 없음)
+    image_filename, image_widths = None, None
+    if image and image.filename:
+        image_filename, image_widths = await save_menu_upload(image)
+
+    def save():
+        try:
+            menu_item = MenuItem(
+                name_kr=name_kr,
+                name_en=name_en,
+                price=price,
+                category=category,
+                description=description,
+                image_filename=image_filename,
+                image_widths=image_widths
+            )
+            db.add(menu_item)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            discard_menu_upload(db, 0, image_filename, image_widths)
+            raise HTTPException(status_code=400, detail=str(e))
+        menu_cache.refresh(db)
         return RedirectResponse(url="/admin/menu", status_code=303)
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=400, detail=str(e))
+
+    response = await run_db(save)
+    await manager.publish([CHANNEL_MENU], {"type": "menu_updated", "version": menu_cache.version})
+    return response
 
 @app.post("/admin/menu/update/{item_id}")
 async def update_menu_item(
@@ -1408,44 +2715,103 @@ async def update_menu_item(
     username: str = Depends(verify_admin)
 ):
     """메뉴 수정"""
-    menu_item = db.query(MenuItem).filter(MenuItem.id == item_id).first()
-    if not menu_item:
-        raise HTTPException(status_code=404, detail="Menu item not found")
-    
-    try:
-        # 이미지 파일 처리
-        if image:
-            # 파일 확장자 검사
-            if not image.content_type.startswith('image/'):
-                raise HTTPException(status_code=400, detail="이미지 파일만 업로드 가능합니다.")
-            
-            # 기존 이미지 삭제
-            if menu_item.image_filename:
-                old_file_path = os.path.join(UPLOAD_DIR, menu_item.image_filename)
-                if os.path.exists(old_file_path):
-                    os.remove(old_file_path)
-            
-            # 새 이미지 저장
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            image_filename = f"{timestamp}_{image.filename}"
-            file_path = os.path.join(UPLOAD_DIR, image_filename)
-            
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(image.file, buffer)
-            
-            menu_item.image_filename = image_filename
-
-        menu_item.name_kr = name_kr
-        menu_item.name_en = name_en
-        menu_item.price = price
-        menu_item.category = category
-        menu_item.description = description
-        menu_item.is_active = is_active
+    # 새 이미지는 이미지 처리 풀에서 변환 (빈 파일 입력은 기존 이미지 유지)
+    new_image = await save_menu_upload(image) if image and image.filename else None
+
+    def save():
+        menu_item = db.query(MenuItem).filter(MenuItem.id == item_id).first()
+        if not menu_item:
+            if new_image:
+                discard_menu_upload(db, item_id, *new_image)
+            raise HTTPException(status_code=404, detail="Menu item not found")
+
+        old_image = (menu_item.image_filename, menu_item.image_widths)
+        try:
+            if new_image:
+                menu_item.image_filename, menu_item.image_widths = new_image
+
+            menu_item.name_kr = name_kr
+            menu_item.name_en = name_en
+            menu_item.price = price
+            menu_item.category = category
+            menu_item.description = description
+            menu_item.is_active = is_active
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            # 새 이미지만 삭제 (같은 이미지를 다시 올린 경우는 기존 이미지이므로 남겨 둠)
+            if new_image and old_image[0] != new_image[0]:
+                discard_menu_upload(db, item_id, *new_image)
+            raise HTTPException(status_code=400, detail=str(e))
+        # 기존 이미지 삭제 (같은 이미지를 다시 올린 경우 제외)
+        if new_image and old_image[0] != new_image[0]:
+            remove_menu_image(db, item_id, *old_image)
+        menu_cache.refresh(db)
+        return RedirectResponse(url="/admin/menu", status_code=303)
+
+    response = await run_db(save)
+    await manager.publish([CHANNEL_MENU], {"type": "menu_updated", "version": menu_cache.version})
+    return response
+
+@app.post("/admin/menu/set-components/{item_id}")
+async def update_set_menu_components(
+    item_id: int,
+    component_menu_id: List[str] = Form([]),
+    quantity: List[str] = Form([]),
+    notes_label: List[str] = Form([]),
+    db: Session = Depends(get_db),
+    username: str = Depends(verify_admin)
+):
+    """세트 메뉴 구성 수정 (구성 요소 전체를 폼 내용으로 교체, 수량이 0인 행은 제외)"""
+    def save():
+        set_item = db.query(MenuItem).filter(MenuItem.id == item_id).first()
+        if not set_item:
+            raise HTTPException(status_code=404, detail="Menu item not found")
+        if set_item.category != "set_menu":
+            raise HTTPException(status_code=400, detail="세트 메뉴만 구성을 수정할 수 있습니다.")
+
+        rows = []
+        for raw_component_id, raw_quantity, label in zip(component_menu_id, quantity, notes_label):
+            try:
+                component_quantity = int(raw_quantity or 0)
+                component_id = int(raw_component_id) if raw_component_id else None
+            except ValueError:
+                raise HTTPException(status_code=400, detail="구성 요소와 수량은 숫자여야 합니다.")
+            if component_quantity <= 0:
+                continue
+            label = label.strip() or None
+            if component_id is None and label is None:
+                raise HTTPException(status_code=400, detail="메뉴가 아닌 구성 요소는 이름을 입력해야 합니다.")
+            rows.append({
+                "set_menu_id": item_id,
+                "component_menu_id": component_id,
+                "quantity": component_quantity,
+                "notes_label": label if component_id is None else None,
+                "position": len(rows),
+            })
+
+        # 구성 요소는 판매 중인, 세트/상차림비가 아닌 메뉴여야 함 (세트 안의 세트는 분해하지 않음)
+        component_ids = {row["component_menu_id"] for row in rows if row["component_menu_id"] is not None}
+        if component_ids:
+            categories = dict(db.execute(
+                select(MenuItem.id, MenuItem.category).where(MenuItem.id.in_(component_ids), MenuItem.is_active == True)
+            ).all())
+            if component_ids - categories.keys():
+                raise HTTPException(status_code=404, detail="구성 요소 메뉴를 찾을 수 없습니다.")
+            if any(category in ("set_menu", "table") for category in categories.values()):
+                raise HTTPException(status_code=400, detail="세트 구성 요소로 쓸 수 없는 메뉴입니다.")
+
+        db.execute(delete(SetMenuComponent).where(SetMenuComponent.set_menu_id == item_id))
+        if rows:
+            db.execute(insert(SetMenuComponent), rows)
         db.commit()
+        menu_cache.refresh(db)
+        menu_log.info("Set menu %s components updated (%d rows)", item_id, len(rows))
         return RedirectResponse(url="/admin/menu", status_code=303)
-    except Exception as e:
-        db.rollback()
-        raise HTTPException(status_code=400, detail=str(e))
+
+    response = await run_db(save)
+    await manager.publish([CHANNEL_MENU], {"type": "menu_updated", "version": menu_cache.version})
+    return response
 
 @app.post("/admin/menu/delete/{item_id}")
 async def delete_menu_item(
@@ -1454,19 +2820,22 @@ async def delete_menu_item(
     username: str = Depends(verify_admin)
 ):
     """메뉴 삭제 (비활성화)"""
-    menu_item = db.query(MenuItem).filter(MenuItem.id == item_id).first()
-    if not menu_item:
-        raise HTTPException(status_code=404, detail="Menu item not found")
-    
-    # 이미지 파일 삭제
-    if menu_item.image_filename:
-        file_path = os.path.join(UPLOAD_DIR, menu_item.image_filename)
-        if os.path.exists(file_path):
-            os.remove(file_path)
-    
-    menu_item.is_active = False
-    db.commit()
-    return RedirectResponse(url="/admin/menu", status_code=303)
+    def delete():
+        menu_item = db.query(MenuItem).filter(MenuItem.id == item_id).first()
+        if not menu_item:
+            raise HTTPException(status_code=404, detail="Menu item not found")
+
+        # 이미지 파일 삭제
+        remove_menu_image(db, item_id, menu_item.image_filename, menu_item.image_widths)
+
+        menu_item.is_active = False
+        db.commit()
+        menu_cache.refresh(db)
+        return RedirectResponse(url="/admin/menu", status_code=303)
+
+    response = await run_db(delete)
+    await manager.publish([CHANNEL_MENU], {"type": "menu_updated", "version": menu_cache.version})
+    return response
 
 @app.get("/ws-test")
 async def websocket_test():
@@ -1483,167 +2852,1451 @@ async def websocket_test():
         "websocket_support": websockets_available,
         "websockets_version": websockets_version,
         "message": "WebSocket endpoints available at /ws and /ws/{table_id}",
-        "online_tables": manager.get_online_tables()
+        "online_tables": manager.get_online_tables(),
+        "broadcast": manager.get_broadcast_metrics()
     }
 
+# 운영 지표 (Prometheus 텍스트 형식, fly.toml [metrics]가 METRICS_PORT의 /metrics를 수집)
+class MetricCounter:
+    """라벨 값 조합별로 누적되는 카운터"""
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.values: Dict[Tuple[str, ...], float] = {}
+        self.lock = threading.Lock()  # DB 스레드에서도 올리므로
+
+    def inc(self, *label_values: str, amount: float = 1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def samples(self) -> List[Tuple[str, Tuple[str, ...], Tuple[str, ...], float]]:
+        with self.lock:
+            entries = list(self.values.items())
+        return [("", self.labels, label_values, value) for label_values, value in entries]
+
+class MetricHistogram(MetricCounter):
+    """라벨 값 조합별 분포 (구간별 개수, 합계, 관측 수)"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...], labels: Tuple[str, ...] = ()):
+        super().__init__(name, help_text, labels)
+        self.buckets = buckets
+        self.values: Dict[Tuple[str, ...], list] = {}  # 라벨 값: [구간별 개수, 합계, 관측 수]
+
+    def observe(self, value: float, *label_values: str):
+        with self.lock:
+            entry = self.values.get(label_values)
+            if entry is None:
+                entry = self.values[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self):
+        samples = []
+        with self.lock:
+            entries = [(label_values, list(counts), total, count) for label_values, (counts, total, count) in self.values.items()]
+        for label_values, counts, total, count in entries:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                samples.append(("_bucket", self.labels + ("le",), label_values + (repr(bound),), cumulative))
+            samples.append(("_bucket", self.labels + ("le",), label_values + ("+Inf",), count))
+            samples.append(("_sum", self.labels, label_values, total))
+            samples.append(("_count", self.labels, label_values, count))
+        return samples
+
+def format_metric(kind: str, name: str, help_text: str, samples) -> List[str]:
+    """지표 하나를 Prometheus 텍스트 형식 줄로 변환. samples: (접미사, 라벨 이름, 라벨 값, 값)"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for suffix, label_names, label_values, value in samples:
+        labels = ",".join(
+            '{}="{}"'.format(label, str(label_value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+            for label, label_value in zip(label_names, label_values)
+        )
+        lines.append(f"{name}{suffix}{{{labels}}} {value}" if labels else f"{name}{suffix} {value}")
+    return lines
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+http_requests = MetricCounter("http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+http_request_seconds = MetricHistogram("http_request_duration_seconds", "Time until response headers are sent", LATENCY_BUCKETS, ("method", "route"))
+db_queries = MetricCounter("db_queries_total", "SQL statements executed on the main database")
+db_query_seconds = MetricCounter("db_query_seconds_total", "Time spent executing SQL statements")
+db_queries_per_request = MetricHistogram("db_queries_per_request", "SQL statements per HTTP request", (0, 1, 2, 3, 5, 10, 20, 50, 100), ("route",))
+db_seconds_per_request = MetricHistogram("db_seconds_per_request", "SQL execution time per HTTP request", (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0), ("route",))
+broadcast_fanout_seconds = MetricHistogram("broadcast_fanout_seconds", "Time to enqueue one event for all local subscribers", (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05))
+orders_created = MetricCounter("orders_created_total", "Orders created", ("kind",))
+orders_confirmed = MetricCounter("orders_confirmed_total", "Orders whose payment was confirmed")
+METRICS = [
+    http_requests, http_request_seconds, db_queries, db_query_seconds, db_queries_per_request,
+    db_seconds_per_request, broadcast_fanout_seconds, orders_created, orders_confirmed,
+]
+
+# SQL 프로파일링
+DEBUG = os.getenv("DEBUG", "").lower() in ("1", "true", "yes")  # 응답에 X-DB-Queries, X-DB-Time(밀리초), X-DB-Lazy-Loads 헤더 추가
+DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS", "100"))  # 이보다 오래 걸린 SQL 문은 경로, 파라미터와 함께 로그
+DB_REQUEST_QUERY_WARN = int(os.getenv("DB_REQUEST_QUERY_WARN", "50"))  # 요청 하나가 이보다 많은 SQL 문을 실행하면 로그
+
+@dataclass
+class RequestQueryStats:
+    """요청 하나에서 실행된 SQL 문 수와 시간"""
+    scope: Optional[dict] = None  # 로그에 경로를 남기기 위한 ASGI scope
+    queries: int = 0
+    seconds: float = 0.0
+    lazy_loads: int = 0  # 템플릿 등에서 관계 속성에 처음 접근해 실행된 지연 로딩
+
+# run_db()가 컨텍스트를 복사하므로 DB 스레드에서 실행된 쿼리도 요청에 합산됨
+request_query_stats: contextvars.ContextVar[Optional[RequestQueryStats]] = contextvars.ContextVar("request_query_stats", default=None)
+
+@event.listens_for(engine, "before_cursor_execute")
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+@event.listens_for(engine, "after_cursor_execute")
+def record_query_time(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - context._query_started
+    db_queries.inc()
+    db_query_seconds.inc(amount=seconds)
+    stats = request_query_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.seconds += seconds
+    if seconds * 1000 >= DB_SLOW_QUERY_MS:
+        route = request_route(stats.scope) if stats is not None and stats.scope is not None else "-"
+        db_log.warning("Slow query (%.1f ms) on %s: %s; parameters=%.500r", seconds * 1000, route, " ".join(statement.split()), parameters)
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def count_lazy_load(orm_execute_state):
+    if not orm_execute_state.is_select or orm_execute_state.lazy_loaded_from is None:
+        return
+    stats = request_query_stats.get()
+    if stats is not None:
+        stats.lazy_loads += 1
+        if db_log.isEnabledFor(logging.DEBUG):
+            db_log.debug("Lazy load from %s on %s", orm_execute_state.lazy_loaded_from.class_.__name__, request_route(stats.scope))
+
+def request_route(scope) -> str:
+    """지표 라벨용 경로 템플릿 (경로 파라미터 값마다 라벨이 늘지 않도록)"""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    return scope.get("root_path") or "unmatched"  # 정적 파일 등 마운트된 앱은 마운트 경로
+
+class RequestMetricsMiddleware:
+    """경로별 응답 시간과 요청당 SQL 문 수/시간을 기록하는 ASGI 미들웨어
+
+    스트리밍 응답(SSE)도 연결 시간이 아닌 헤더를 보낼 때까지의 시간을 기록합니다.
+    SQL 문이 많은 요청은 로그에 남기고, DEBUG 모드에서는 응답 헤더로도 알려 줍니다.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        stats = RequestQueryStats(scope)
+        token = request_query_stats.set(stats)
+        recorded = False
+
+        def record(status_code: int):
+            nonlocal recorded
+            recorded = True
+            route = request_route(scope)
+            http_requests.inc(scope["method"], route, str(status_code))
+            http_request_seconds.observe(time.perf_counter() - started, scope["method"], route)
+            db_queries_per_request.observe(stats.queries, route)
+            db_seconds_per_request.observe(stats.seconds, route)
+            if stats.queries > DB_REQUEST_QUERY_WARN:
+                db_log.warning("%s %s ran %d queries (%.1f ms, %d lazy loads)", scope["method"], route, stats.queries, stats.seconds * 1000, stats.lazy_loads)
+            else:
+                db_log.debug("%s %s ran %d queries (%.1f ms, %d lazy loads)", scope["method"], route, stats.queries, stats.seconds * 1000, stats.lazy_loads)
+
+        async def send_with_metrics(message):
+            if message["type"] == "http.response.start":
+                record(message["status"])
+                if DEBUG:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"x-db-queries", str(stats.queries).encode()),
+                        (b"x-db-time", f"{stats.seconds * 1000:.3f}".encode()),
+                        (b"x-db-lazy-loads", str(stats.lazy_loads).encode()),
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        except Exception:
+            if not recorded:
+                record(500)
+            raise
+        finally:
+            request_query_stats.reset(token)
+
+app.add_middleware(RequestMetricsMiddleware)
+
+# 연결별 송신 큐 크기와 한 번의 전송에 허용하는 시간 (이를 넘기면 느린 클라이언트로 보고 연결을 끊음)
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", "64"))
+WS_SEND_TIMEOUT_SECONDS = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", "5"))
+WS_CLOSE_TRY_AGAIN_LATER = 1013
+
+class BroadcastMetrics:
+    """WebSocket 송신 큐 깊이와 전송 시간 통계"""
+
+    def __init__(self):
+        self.messages_enqueued = 0
+        self.messages_sent = 0
+        self.send_failures = 0
+        self.slow_consumers_dropped = 0
+        self.events_replayed = 0
+        self.replay_resyncs = 0
+        self.send_seconds_total = 0.0
+        self.send_seconds_max = 0.0
+        self.queue_depth_max = 0
+
+    def record_enqueue(self, depth: int):
+        self.messages_enqueued += 1
+        if depth > self.queue_depth_max:
+            self.queue_depth_max = depth
+
+    def record_send(self, seconds: float):
+        self.messages_sent += 1
+        self.send_seconds_total += seconds
+        if seconds > self.send_seconds_max:
+            self.send_seconds_max = seconds
+
+    def snapshot(self, connections) -> dict:
+        depths = [connection.queue.qsize() for connection in connections]
+        return {
+            "connections": len(depths),
+            "queue_depth_current_total": sum(depths),
+            "queue_depth_current_max": max(depths, default=0),
+            "queue_depth_max": self.queue_depth_max,
+            "messages_enqueued": self.messages_enqueued,
+            "messages_sent": self.messages_sent,
+            "send_failures": self.send_failures,
+            "slow_consumers_dropped": self.slow_consumers_dropped,
+            "events_replayed": self.events_replayed,
+            "replay_resyncs": self.replay_resyncs,
+            "send_seconds_total": round(self.send_seconds_total, 6),
+            "send_seconds_avg": round(self.send_seconds_total / self.messages_sent, 6) if self.messages_sent else 0.0,
+            "send_seconds_max": round(self.send_seconds_max, 6),
+        }
+
+class ClientConnection:
+    """WebSocket 하나와 그 전용 송신 큐/전송 태스크
+
+    브로드캐스트는 큐에 넣기만 하고 바로 돌아가므로, 느린 클라이언트가
+    다른 클라이언트로의 전달을 막지 않습니다.
+    """
+
+    def __init__(self, websocket: WebSocket, table_id: int, metrics: BroadcastMetrics):
+        self.websocket = websocket
+        self.table_id = table_id
+        self.metrics = metrics
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=WS_SEND_QUEUE_SIZE)
+        self.writer_task: Optional[asyncio.Task] = None
+        self.channels: set = set()
+        self.resume: Optional[Tuple[Optional[str], int]] = None  # 재연결 시 받은 (epoch, last_seq), 첫 구독 때 재전송
+        self.is_admin = False  # 관리자 계정으로 인증한 연결 (모든 주문 채널 구독 가능)
+        self.closed = False
+
+    def start(self, on_failure):
+        self.writer_task = asyncio.create_task(self._writer(on_failure))
+
+    def enqueue(self, message: str) -> bool:
+        """메시지를 송신 큐에 넣음. 큐가 가득 차면 False"""
+        if self.closed:
+            return False
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            return False
+        self.metrics.record_enqueue(self.queue.qsize())
+        return True
+
+    async def _writer(self, on_failure):
+        while True:
+            message = await self.queue.get()
+            started = time.perf_counter()
+            try:
+                async with asyncio.timeout(WS_SEND_TIMEOUT_SECONDS):
+                    await self.websocket.send_text(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                ws_log.info("Failed to send to table %s: %s %s", self.table_id, type(e).__name__, e)
+                self.metrics.send_failures += 1
+                on_failure(self)
+                return
+            self.metrics.record_send(time.perf_counter() - started)
+
+    def stop(self):
+        self.closed = True
+        if self.writer_task is not None and self.writer_task is not asyncio.current_task():
+            self.writer_task.cancel()
+
+    async def close(self, code: int, reason: str):
+        try:
+            await asyncio.wait_for(self.websocket.close(code=code, reason=reason), WS_SEND_TIMEOUT_SECONDS)
+        except Exception:
+            pass
+
+SSE_KEEPALIVE_SECONDS = 25.0  # 프록시가 유휴 연결을 끊지 않도록 보내는 주석 줄 간격
+
+class StreamConnection(ClientConnection):
+    """WebSocket을 쓸 수 없는 클라이언트용 Server-Sent Events 연결
+
+    WebSocket 연결과 똑같이 채널 구독자로 등록되고, 응답 스트림이 송신 큐에서 직접
+    메시지를 꺼내 보냅니다. 새 이벤트가 없으면 큐에서 기다리기만 하므로 쿼리도 CPU도 쓰지 않습니다.
+    """
+
+    def __init__(self, table_id: int, metrics: BroadcastMetrics, epoch: str, seq: int):
+        super().__init__(None, table_id, metrics)
+        self.epoch = epoch
+        self.start_seq = seq  # 연결 시점의 순번 (아무 이벤트도 받지 못하고 끊겨도 여기부터 이어받음)
+
+    def start(self, on_failure):
+        pass  # 별도 전송 태스크 없이 frames()를 도는 응답이 보냄
+
+    async def close(self, code: int, reason: str):
+        # frames()는 큐에 남은 메시지를 모두 보낸 뒤 끝남. 빈 큐를 기다리고 있으면 종료 표시(None)로 깨움
+        # (큐가 가득 찼다면 기다리는 중이 아니므로 표시 없이도 비운 뒤 closed를 보고 끝남)
+        try:
+            self.queue.put_nowait(None)
+        except asyncio.QueueFull:
+            pass
+
+    async def frames(self):
+        """SSE 프레임. 이벤트 id는 epoch:seq 형식이라 브라우저가 재연결 시 Last-Event-ID로 돌려줌"""
+        yield f"retry: {int(WS_SEND_TIMEOUT_SECONDS * 1000)}\nid: {self.epoch}:{self.start_seq}\n\n"
+        while not (self.closed and self.queue.empty()):
+            try:
+                message = await asyncio.wait_for(self.queue.get(), SSE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if message is None:
+                return
+            seq = message_sequence(message)
+            event_id = f"id: {self.epoch}:{seq}\n" if seq is not None else ""
+            self.metrics.messages_sent += 1
+            yield f"{event_id}data: {message}\n\n"
+
+# WebSocket 채널 (클라이언트는 소켓으로 구독 메시지를 보내 필요한 채널만 받음)
+CHANNEL_KITCHEN = "kitchen"
+CHANNEL_ADMIN_ORDERS = "admin.orders"
+CHANNEL_ADMIN_WAITING = "admin.waiting"
+CHANNEL_ADMIN_TABLES = "admin.tables"
+CHANNEL_CHAT_GLOBAL = "chat.global"
+CHANNEL_MENU = "menu"  # 메뉴 변경 알림 (다른 워커의 메뉴 캐시 갱신에도 사용)
+CHANNEL_PRESENCE = "presence"  # 접속 테이블/닉네임 변경 (각 프로세스가 자기 연결에만 알림)
+STAFF_CHANNELS = {CHANNEL_KITCHEN, CHANNEL_ADMIN_ORDERS, CHANNEL_ADMIN_WAITING, CHANNEL_ADMIN_TABLES}
+
+def table_channel(table_id: int) -> str:
+    return f"table.{table_id}"
+
+def order_channel(order_id: int) -> str:
+    return f"order.{order_id}"
+
+def order_channel_id(channel: str) -> Optional[int]:
+    """order.{id} 채널의 주문 ID (주문 채널이 아니면 None)"""
+    prefix, _, key = channel.partition(".")
+    return int(key) if prefix == "order" and key.isdigit() else None
+
+def is_channel_allowed(table_id: int, channel: str, is_admin: bool = False,
+                       order_table_ids: Optional[Dict[int, int]] = None) -> bool:
+    """구독 가능 여부. 관리자 인증을 거친 소켓은 모든 채널, 그 외에는 공개 채팅/메뉴/자기 테이블/자기 주문 채널만
+
+    주문 채널은 주문의 테이블(order_table_ids: 주문 ID -> 테이블)이 이 연결의 테이블일 때만 허용합니다.
+    인증 없는 /ws/0은 손님과 같으며 테이블이 없으므로 공개 채널만 구독할 수 있습니다.
+    """
+    if channel in (CHANNEL_CHAT_GLOBAL, CHANNEL_MENU, CHANNEL_PRESENCE):
+        return True
+    if is_admin:
+        return channel in STAFF_CHANNELS or order_channel_id(channel) is not None or (
+            channel.startswith("table.") and channel[len("table."):].isdigit()
+        )
+    if table_id == 0:
+        return False
+    order_id = order_channel_id(channel)
+    if order_id is not None:
+        return (order_table_ids or {}).get(order_id) == table_id
+    return channel == table_channel(table_id)
+
+async def load_order_table_ids(channels: List[str]) -> Dict[int, int]:
+    """구독 요청에 든 주문 채널의 주문 ID -> 테이블 번호"""
+    order_ids = {order_id for channel in channels if (order_id := order_channel_id(channel)) is not None}
+    if not order_ids:
+        return {}
+
+    def load():
+        with SessionLocal() as db:
+            return dict(db.query(Order.id, Order.table_id).filter(Order.id.in_(order_ids)).all())
+
+    return await run_db(load)
+
+BROADCAST_ALL = "*"  # 모든 연결에 전송 (broadcast_to_all)
+
+PRESENCE_FLUSH_DELAY_SECONDS = 0.2  # 접속/퇴장이 몰릴 때 변경을 모아 presence 이벤트 한 번으로 알림
+
+# 재연결한 클라이언트에게 놓친 이벤트를 다시 보내기 위해 보관하는 최근 이벤트 수
+EVENT_LOG_SIZE = int(os.getenv("EVENT_LOG_SIZE", "1000"))
+# 지정하면 종료 시 이벤트 이력을 파일로 저장하고 시작 시 읽어, 재시작 후에도 이어받을 수 있음 (단일 워커 전용)
+EVENT_LOG_PATH = os.getenv("EVENT_LOG_PATH", "")
+
+def stamp_sequence(message: str, seq: int) -> str:
+    """직렬화된 이벤트(JSON 객체)에 seq를 붙임 (다시 파싱하지 않도록 문자열 앞부분에 삽입)"""
+    return f'{{"seq": {seq}, {message[1:]}'
+
+def message_sequence(message: str) -> Optional[int]:
+    """stamp_sequence()로 붙인 seq. 순번이 없는 메시지면 None"""
+    if not message.startswith('{"seq": '):
+        return None
+    return int(message[8:message.index(",", 8)])
+
+class EventLog:
+    """발행된 이벤트의 순번과 최근 EVENT_LOG_SIZE개의 이력
+
+    순번은 프로세스마다 따로 증가하므로 epoch와 함께 다닙니다. 다른 프로세스에서 온
+    이벤트도 이 프로세스의 순번을 붙여 이력에 남깁니다. 이력의 순번은 빠짐없이
+    이어지므로, 요청한 순번 이후가 아직 남아 있는지는 개수만으로 알 수 있습니다.
+    """
+
+    def __init__(self, size: int, path: str = ""):
+        self.epoch = secrets.token_hex(8)
+        self.seq = 0
+        self.entries: deque = deque(maxlen=size)  # (seq, channels, message)
+        self.path = path
+
+    def append(self, channels: List[str], message: str) -> str:
+        """순번을 붙여 이력에 추가하고, 순번이 붙은 메시지를 반환"""
+        self.seq += 1
+        message = stamp_sequence(message, self.seq)
+        self.entries.append((self.seq, channels, message))
+        return message
+
+    def since(self, epoch: Optional[str], seq: int) -> Optional[List[Tuple[int, List[str], str]]]:
+        """epoch/순번 이후의 이벤트 목록. 다른 epoch이거나 이력이 이미 밀려났으면 None (스냅샷 필요)"""
+        if epoch != self.epoch or seq < 0 or seq > self.seq:
+            return None
+        missed = self.seq - seq
+        if missed > len(self.entries):
+            return None
+        return list(self.entries)[len(self.entries) - missed:]
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                saved = json.load(f)
+            self.epoch = saved["epoch"]
+            self.seq = saved["seq"]
+            self.entries.extend(tuple(entry) for entry in saved["entries"])
+            ws_log.info("Loaded %d events from %s (seq %d)", len(self.entries), self.path, self.seq)
+        except Exception as e:
+            ws_log.warning("Failed to load event log from %s: %s", self.path, e)
+
+    def save(self):
+        if not self.path:
+            return
+        try:
+            temp_path = f"{self.path}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump({"epoch": self.epoch, "seq": self.seq, "entries": list(self.entries)}, f, ensure_ascii=False)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            ws_log.warning("Failed to save event log to %s: %s", self.path, e)
+
+# 프로세스 간 백플레인 설정
+# local: 단일 프로세스 (기본값), sqlite: 같은 서버의 여러 워커가 SQLite 파일을 통해 이벤트/접속 상태 공유
+BACKPLANE = os.getenv("BACKPLANE", "local")
+BACKPLANE_DATABASE_URL = os.getenv(
+    "BACKPLANE_DATABASE_URL",
+    f"sqlite:///{os.path.join(os.path.dirname(os.path.abspath(DATABASE_PATH)), 'backplane.db')}"
+)
+BACKPLANE_POLL_INTERVAL_SECONDS = float(os.getenv("BACKPLANE_POLL_INTERVAL_SECONDS", "0.05"))
+BACKPLANE_PRESENCE_INTERVAL_SECONDS = 1.0  # 접속 상태 갱신/하트비트 주기
+BACKPLANE_PRESENCE_TTL_SECONDS = 15.0  # 하트비트가 끊긴 프로세스의 접속 정보는 이 시간이 지나면 무시
+BACKPLANE_EVENT_RETENTION_SECONDS = 60.0
+
+BackplaneBase = declarative_base()
+
+class BackplaneEvent(BackplaneBase):
+    __tablename__ = "backplane_events"
+    # AUTOINCREMENT: 오래된 이벤트를 지운 뒤에도 id가 재사용되지 않아야 폴링 위치가 어긋나지 않음
+    __table_args__ = (Index("ix_backplane_events_created", "created_at"), {"sqlite_autoincrement": True})
+
+    id = Column(Integer, primary_key=True)
+    origin = Column(String, nullable=False)
+    channels = Column(JSON, nullable=False)
+    message = Column(Text, nullable=False)
+    created_at = Column(Float, nullable=False)  # time.time()
+
+class BackplanePresence(BackplaneBase):
+    __tablename__ = "backplane_presence"
+
+    origin = Column(String, primary_key=True)
+    table_id = Column(Integer, primary_key=True)
+    connections = Column(Integer, nullable=False)
+    updated_at = Column(Float, nullable=False)
+
+class BackplaneNickname(BackplaneBase):
+    __tablename__ = "backplane_nicknames"
+
+    table_id = Column(Integer, primary_key=True)
+    nickname = Column(String, nullable=False)
+
+class Backplane:
+    """프로세스 간 이벤트/접속 상태 전달 인터페이스
+
+    기본 구현은 단일 프로세스용으로 아무 일도 하지 않습니다. 다른 구현은
+    publish()로 받은 이벤트를 다른 프로세스의 deliver 콜백으로 전달하고,
+    접속 중인 테이블과 닉네임을 공유해야 합니다. 다른 프로세스의 접속 상태가
+    바뀌면 presence_changed 콜백을 호출합니다.
+    """
+
+    async def start(self, deliver, presence_changed):
+        pass
+
+    async def stop(self):
+        pass
+
+    def publish(self, channels: List[str], message: str):
+        pass
+
+    def update_presence(self, table_id: int, connections: int):
+        pass
+
+    def set_nickname(self, table_id: int, nickname: str):
+        pass
+
+    def remote_online_tables(self) -> set:
+        return set()
+
+    def get_nickname(self, table_id: int) -> Optional[str]:
+        return None
+
+class SQLiteBackplane(Backplane):
+    """SQLite 파일을 폴링하는 백플레인 (같은 서버의 여러 워커용)
+
+    이벤트는 backplane_events에 쓰고 각 프로세스가 마지막으로 읽은 id 이후를
+    폴링해 자기 연결에 전달합니다. 접속 상태는 프로세스별로 기록하고 주기적으로
+    하트비트를 남기며, 모든 DB 작업은 전용 스레드 하나에서 순서대로 실행됩니다.
+    """
+
+    def __init__(self, database_url: str):
+        self.engine = create_db_engine(database_url)
+        with startup_lock():
+            BackplaneBase.metadata.create_all(bind=self.engine)
+        self.origin = f"{socket.gethostname()}:{os.getpid()}"
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="backplane")
+        self.last_event_id = 0
+        self.remote_tables: set = set()
+        self.nicknames: Dict[int, str] = {}
+        self.deliver = None
+        self.presence_changed = None
+        self.poll_task: Optional[asyncio.Task] = None
+
+    async def start(self, deliver, presence_changed):
+        self.deliver = deliver
+        self.presence_changed = presence_changed
+        loop = asyncio.get_running_loop()
+        # 시작 이전 이벤트는 재전송하지 않음
+        self.last_event_id = await loop.run_in_executor(self.executor, self._latest_event_id)
+        self.poll_task = asyncio.create_task(self._poll_loop())
+        backplane_log.info("SQLite backplane started for %s", self.origin)
+
+    async def stop(self):
+        if self.poll_task is not None:
+            self.poll_task.cancel()
+        await asyncio.get_running_loop().run_in_executor(self.executor, self._clear_presence)
+
+    def _submit(self, func, *args):
+        future = self.executor.submit(func, *args)
+        future.add_done_callback(self._log_failure)
+
+    @staticmethod
+    def _log_failure(future):
+        if future.exception() is not None:
+            backplane_log.error("Backplane write failed: %s", future.exception())
+
+    def publish(self, channels: List[str], message: str):
+        self._submit(self._insert_event, channels, message)
+
+    def update_presence(self, table_id: int, connections: int):
+        self._submit(self._write_presence, table_id, connections)
+
+    def set_nickname(self, table_id: int, nickname: str):
+        self.nicknames[table_id] = nickname
+        self._submit(self._write_nickname, table_id, nickname)
+
+    def remote_online_tables(self) -> set:
+        return self.remote_tables
+
+    def get_nickname(self, table_id: int) -> Optional[str]:
+        return self.nicknames.get(table_id)
+
+    async def _poll_loop(self):
+        loop = asyncio.get_running_loop()
+        last_presence_check = 0.0
+        while True:
+            try:
+                for channels, message in await loop.run_in_executor(self.executor, self._read_events):
+                    self.deliver(channels, message)
+                if time.monotonic() - last_presence_check >= BACKPLANE_PRESENCE_INTERVAL_SECONDS:
+                    last_presence_check = time.monotonic()
+                    remote_tables, nicknames = await loop.run_in_executor(self.executor, self._sync_presence)
+                    if (remote_tables, nicknames) != (self.remote_tables, self.nicknames):
+                        self.remote_tables, self.nicknames = remote_tables, nicknames
+                        self.presence_changed()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                backplane_log.error("Backplane poll error: %s", e)
+            await asyncio.sleep(BACKPLANE_POLL_INTERVAL_SECONDS)
+
+    # 아래 메서드들은 백플레인 스레드에서만 실행됩니다.
+    def _latest_event_id(self) -> int:
+        with self.engine.connect() as connection:
+            return connection.execute(select(func.max(BackplaneEvent.id))).scalar() or 0
+
+    def _insert_event(self, channels: List[str], message: str):
+        with self.engine.begin() as connection:
+            connection.execute(insert(BackplaneEvent).values(
+                origin=self.origin, channels=channels, message=message, created_at=time.time()
+            ))
+
+    def _read_events(self) -> List[Tuple[List[str], str]]:
+        with self.engine.connect() as connection:
+            rows = connection.execute(
+                select(BackplaneEvent.id, BackplaneEvent.origin, BackplaneEvent.channels, BackplaneEvent.message)
+                .where(BackplaneEvent.id > self.last_event_id)
+                .order_by(BackplaneEvent.id)
+            ).all()
+        if rows:
+            self.last_event_id = rows[-1].id
+        return [(row.channels, row.message) for row in rows if row.origin != self.origin]
+
+    def _write_presence(self, table_id: int, connections: int):
+        with self.engine.begin() as connection:
+            if connections:
+                statement = sqlite_insert(BackplanePresence).values(
+                    origin=self.origin, table_id=table_id, connections=connections, updated_at=time.time()
+                )
+                connection.execute(statement.on_conflict_do_update(
+                    index_elements=["origin", "table_id"],
+                    set_={"connections": connections, "updated_at": statement.excluded.updated_at}
+                ))
+            else:
+                connection.execute(delete(BackplanePresence).where(
+                    BackplanePresence.origin == self.origin, BackplanePresence.table_id == table_id
+                ))
+
+    def _write_nickname(self, table_id: int, nickname: str):
+        with self.engine.begin() as connection:
+            statement = sqlite_insert(BackplaneNickname).values(table_id=table_id, nickname=nickname)
+            connection.execute(statement.on_conflict_do_update(index_elements=["table_id"], set_={"nickname": nickname}))
+
+    def _sync_presence(self) -> Tuple[set, Dict[int, str]]:
+        """하트비트 기록, 오래된 이벤트/접속 정보 정리 후 다른 프로세스의 접속 테이블과 닉네임 조회"""
+        now = time.time()
+        with self.engine.begin() as connection:
+            connection.execute(update(BackplanePresence).where(BackplanePresence.origin == self.origin).values(updated_at=now))
+            connection.execute(delete(BackplanePresence).where(BackplanePresence.updated_at < now - BACKPLANE_PRESENCE_TTL_SECONDS))
+            connection.execute(delete(BackplaneEvent).where(BackplaneEvent.created_at < now - BACKPLANE_EVENT_RETENTION_SECONDS))
+            remote_tables = set(connection.execute(
+                select(BackplanePresence.table_id).where(BackplanePresence.origin != self.origin)
+            ).scalars())
+            nicknames = dict(connection.execute(select(BackplaneNickname.table_id, BackplaneNickname.nickname)).all())
+        return remote_tables, nicknames
+
+    def _clear_presence(self):
+        with self.engine.begin() as connection:
+            connection.execute(delete(BackplanePresence).where(BackplanePresence.origin == self.origin))
+
+def create_backplane() -> Backplane:
+    if BACKPLANE == "sqlite":
+        return SQLiteBackplane(BACKPLANE_DATABASE_URL)
+    if BACKPLANE != "local":
+        backplane_log.warning("Unknown BACKPLANE %r, falling back to local", BACKPLANE)
+    return Backplane()
+
 # WebSocket 연결 관리를 위한 클래스
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[int, List[WebSocket]] = {}  # table_id: [websockets]
+    def __init__(self, backplane: Optional[Backplane] = None, event_log: Optional[EventLog] = None):
+        self.active_connections: Dict[int, List[ClientConnection]] = {}  # table_id: [connections]
         self.table_nicknames: Dict[int, str] = {}  # table_id: nickname
-        print("ConnectionManager initialized")
+        self.channels: Dict[str, set] = {}  # channel: {connections}
+        self.metrics = BroadcastMetrics()
+        self.backplane = backplane or Backplane()
+        self.event_log = event_log or EventLog(EVENT_LOG_SIZE)
+        self.remote_listeners: Dict[str, List[Any]] = {}  # channel: [callback(message)]
+        self.presence: Dict[int, str] = {}  # 마지막으로 알린 접속 테이블: 닉네임
+        self.presence_version = 0
+        self.presence_listeners: List[Any] = []  # callback(table_ids): 이 프로세스에서 바뀐 테이블
+        self._presence_flush: Optional[asyncio.TimerHandle] = None
+        self._presence_local_changes: set = set()
 
-    async def connect(self, websocket: WebSocket, table_id: int):
-        print(f"Attempting to accept WebSocket connection for table {table_id}")
+    async def start(self):
+        self.event_log.load()
+        await self.backplane.start(self._deliver_remote, self._presence_changed)
+
+    async def stop(self):
+        await self.backplane.stop()
+        self.event_log.save()
+
+    def add_remote_listener(self, channel: str, callback):
+        """다른 프로세스에서 온 채널 이벤트에 대한 콜백 등록 (예: 메뉴 캐시 갱신)"""
+        self.remote_listeners.setdefault(channel, []).append(callback)
+
+    def _deliver_remote(self, channels: List[str], message: str):
+        called = []  # 여러 채널에 등록된 콜백은 메시지당 한 번만 호출
+        for channel in channels:
+            for callback in self.remote_listeners.get(channel, []):
+                if callback in called:
+                    continue
+                called.append(callback)
+                try:
+                    callback(message)
+                except Exception:
+                    backplane_log.exception("Remote listener error for %s", channel)
+        if message.startswith("{"):
+            # publish()로 발행된 이벤트는 이 프로세스의 순번을 붙여 전달
+            message = self.event_log.append(channels, message)
+        self._deliver(channels, message)
+
+    def _deliver(self, channels: List[str], message: str) -> int:
+        """이 프로세스의 채널 구독자에게 전달"""
+        started = time.perf_counter()
+        if BROADCAST_ALL in channels:
+            recipients = [connection for connections in self.active_connections.values() for connection in connections]
+        else:
+            recipients = set()
+            for channel in channels:
+                recipients.update(self.channels.get(channel, ()))
+        queued = self._fan_out(list(recipients), message)
+        broadcast_fanout_seconds.observe(time.perf_counter() - started)
+        return queued
+
+    def _publish_presence(self, table_id: int):
+        self.backplane.update_presence(table_id, len(self.active_connections.get(table_id, [])))
+        self._presence_changed(table_id)
+
+    def add_presence_listener(self, callback):
+        """이 프로세스의 연결/닉네임 변경으로 접속 상태가 바뀐 테이블에 대한 콜백 등록"""
+        self.presence_listeners.append(callback)
+
+    def _presence_changed(self, table_id: Optional[int] = None):
+        """접속 상태가 바뀌었을 수 있음. 잠시 모았다가 _flush_presence()에서 한 번에 알림
+
+        table_id가 없으면 다른 프로세스(백플레인)에서 온 변경입니다.
+        """
+        if table_id is not None:
+            self._presence_local_changes.add(table_id)
+        if self._presence_flush is None:
+            self._presence_flush = asyncio.get_running_loop().call_later(PRESENCE_FLUSH_DELAY_SECONDS, self._flush_presence)
+
+    def _flush_presence(self):
+        """마지막으로 알린 접속 상태와 비교해 바뀐 부분만 presence 이벤트로 전송"""
+        self._presence_flush = None
+        local_changes, self._presence_local_changes = self._presence_local_changes, set()
+        current = {table_id: self.get_nickname(table_id) for table_id in self.get_online_tables()}
+        online = [
+            {"table_id": table_id, "nickname": nickname}
+            for table_id, nickname in current.items() if self.presence.get(table_id) != nickname
+        ]
+        offline = [table_id for table_id in self.presence if table_id not in current]
+        if not online and not offline:
+            return
+        self.presence = current
+        self.presence_version += 1
+        # 다른 프로세스도 각자 자기 연결에 알리므로 백플레인으로는 보내지 않음
+        message = json.dumps({"type": "presence", "version": self.presence_version, "online": online, "offline": offline})
+        self._deliver([CHANNEL_PRESENCE], self.event_log.append([CHANNEL_PRESENCE], message))
+
+        changed = local_changes & ({entry["table_id"] for entry in online} | set(offline))
+        for callback in self.presence_listeners if changed else []:
+            try:
+                callback(changed)
+            except Exception:
+                ws_log.exception("Presence listener error")
+
+    async def connect(self, websocket: WebSocket, table_id: int, resume: Optional[Tuple[Optional[str], int]] = None):
+        """resume: 재연결한 클라이언트가 마지막으로 받은 (epoch, seq). 첫 구독 요청 때 놓친 이벤트를 재전송"""
+        ws_log.debug("Accepting WebSocket connection for table %s", table_id)
         try:
             await websocket.accept()
-            print(f"WebSocket accepted for table {table_id}")
-            if table_id not in self.active_connections:
-                self.active_connections[table_id] = []
-            self.active_connections[table_id].append(websocket)
-            print(f"WebSocket added to active connections. Table {table_id} now has {len(self.active_connections[table_id])} connections")
-            print(f"Total tables connected: {len(self.active_connections)}")
+            connection = ClientConnection(websocket, table_id, self.metrics)
+            connection.start(self._drop_failed)
+            connection.resume = resume
+            connection.is_admin = table_id == 0 and is_admin_websocket(websocket)
+            self._add(connection)
+            ws_log.debug("Table %s now has %d connections (%d tables connected)", table_id, len(self.active_connections[table_id]), len(self.active_connections))
         except Exception as e:
-            print(f"Failed to accept WebSocket for table {table_id}: {str(e)}")
+            ws_log.warning("Failed to accept WebSocket for table %s: %s", table_id, e)
             raise
 
+    def _add(self, connection: ClientConnection):
+        self._subscribe(connection, table_channel(connection.table_id))  # 자기 테이블 채널은 기본 구독
+        self.active_connections.setdefault(connection.table_id, []).append(connection)
+        self._publish_presence(connection.table_id)
+
+    def open_stream(self, table_id: int, channels: List[str], resume: Optional[Tuple[Optional[str], int]] = None) -> StreamConnection:
+        """SSE 연결 등록. 구독 요청 없이 바로 채널을 구독하고 놓친 이벤트를 재전송"""
+        connection = StreamConnection(table_id, self.metrics, self.event_log.epoch, self.event_log.seq)
+        self._add(connection)
+        for channel in channels:
+            if is_channel_allowed(table_id, channel):
+                self._subscribe(connection, channel)
+        if resume is not None:
+            self._replay(connection, *resume)
+        self._fan_out([connection], self._subscribed_message(connection, []))
+        chat_log.debug("Event stream opened for table %s", table_id)
+        return connection
+
+    def close_stream(self, connection: StreamConnection):
+        self._remove(connection)
+        chat_log.debug("Event stream closed for table %s", connection.table_id)
+
+    def _remove(self, connection: ClientConnection):
+        connection.stop()
+        for channel in list(connection.channels):
+            self._unsubscribe(connection, channel)
+        connections = self.active_connections.get(connection.table_id)
+        if connections is None:
+            return
+        if connection in connections:
+            connections.remove(connection)
+            ws_log.debug("Connection removed from table %s. Remaining connections: %d", connection.table_id, len(connections))
+        if not connections:
+            del self.active_connections[connection.table_id]
+            ws_log.debug("Table %s has no connections left", connection.table_id)
+        self._publish_presence(connection.table_id)
+
     def disconnect(self, websocket: WebSocket, table_id: int):
-        print(f"Disconnecting WebSocket for table {table_id}")
         try:
-            if table_id in self.active_connections:
-                if websocket in self.active_connections[table_id]:
-                    self.active_connections[table_id].remove(websocket)
-                    print(f"WebSocket removed from table {table_id}. Remaining connections: {len(self.active_connections[table_id])}")
-                if not self.active_connections[table_id]:
-                    del self.active_connections[table_id]
-                    print(f"Table {table_id} removed from active connections (no connections left)")
-            print(f"Total tables connected: {len(self.active_connections)}")
+            for connection in self.active_connections.get(table_id, [])[:]:
+                if connection.websocket is websocket:
+                    self._remove(connection)
         except Exception as e:
-            print(f"Error disconnecting WebSocket for table {table_id}: {str(e)}")
+            ws_log.warning("Error disconnecting WebSocket for table %s: %s", table_id, e)
+
+    def _drop_failed(self, connection: ClientConnection):
+        """전송 실패/시간 초과로 끝난 연결 정리"""
+        self._remove(connection)
+        asyncio.create_task(connection.close(WS_CLOSE_TRY_AGAIN_LATER, "send failed"))
+
+    def _drop_slow(self, connection: ClientConnection):
+        """송신 큐가 넘친 느린 클라이언트를 끊음 (클라이언트는 재연결 후 최신 상태를 다시 받음)"""
+        ws_log.warning("Dropping slow WebSocket consumer for table %s (queue full)", connection.table_id)
+        self.metrics.slow_consumers_dropped += 1
+        self._remove(connection)
+        asyncio.create_task(connection.close(WS_CLOSE_TRY_AGAIN_LATER, "send queue overflow"))
+
+    def _fan_out(self, connections: List[ClientConnection], message: str) -> int:
+        queued = 0
+        for connection in connections:
+            if connection.enqueue(message):
+                queued += 1
+            elif not connection.closed:
+                self._drop_slow(connection)
+        return queued
+
+    def _find(self, websocket: WebSocket, table_id: int) -> Optional[ClientConnection]:
+        for connection in self.active_connections.get(table_id, []):
+            if connection.websocket is websocket:
+                return connection
+        return None
+
+    def _subscribe(self, connection: ClientConnection, channel: str):
+        connection.channels.add(channel)
+        self.channels.setdefault(channel, set()).add(connection)
+
+    def _unsubscribe(self, connection: ClientConnection, channel: str):
+        connection.channels.discard(channel)
+        subscribers = self.channels.get(channel)
+        if subscribers is not None:
+            subscribers.discard(connection)
+            if not subscribers:
+                del self.channels[channel]
+
+    async def send_personal(self, websocket: WebSocket, table_id: int, message: str):
+        """특정 소켓에게만 전송 (같은 송신 큐를 거쳐 순서 보장)"""
+        connection = self._find(websocket, table_id)
+        if connection is not None:
+            self._fan_out([connection], message)
+
+    async def handle_client_message(self, websocket: WebSocket, table_id: int, data: str) -> bool:
+        """구독/구독 해제 요청 처리. 처리한 메시지면 True
+
+        {"type": "subscribe", "channels": ["kitchen", "table.3"]} 형태이며,
+        결과로 현재 구독 중인 채널 목록과 현재 epoch/seq를 {"type": "subscribed"}로 돌려줍니다.
+        재연결한 소켓이면 그 전에 놓친 이벤트(또는 {"type": "resync"})를 먼저 보냅니다.
+        """
+        try:
+            request = json.loads(data)
+        except ValueError:
+            return False
+        if not isinstance(request, dict) or request.get("type") not in ("subscribe", "unsubscribe"):
+            return False
+        connection = self._find(websocket, table_id)
+        if connection is None:
+            return True
+        channels = request.get("channels") or []
+        channels = channels if isinstance(channels, list) else []
+        order_table_ids = {}
+        if not connection.is_admin:
+            order_table_ids = await load_order_table_ids([channel for channel in channels if isinstance(channel, str)])
+            if connection.closed:
+                return True
+        rejected = []
+        for channel in channels:
+            if not isinstance(channel, str) or not is_channel_allowed(table_id, channel, connection.is_admin, order_table_ids):
+                rejected.append(channel)
+            elif request["type"] == "subscribe":
+                self._subscribe(connection, channel)
+            else:
+                self._unsubscribe(connection, channel)
+        if connection.resume is not None and request["type"] == "subscribe":
+            self._replay(connection, *connection.resume)
+            connection.resume = None
+        self._fan_out([connection], self._subscribed_message(connection, rejected))
+        return True
+
+    def _subscribed_message(self, connection: ClientConnection, rejected: list) -> str:
+        return json.dumps({
+            "type": "subscribed",
+            "channels": sorted(connection.channels),
+            "rejected": rejected,
+            "epoch": self.event_log.epoch,
+            "seq": self.event_log.seq
+        })
+
+    def _replay(self, connection: ClientConnection, epoch: Optional[str], last_seq: int):
+        """구독 중인 채널에서 last_seq 이후 발행된 이벤트를 재전송. 이력이 없으면 resync를 보내 스냅샷을 다시 받게 함"""
+        missed = self.event_log.since(epoch, last_seq)
+        messages = None if missed is None else [
+            message for _, channels, message in missed
+            if BROADCAST_ALL in channels or not connection.channels.isdisjoint(channels)
+        ]
+        # 송신 큐에 다 들어가지 않을 만큼 밀렸으면 하나씩 보내는 것보다 스냅샷을 다시 받는 편이 빠름
+        if messages is None or len(messages) >= connection.queue.maxsize - connection.queue.qsize() - 1:
+            self.metrics.replay_resyncs += 1
+            self._fan_out([connection], json.dumps({"type": "resync", "epoch": self.event_log.epoch, "seq": self.event_log.seq}))
+            ws_log.info("Table %s resumed from %s/%s: history unavailable, resync", connection.table_id, epoch, last_seq)
+            return
+        self.metrics.events_replayed += len(messages)
+        for message in messages:
+            connection.enqueue(message)
+        ws_log.debug("Table %s resumed from seq %s: replayed %d events", connection.table_id, last_seq, len(messages))
+
+    async def publish(self, channels: List[str], event: dict):
+        """이벤트를 한 번만 직렬화해 채널 구독자에게 전송 (여러 채널을 구독한 소켓에도 한 번만)"""
+        message = json.dumps(event)
+        # 다른 프로세스는 자기 순번을 붙이므로 백플레인에는 순번 없이 전달
+        queued = self._deliver(channels, self.event_log.append(channels, message))
+        self.backplane.publish(channels, message)
+        ws_log.debug("Published %s to %s: queued for %d connections", event.get("type"), channels, queued, extra=SAMPLED)
 
     async def broadcast_to_all(self, message: str):
         """모든 연결된 클라이언트에게 메시지 전송"""
-        print(f"Broadcasting to all: {message}")
-        dead_connections = []
-        total_sent = 0
-        
-        for table_id, connections in self.active_connections.items():
-            for connection in connections[:]:  # 복사본 사용
-                try:
-                    await connection.send_text(message)
-                    total_sent += 1
-                except Exception as e:
-                    print(f"Failed to send to table {table_id}: {str(e)}")
-                    dead_connections.append((table_id, connection))
-        
-        # 죽은 연결 제거
-        for table_id, connection in dead_connections:
-            self.disconnect(connection, table_id)
-        
-        print(f"Message sent to {total_sent} connections")
+        total_queued = self._deliver([BROADCAST_ALL], message)
+        self.backplane.publish([BROADCAST_ALL], message)
+        ws_log.debug("Broadcast to all: queued for %d connections", total_queued, extra=SAMPLED)
 
     async def broadcast_to_table(self, table_id: int, message: str):
-        """특정 테이블에게만 메시지 전송"""
-        print(f"Broadcasting to table {table_id}: {message}")
-        if table_id in self.active_connections:
-            dead_connections = []
-            sent_count = 0
-            
-            for connection in self.active_connections[table_id][:]:  # 복사본 사용
-                try:
-                    await connection.send_text(message)
-                    sent_count += 1
-                except Exception as e:
-                    print(f"Failed to send to table {table_id}: {str(e)}")
-                    dead_connections.append(connection)
-            
-            # 죽은 연결 제거
-            for connection in dead_connections:
-                self.disconnect(connection, table_id)
-            
-            print(f"Message sent to {sent_count} connections for table {table_id}")
-        else:
-            print(f"Table {table_id} not found in active connections")
+        """특정 테이블 채널 구독자에게만 메시지 전송"""
+        queued_count = self._deliver([table_channel(table_id)], message)
+        self.backplane.publish([table_channel(table_id)], message)
+        ws_log.debug("Broadcast to table %s: queued for %d connections", table_id, queued_count, extra=SAMPLED)
 
     async def broadcast(self, message: str):
         """기존 호환성을 위한 메서드"""
         await self.broadcast_to_all(message)
 
+    def get_broadcast_metrics(self) -> dict:
+        """송신 큐 깊이/전송 시간 통계"""
+        connections = [connection for connections in self.active_connections.values() for connection in connections]
+        return self.metrics.snapshot(connections)
+
+    def get_channel_counts(self) -> Dict[str, int]:
+        """채널별 구독 연결 수 (테이블/주문 채널은 종류별로 합산)"""
+        counts: Dict[str, int] = {}
+        for channel, connections in self.channels.items():
+            prefix, _, key = channel.partition(".")
+            name = f"{prefix}.*" if key.isdigit() else channel
+            counts[name] = counts.get(name, 0) + len(connections)
+        return counts
+
     def get_online_tables(self) -> List[int]:
         """현재 온라인인 테이블 목록 반환"""
         online_tables = list(self.active_connections.keys())
-        print(f"Online tables: {online_tables}")
+        # 다른 워커 프로세스에 연결된 테이블 (백플레인 사용 시)
+        online_tables += sorted(self.backplane.remote_online_tables() - set(online_tables))
         return online_tables
 
     def set_nickname(self, table_id: int, nickname: str):
         """테이블의 닉네임 설정"""
+        if self.get_nickname(table_id) == nickname:
+            return
         self.table_nicknames[table_id] = nickname
-        print(f"Set nickname for table {table_id}: {nickname}")
+        self.backplane.set_nickname(table_id, nickname)
+        self._presence_changed(table_id)
+        chat_log.debug("Set nickname for table %s: %s", table_id, nickname)
 
     def get_nickname(self, table_id: int) -> str:
         """테이블의 닉네임 반환"""
-        nickname = self.table_nicknames.get(table_id, f"테이블{table_id}")
-        print(f"Get nickname for table {table_id}: {nickname}")
-        return nickname
+        return self.backplane.get_nickname(table_id) or self.table_nicknames.get(table_id, f"테이블{table_id}")
+
+def create_event_log() -> EventLog:
+    # 여러 워커가 같은 파일을 읽으면 서로 다른 이벤트에 같은 순번을 붙이게 되므로 단일 워커에서만 저장
+    if EVENT_LOG_PATH and BACKPLANE != "local":
+        ws_log.warning("EVENT_LOG_PATH is ignored when a cross-process backplane is used")
+        return EventLog(EVENT_LOG_SIZE)
+    return EventLog(EVENT_LOG_SIZE, EVENT_LOG_PATH)
+
+manager = ConnectionManager(create_backplane(), create_event_log())
+
+def reload_menu_cache(message: str):
+    """다른 워커에서 메뉴가 바뀌면 이 프로세스의 메뉴 캐시도 DB에서 다시 읽음"""
+    def refresh():
+        with SessionLocal() as db:
+            menu_cache.refresh(db)
+
+    asyncio.create_task(run_db(refresh))
+
+manager.add_remote_listener(CHANNEL_MENU, reload_menu_cache)
+# 다른 워커에서 보낸 채팅도 이 프로세스의 채팅 캐시에 추가 (개인 메시지는 테이블 채널로 발행됨)
+for _channel in [CHANNEL_CHAT_GLOBAL] + [table_channel(table_id) for table_id in TABLE_IDS]:
+    manager.add_remote_listener(_channel, chat_cache.ingest)
+
+# 주방/관리자 보드 실시간 갱신
+# 보드 페이지는 처음에 전체를 렌더링한 뒤, 바뀐 행만 board_delta 이벤트로 받아 교체합니다.
+# 보드 이름은 그 보드가 구독하는 WebSocket 채널과 같습니다.
+BOARDS = (CHANNEL_KITCHEN, CHANNEL_ADMIN_ORDERS, CHANNEL_ADMIN_TABLES, CHANNEL_ADMIN_WAITING)
+BOARD_SECTIONS = {
+    CHANNEL_KITCHEN: ("pending", "cooking", "completed", "cancelled"),
+    CHANNEL_ADMIN_ORDERS: ("pending", "cooking", "completed", "cancelled"),
+    CHANNEL_ADMIN_TABLES: ("tables",),
+    CHANNEL_ADMIN_WAITING: ("waiting", "recent"),
+}
+BOARD_DELTA_LOG_SIZE = int(os.getenv("BOARD_DELTA_LOG_SIZE", "500"))  # 재연결 시 따라잡기용으로 보관하는 변경 수
+
+board_rows = templates.env.get_template("_board_rows.html").module
+
+class BoardFeed:
+    """보드 하나의 변경 이력 (최근 BOARD_DELTA_LOG_SIZE개)
+
+    버전은 프로세스마다 따로 증가하므로 프로세스 시작 시 만든 epoch와 함께 다닙니다.
+    다른 프로세스에서 온 변경도 이 프로세스의 버전을 붙여 이력에 남기므로,
+    어느 워커에 다시 연결하든 그 워커의 epoch/버전 이후 변경을 받을 수 있습니다.
+    """
+
+    def __init__(self, board: str, epoch: str):
+        self.board = board
+        self.epoch = epoch
+        self.version = 0
+        self.log: deque = deque(maxlen=BOARD_DELTA_LOG_SIZE)
+
+    def append(self, event: str, rows: List[Dict[str, Any]], counts: Optional[Dict[str, int]] = None) -> dict:
+        self.version += 1
+        delta = {
+            "type": "board_delta",
+            "board": self.board,
+            "event": event,
+            "epoch": self.epoch,
+            "version": self.version,
+            "rows": rows
+        }
+        if counts is not None:
+            delta["counts"] = counts
+        self.log.append(delta)
+        return delta
+
+    def ingest(self, message: str):
+        """다른 프로세스에서 발행된 변경을 이력에 추가 (소켓 전달은 매니저가 따로 함)"""
+        delta = json.loads(message)
+        if delta.get("type") == "board_delta" and delta.get("epoch") != self.epoch:
+            self.append(delta["event"], delta["rows"], delta.get("counts"))
+
+    def since(self, epoch: str, version: int) -> Optional[List[dict]]:
+        """epoch/버전 이후의 변경 목록. 다른 epoch이거나 이력이 이미 밀려났으면 None (스냅샷 필요)"""
+        if epoch != self.epoch or version < 0 or version > self.version:
+            return None
+        if version < self.version - len(self.log):
+            return None
+        return [delta for delta in self.log if delta["version"] > version]
+
+BOARD_EPOCH = secrets.token_hex(8)
+board_feeds = {board: BoardFeed(board, BOARD_EPOCH) for board in BOARDS}
+for _board, _feed in board_feeds.items():
+    manager.add_remote_listener(_board, _feed.ingest)
 
-manager = ConnectionManager()
+def board_context(board: str) -> Dict[str, Any]:
+    """보드 페이지 템플릿에 넘기는 현재 epoch/버전"""
+    feed = board_feeds[board]
+    return {"board": board, "board_epoch": feed.epoch, "board_version": feed.version, "board_token": admin_socket_token()}
+
+def board_row(key: str, section: Optional[str], html=None) -> Dict[str, Any]:
+    """보드 행 하나. section이 None이면 화면에서 제거"""
+    return {"key": key, "section": section, "html": str(html) if section else None}
+
+def kitchen_order_row(order: Order, menu_names: Dict[str, str]) -> Dict[str, Any]:
+    section = "pending" if order.payment_status == "pending" and not order.is_cancelled else None
+    return board_row(f"order-{order.id}", section, section and board_rows.kitchen_pending_order_row(order, menu_names))
+
+KITCHEN_ITEM_ROW_MACROS = {
+    "cooking": "kitchen_cooking_item_row",
+    "completed": "kitchen_completed_item_row",
+    "cancelled": "kitchen_cancelled_item_row",
+}
+
+def kitchen_item_row(item: OrderItem) -> Dict[str, Any]:
+    """조리 아이템 행 (주방 화면의 조리 중/최근 완료/취소 목록 중 하나, 또는 없음)"""
+    order = item.order
+    if item.cooking_status == "cancelled":
+        section = "cancelled"
+    elif order.payment_status != "confirmed" or order.is_cancelled:
+        section = None
+    elif item.cooking_status in KITCHEN_ACTIVE_STATUSES:
+        section = "cooking"
+    elif item.cooking_status == "completed":
+        section = "completed"
+    else:
+        section = None
+    html = section and getattr(board_rows, KITCHEN_ITEM_ROW_MACROS[section])(item)
+    return board_row(f"item-{item.id}", section, html)
+
+ADMIN_ORDER_ROW_MACROS = {
+    "pending": "admin_pending_order_row",
+    "cooking": "admin_cooking_order_row",
+    "completed": "admin_completed_order_row",
+    "cancelled": "admin_cancelled_order_row",
+}
+
+def admin_order_row(order: Order, menu_names: Dict[str, str]) -> Dict[str, Any]:
+    """주문 관리 화면의 주문 행"""
+    if order.is_cancelled:
+        section = "cancelled"
+    elif order.payment_status == "pending":
+        section = "pending"
+    elif order.payment_status == "confirmed":
+        section = order.kitchen_status
+    else:
+        section = None
+    html = section and getattr(board_rows, ADMIN_ORDER_ROW_MACROS[section])(order, menu_names)
+    return board_row(f"order-{order.id}", section, html)
+
+def table_card_row(table: Dict[str, Any]) -> Dict[str, Any]:
+    return board_row(f"table-{table['table_id']}", "tables", board_rows.admin_table_card(table))
+
+def waiting_row(waiting: Waiting) -> Dict[str, Any]:
+    """웨이팅 관리 화면의 행 (대기 목록, 오늘 완료 목록, 또는 없음)"""
+    if waiting.status == "waiting":
+        section = "waiting"
+        html = board_rows.waiting_row(waiting)
+    elif waiting.status in ("seated", "cancelled") and waiting.created_at.replace(tzinfo=None) >= get_kst_today_start().replace(tzinfo=None):
+        section = "recent"
+        html = board_rows.waiting_recent_row(waiting)
+    else:
+        section = html = None
+    return board_row(f"waiting-{waiting.id}", section, html)
+
+def is_kitchen_board_item(item: OrderItem, category_by_id: Dict[int, str]) -> bool:
+    return is_kitchen_item(item.menu_item_id, category_by_id) and item.menu_item is not None
+
+def build_order_board_rows(db: Session, order_id: int, online_tables: set) -> Dict[str, List[Dict[str, Any]]]:
+    """주문 하나와 관련된 모든 보드 행을 현재 DB 상태로 다시 렌더링
+
+    주문 단위로 전체 행을 보내므로 같은 변경을 여러 번 적용해도 결과가 같습니다.
+    """
+    order = db.query(Order).options(
+        selectinload(Order.order_items).joinedload(OrderItem.menu_item)
+    ).filter(Order.id == order_id).first()
+    if order is None:
+        return {}
+    menu_names = get_menu_data(db)[1]
+    category_by_id = menu_cache.get(db).category_by_id
+
+    kitchen_rows = [kitchen_order_row(order, menu_names)]
+    kitchen_rows += [kitchen_item_row(item) for item in order.order_items if is_kitchen_board_item(item, category_by_id)]
+    table = attach_table_presence(get_table_order_stats(db, [order.table_id])[order.table_id], online_tables)
+    return {
+        CHANNEL_KITCHEN: kitchen_rows,
+        CHANNEL_ADMIN_ORDERS: [admin_order_row(order, menu_names)],
+        CHANNEL_ADMIN_TABLES: [table_card_row(table)] if order.table_id in TABLE_IDS else [],
+    }
+
+async def publish_board(board: str, event: str, rows: List[Dict[str, Any]], counts: Optional[Dict[str, int]] = None):
+    if not rows and counts is None:
+        return
+    await manager.publish([board], board_feeds[board].append(event, rows, counts))
+
+async def publish_order_board(db: Session, event: str, order_id: int):
+    """주문이 바뀐 뒤 주방/주문 관리/테이블 현황 보드에 바뀐 행을 전송 (실패해도 요청은 성공)"""
+    try:
+        online_tables = set(manager.get_online_tables())
+        rows_by_board = await run_db(build_order_board_rows, db, order_id, online_tables)
+        for board, rows in rows_by_board.items():
+            await publish_board(board, event, rows)
+    except Exception:
+        board_log.exception("Board update error for order %s", order_id)
+
+def publish_presence_board(table_ids: set):
+    """접속/퇴장/닉네임 변경이 있은 테이블의 카드를 테이블 현황 보드에 전송"""
+    table_ids = sorted(table_id for table_id in table_ids if table_id in TABLE_IDS)
+    if not table_ids:
+        return
+
+    def build():
+        with SessionLocal() as db:
+            return get_table_order_stats(db, table_ids)
+
+    async def publish():
+        try:
+            online_tables = set(manager.get_online_tables())
+            stats_by_table = await run_db(build)
+            rows = [table_card_row(attach_table_presence(stats_by_table[table_id], online_tables)) for table_id in table_ids]
+            await publish_board(CHANNEL_ADMIN_TABLES, "presence_changed", rows)
+        except Exception:
+            board_log.exception("Board update error for presence of tables %s", table_ids)
+
+    asyncio.create_task(publish())
+
+manager.add_presence_listener(publish_presence_board)
+
+async def publish_waiting_board(db: Session, event: str, waiting_id: int):
+    """웨이팅이 바뀐 뒤 웨이팅 관리 보드에 바뀐 행과 오늘 통계를 전송"""
+    def build():
+        waiting = db.query(Waiting).filter(Waiting.id == waiting_id).first()
+        return ([waiting_row(waiting)] if waiting else []), get_waiting_today_stats(db)
+
+    try:
+        rows, counts = await run_db(build)
+        await publish_board(CHANNEL_ADMIN_WAITING, event, rows, counts)
+    except Exception:
+        board_log.exception("Board update error for waiting %s", waiting_id)
+
+def build_board_snapshot(db: Session, board: str, online_tables: set) -> Dict[str, Any]:
+    """보드 전체 행과 통계 (페이지 렌더링과 같은 조회 사용)"""
+    counts = None
+    if board == CHANNEL_KITCHEN:
+        data = load_kitchen_board(db)
+        rows = [kitchen_order_row(order, data["menu_names"]) for order in data["pending_orders"]]
+        rows += [kitchen_item_row(item) for key in ("cooking_items", "completed_items", "cancelled_items") for item in data[key]]
+    elif board == CHANNEL_ADMIN_ORDERS:
+        data = load_admin_orders_board(db)
+        rows = [
+            admin_order_row(order, data["menu_names"])
+            for key in ("pending_orders", "cooking_orders", "completed_orders", "cancelled_orders")
+            for order in data[key]
+        ]
+    elif board == CHANNEL_ADMIN_TABLES:
+        stats_by_table = get_table_order_stats(db, TABLE_IDS)
+        rows = [table_card_row(attach_table_presence(stats_by_table[table_id], online_tables)) for table_id in TABLE_IDS]
+    else:
+        data = load_waiting_board(db)
+        rows = [waiting_row(waiting) for waiting in data["waiting_list"] + data["recent_completed"]]
+        counts = data["today_stats"]
+
+    sections = {section: [] for section in BOARD_SECTIONS[board]}
+    for row in rows:
+        if row["section"] in sections:
+            sections[row["section"]].append({"key": row["key"], "html": row["html"]})
+    snapshot = {"sections": sections}
+    if counts is not None:
+        snapshot["counts"] = counts
+    return snapshot
+
+@app.get("/admin/board/state")
+async def board_state(
+    board: str,
+    since: Optional[int] = None,
+    epoch: Optional[str] = None,
+    db: Session = Depends(get_db),
+    username: str = Depends(verify_admin)
+):
+    """보드 상태 조회
+
+    since/epoch를 주면 그 이후의 변경(board_delta 목록)을, 이력이 부족하거나 처음 요청이면
+    전체 스냅샷을 돌려줍니다. 재연결한 보드 화면이 놓친 변경을 따라잡을 때 사용합니다.
+    """
+    if board not in board_feeds:
+        raise HTTPException(status_code=404, detail="Unknown board")
+    feed = board_feeds[board]
+
+    if since is not None and epoch:
+        deltas = feed.since(epoch, since)
+        if deltas is not None:
+            return {"board": board, "epoch": feed.epoch, "version": feed.version, "deltas": deltas}
+
+    # 조회 전에 버전을 읽어, 조회 중에 생긴 변경은 클라이언트가 소켓으로 받아 다시 적용하도록 함
+    version = feed.version
+    online_tables = set(manager.get_online_tables())
+    snapshot = await run_db(build_board_snapshot, db, board, online_tables)
+    return {"board": board, "epoch": feed.epoch, "version": version, "snapshot": snapshot}
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9091"))  # 0이면 지표 서버를 띄우지 않음
+METRICS_HOST = os.getenv("METRICS_HOST", "0.0.0.0")
+
+def load_service_counts() -> Tuple[Dict[str, int], Dict[str, int]]:
+    """상태별 주방 아이템 수와 오늘의 웨이팅 상태별 수"""
+    with SessionLocal() as db:
+        kitchen = dict(db.query(OrderItem.cooking_status, func.count(OrderItem.id)).group_by(OrderItem.cooking_status).all())
+        return kitchen, get_waiting_today_stats(db)
+
+async def render_metrics() -> str:
+    """누적 지표와 수집 시점의 상태(연결, 송신 큐, 주방/웨이팅)를 텍스트 형식으로"""
+    lines = []
+    for metric in METRICS:
+        lines += format_metric(metric.kind, metric.name, metric.help_text, metric.samples())
+
+    broadcast = manager.get_broadcast_metrics()
+    gauges = [
+        ("realtime_connections", "Open WebSocket and SSE connections in this process", [("", (), (), broadcast["connections"])]),
+        ("realtime_channel_connections", "Connections subscribed to each channel", [
+            ("", ("channel",), (channel,), count) for channel, count in sorted(manager.get_channel_counts().items())
+        ]),
+        ("broadcast_queue_depth", "Messages waiting in all send queues", [("", (), (), broadcast["queue_depth_current_total"])]),
+        ("broadcast_queue_depth_max", "Deepest send queue right now", [("", (), (), broadcast["queue_depth_current_max"])]),
+        ("broadcast_queue_depth_peak", "Deepest send queue since start", [("", (), (), broadcast["queue_depth_max"])]),
+    ]
+    counters = [
+        ("broadcast_messages_enqueued_total", "Messages put on send queues", broadcast["messages_enqueued"]),
+        ("broadcast_messages_sent_total", "Messages written to sockets", broadcast["messages_sent"]),
+        ("broadcast_send_failures_total", "Failed or timed out socket writes", broadcast["send_failures"]),
+        ("broadcast_slow_consumers_dropped_total", "Connections dropped for a full send queue", broadcast["slow_consumers_dropped"]),
+        ("broadcast_events_replayed_total", "Events replayed to reconnecting clients", broadcast["events_replayed"]),
+        ("broadcast_replay_resyncs_total", "Reconnects answered with a resync instead of a replay", broadcast["replay_resyncs"]),
+        ("broadcast_send_seconds_total", "Time spent writing to sockets", broadcast["send_seconds_total"]),
+        ("process_cpu_seconds_total", "User and system CPU time of this process", round(sum(os.times()[:2]), 3)),
+    ]
+
+    kitchen, waiting = await run_db(load_service_counts)
+    gauges += [
+        ("kitchen_items", "Order items by cooking status", [
+            ("", ("cooking_status",), (status,), count) for status, count in sorted(kitchen.items())
+        ]),
+        ("waiting_queue_length", "Parties currently waiting", [("", (), (), waiting["waiting"])]),
+        ("waiting_today", "Today's waiting entries by status", [
+            ("", ("status",), (status,), waiting[status]) for status in WAITING_STATUSES
+        ]),
+    ]
+
+    for name, help_text, value in counters:
+        lines += format_metric("counter", name, help_text, [("", (), (), value)])
+    for name, help_text, samples in gauges:
+        lines += format_metric("gauge", name, help_text, samples)
+    return "\n".join(lines) + "\n"
+
+# 지표는 서비스 포트와 분리된 별도 서버로 제공 (외부에 공개되는 앱에는 /metrics가 없음)
+metrics_app = FastAPI(docs_url=None, redoc_url=None, openapi_url=None)
+
+@metrics_app.get("/metrics")
+async def metrics_endpoint():
+    return Response(await render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+class MetricsServer(uvicorn.Server):
+    """메인 서버와 같은 이벤트 루프에서 도는 지표 서버 (종료 시그널은 메인 서버가 처리)"""
+    def install_signal_handlers(self):
+        pass
+
+metrics_server: Optional[MetricsServer] = None
+metrics_server_task: Optional[asyncio.Task] = None
+
+async def start_metrics_server():
+    global metrics_server, metrics_server_task
+    if not METRICS_PORT:
+        return
+    # 여러 워커를 띄우면 포트를 먼저 잡은 워커 하나만 지표를 제공
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    try:
+        sock.bind((METRICS_HOST, METRICS_PORT))
+    except OSError as e:
+        sock.close()
+        metrics_log.warning("Metrics server not started on %s:%s: %s", METRICS_HOST, METRICS_PORT, e)
+        return
+    metrics_server = MetricsServer(uvicorn.Config(metrics_app, lifespan="off", access_log=False, log_config=None))
+    metrics_server_task = asyncio.create_task(metrics_server.serve(sockets=[sock]))
+    metrics_log.info("Serving metrics on %s:%s/metrics", METRICS_HOST, METRICS_PORT)
+
+async def stop_metrics_server():
+    global metrics_server, metrics_server_task
+    if metrics_server is None:
+        return
+    metrics_server.should_exit = True
+    await metrics_server_task
+    metrics_server = metrics_server_task = None
+
+@app.on_event("startup")
+async def start_connection_manager():
+    await manager.start()
+    await start_metrics_server()
+    asyncio.create_task(migrate_legacy_menu_images())
+    asyncio.create_task(precompress_static_assets())
+
+@app.on_event("shutdown")
+async def stop_connection_manager():
+    await stop_metrics_server()
+    await manager.stop()
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     # 기본 테이블 ID (관리자용)으로 0을 사용
-    print(f"WebSocket connection attempt from {websocket.client} to /ws")
     try:
         await manager.connect(websocket, 0)
-        print(f"WebSocket connected successfully to /ws")
         while True:
             data = await websocket.receive_text()
-            print(f"WebSocket /ws received: {data}")
+            ws_log.debug("WebSocket /ws received %d bytes", len(data), extra=SAMPLED)
             await manager.broadcast_to_all(f"Message text was: {data}")
     except WebSocketDisconnect:
-        print(f"WebSocket disconnected from /ws")
+        ws_log.debug("WebSocket disconnected from /ws")
         manager.disconnect(websocket, 0)
     except Exception as e:
-        print(f"WebSocket error on /ws: {str(e)}")
+        ws_log.warning("WebSocket error on /ws: %s", e)
         try:
             manager.disconnect(websocket, 0)
         except:
             pass
 
 @app.websocket("/ws/{table_id}")
-async def websocket_chat_endpoint(websocket: WebSocket, table_id: int):
-    print(f"WebSocket connection attempt from {websocket.client} to /ws/{table_id}")
-    
+async def websocket_chat_endpoint(websocket: WebSocket, table_id: int, last_seq: Optional[int] = None, epoch: Optional[str] = None):
+    """테이블/관리자 소켓. 재연결 시 ?last_seq=&epoch=를 주면 첫 구독 요청 때 놓친 이벤트를 이어서 받음"""
     # 명시적으로 WebSocket 헤더 확인
-    connection_header = websocket.headers.get("connection", "").lower()
     upgrade_header = websocket.headers.get("upgrade", "").lower()
     
-    print(f"Connection header: {connection_header}")
-    print(f"Upgrade header: {upgrade_header}")
-    print(f"WebSocket headers: {dict(websocket.headers)}")
-    
     if "websocket" not in upgrade_header:
-        print("❌ WebSocket upgrade header missing")
+        ws_log.info("WebSocket upgrade header missing from %s on /ws/%s", websocket.client, table_id)
         await websocket.close(code=1002, reason="WebSocket upgrade required")
         return
     
     try:
-        await manager.connect(websocket, table_id)
-        print(f"WebSocket connected successfully to /ws/{table_id}")
+        await manager.connect(websocket, table_id, (epoch, last_seq) if last_seq is not None else None)
         while True:
             data = await websocket.receive_text()
-            print(f"WebSocket /ws/{table_id} received: {data}")
             # 클라이언트에서 ping 메시지 처리
             if data == "ping":
-                await websocket.send_text("pong")
-                print(f"Sent pong to table {table_id}")
+                await manager.send_personal(websocket, table_id, "pong")
+            elif await manager.handle_client_message(websocket, table_id, data):
+                ws_log.debug("Updated subscriptions for table %s", table_id)
             else:
                 # 다른 메시지 처리 (필요시 확장)
-                print(f"Unknown message from table {table_id}: {data}")
+                ws_log.debug("Unknown message from table %s (%d bytes)", table_id, len(data), extra=SAMPLED)
     except WebSocketDisconnect:
-        print(f"WebSocket disconnected from /ws/{table_id}")
+        ws_log.debug("WebSocket disconnected from /ws/%s", table_id)
         manager.disconnect(websocket, table_id)
     except Exception as e:
-        print(f"WebSocket error on /ws/{table_id}: {str(e)}")
+        ws_log.warning("WebSocket error on /ws/%s: %s", table_id, e)
         try:
             manager.disconnect(websocket, table_id)
         except:
@@ -1662,20 +4315,28 @@ async def update_payment_status(
         if not table_id or not status:
             return {"success": False, "error": "Missing required fields"}
             
-        # Get the latest order for this table
-        order = db.query(Order).filter(
-            Order.table_id == table_id
-        ).order_by(Order.created_at.desc()).first()
-        
-        if not order:
-            return {"success": False, "error": "Order not found"}
-            
-        order.payment_status = status
-        db.commit()
-        
-        return {"success": True}
+        def update():
+            # Get the latest order for this table
+            order = db.query(Order).filter(
+                Order.table_id == table_id
+            ).order_by(Order.created_at.desc()).first()
+
+            if not order:
+                return {"success": False, "error": "Order not found"}
+
+            order.payment_status = status
+            db.commit()
+
+            return {"success": True, "order_id": order.id}
+
+        result = await run_db(update)
+        if result["success"]:
+            if status == "confirmed":
+                orders_confirmed.inc()
+            await publish_order_board(db, "order_status_changed", result.pop("order_id"))
+        return result
     except Exception as e:
-        db.rollback()
+        await run_db(db.rollback)
         return {"success": False, "error": str(e)}
 
 @app.get("/api/menu-data")
@@ -1688,8 +4349,8 @@ async def get_menu_data_api(db: Session = Depends(get_db)):
             "menu_names": menu_names_by_id,
             "categories": category_display_names
         }
-    except Exception as e:
-        print(f"Error in get_menu_data_api: {str(e)}")
+    except Exception:
+        menu_log.exception("Error in get_menu_data_api")
         raise HTTPException(status_code=500, detail="Failed to load menu data")
 
 @app.get("/order-success/{order_id}", response_class=HTMLResponse)
@@ -1700,23 +4361,26 @@ async def order_success_page(
     db: Session = Depends(get_db)
 ):
     """주문 완료 페이지"""
-    order = db.query(Order).filter(Order.id == order_id).first()
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
-    
-    # 메뉴 데이터 가져오기
-    menu_item_details_for_js, menu_names_by_id, menu_items_grouped_by_category, category_display_names = get_menu_data(db)
-    
-    return templates.TemplateResponse(
-        "order_success.html",
-        {
-            "request": request,
-            "order": order,
-            "table_id": order.table_id,
-            "menu_names": menu_names_by_id,
-            "is_gift_order": gift
-        }
-    )
+    def render():
+        order = db.query(Order).filter(Order.id == order_id).first()
+        if not order:
+            raise HTTPException(status_code=404, detail="Order not found")
+
+        # 메뉴 데이터 가져오기
+        menu_item_details_for_js, menu_names_by_id, menu_items_grouped_by_category, category_display_names = get_menu_data(db)
+
+        return templates.TemplateResponse(
+            "order_success.html",
+            {
+                "request": request,
+                "order": order,
+                "table_id": order.table_id,
+                "menu_names": menu_names_by_id,
+                "is_gift_order": gift
+            }
+        )
+
+    return await run_db(render)
 
 @app.post("/chat/gift-order")
 async def create_gift_order(
@@ -1725,7 +4389,7 @@ async def create_gift_order(
 ):
     """다른 테이블에 주문하기 (선물 주문)"""
     try:
-        print(f"Received gift order - from: {request.from_table_id}, to: {request.to_table_id}, menu: {request.menu}")
+        orders_log.debug("Received gift order from table %s to table %s", request.from_table_id, request.to_table_id)
         
         # 메뉴 데이터 가져오기
         menu_item_details_for_js, menu_names_by_id, menu_items_grouped_by_category, category_display_names = get_menu_data(db)
@@ -1749,39 +4413,41 @@ async def create_gift_order(
                 valid_order_items[item_id] = quantity
                 
             except (ValueError, TypeError) as e:
-                print(f"Error processing item {item_id}: {str(e)}")
+                orders_log.info("Skipping order item %s: %s", item_id, e)
                 continue
         
         if not valid_order_items:
             raise HTTPException(status_code=400, detail="No valid items in order")
         
-        # 주문 생성
-        order = Order(
-            table_id=request.to_table_id,  # 받는 테이블
-            menu=valid_order_items,
-            amount=total_amount,
-            payment_status="pending"  # 선물 주문도 결제 대기 상태로 시작
-        )
-        
-        db.add(order)
-        db.flush()  # ID 생성을 위해 flush
-        
-        # 세트 메뉴 분해 및 OrderItem 생성
-        decomposed_items = decompose_set_menu(valid_order_items, db)
-        
-        for item_data in decomposed_items:
-            order_item = OrderItem(
-                order_id=order.id,
-                menu_item_id=item_data["menu_item_id"],
-                quantity=item_data["quantity"],
-                is_set_component=item_data["is_set_component"],
-                parent_set_name=item_data["parent_set_name"],
-                notes=item_data.get("notes")
+        def create_order():
+            # 세트 메뉴 분해 (메뉴 스냅샷의 전개표 사용)
+            decomposed_items = decompose_set_menu(valid_order_items, db)
+            category_by_id = menu_cache.get(db).category_by_id
+            kitchen_remaining_count = sum(is_kitchen_item(item["menu_item_id"], category_by_id) for item in decomposed_items)
+
+            # 주문 생성
+            order = Order(
+                table_id=request.to_table_id,  # 받는 테이블
+                menu=valid_order_items,
+                amount=total_amount,
+                payment_status="pending",  # 선물 주문도 결제 대기 상태로 시작
+                kitchen_status="cooking" if kitchen_remaining_count else "completed",
+                kitchen_remaining_count=kitchen_remaining_count,
+                kitchen_completed_count=0
             )
-            db.add(order_item)
-        
-        db.commit()
-        db.refresh(order)
+
+            db.add(order)
+            db.flush()  # ID 생성을 위해 flush
+
+            # 주문 아이템은 한 번의 INSERT로 추가
+            if decomposed_items:
+                db.execute(insert(OrderItem), [{**item, "order_id": order.id} for item in decomposed_items])
+            db.commit()
+            db.refresh(order)
+            return order
+
+        order = await run_db(create_order)
+        orders_created.inc("gift")
         
         # 선물한 사람 정보
         from_nickname = manager.get_nickname(request.from_table_id)
@@ -1803,7 +4469,7 @@ async def create_gift_order(
         }
         
         # 받는 테이블에 알림
-        await manager.broadcast_to_table(request.to_table_id, json.dumps(gift_notification))
+        await manager.publish([table_channel(request.to_table_id)], gift_notification)
         
         # 전체 채팅에도 알림 (선택적)
         chat_notification = {
@@ -1812,7 +4478,7 @@ async def create_gift_order(
             "to_nickname": to_nickname,
             "amount": total_amount
         }
-        await manager.broadcast_to_all(json.dumps(chat_notification))
+        await manager.publish([CHANNEL_CHAT_GLOBAL], chat_notification)
         
         # 관리자/주방에도 알림
         admin_notification = {
@@ -1823,7 +4489,8 @@ async def create_gift_order(
             "is_gift": True,
             "from_table_id": request.from_table_id
         }
-        await manager.broadcast_to_table(0, json.dumps(admin_notification))  # 관리자 테이블
+        await manager.publish([CHANNEL_KITCHEN, CHANNEL_ADMIN_ORDERS, order_channel(order.id)], admin_notification)
+        await publish_order_board(db, "order_added", order.id)
         
         return {
             "success": True,
@@ -1833,9 +4500,9 @@ async def create_gift_order(
         
     except HTTPException:
         raise
-    except Exception as e:
-        print(f"Unexpected error in create_gift_order: {str(e)}")
-        db.rollback()
+    except Exception:
+        orders_log.exception("Unexpected error in create_gift_order")
+        await run_db(db.rollback)
         raise HTTPException(status_code=500, detail="Internal server error")
 
 # 웨이팅 관련 엔드포인트
@@ -1849,26 +4516,30 @@ async def add_waiting(
 ):
     """웨이팅 등록"""
     try:
-        # 전화번호 중복 확인 (대기 중인 웨이팅만)
-        existing_waiting = db.query(Waiting).filter(
-            Waiting.phone == phone,
-            Waiting.status == "waiting"
-        ).first()
-        
-        if existing_waiting:
-            raise HTTPException(status_code=400, detail="이미 대기 중인 전화번호입니다.")
-        
-        waiting = Waiting(
-            name=name,
-            phone=phone,
-            party_size=party_size,
-            notes=notes,
-            status="waiting"
-        )
-        
-        db.add(waiting)
-        db.commit()
-        db.refresh(waiting)
+        def save():
+            # 전화번호 중복 확인 (대기 중인 웨이팅만)
+            existing_waiting = db.query(Waiting).filter(
+                Waiting.phone == phone,
+                Waiting.status == "waiting"
+            ).first()
+
+            if existing_waiting:
+                raise HTTPException(status_code=400, detail="이미 대기 중인 전화번호입니다.")
+
+            waiting = Waiting(
+                name=name,
+                phone=phone,
+                party_size=party_size,
+                notes=notes,
+                status="waiting"
+            )
+
+            db.add(waiting)
+            db.commit()
+            db.refresh(waiting)
+            return waiting
+
+        waiting = await run_db(save)
         
         # 관리자에게 알림
         notification = {
@@ -1879,17 +4550,51 @@ async def add_waiting(
             "party_size": party_size,
             "notes": notes
         }
-        await manager.broadcast_to_table(0, json.dumps(notification))
+        await manager.publish([CHANNEL_ADMIN_WAITING], notification)
+        await publish_waiting_board(db, "waiting_added", waiting.id)
         
         return {"success": True, "waiting_id": waiting.id, "message": "웨이팅이 등록되었습니다."}
         
     except HTTPException:
         raise
-    except Exception as e:
-        db.rollback()
-        print(f"Error adding waiting: {str(e)}")
+    except Exception:
+        await run_db(db.rollback)
+        waiting_log.exception("Error adding waiting")
         raise HTTPException(status_code=500, detail="웨이팅 등록 중 오류가 발생했습니다.")
 
+WAITING_STATUSES = ("waiting", "called", "seated", "cancelled")
+
+def get_waiting_today_stats(db: Session) -> Dict[str, int]:
+    """오늘의 웨이팅 상태별 수 (GROUP BY 한 번)"""
+    today_stats = {"total": 0, **{status: 0 for status in WAITING_STATUSES}}
+    rows = db.query(Waiting.status, func.count(Waiting.id)).filter(
+        Waiting.created_at >= get_kst_today_start()
+    ).group_by(Waiting.status).all()
+    for status, count in rows:
+        today_stats["total"] += count
+        if status in today_stats:
+            today_stats[status] = count
+    return today_stats
+
+def load_waiting_board(db: Session) -> Dict[str, Any]:
+    """웨이팅 관리 화면의 목록과 통계 (페이지 렌더링과 보드 스냅샷에서 함께 사용)"""
+    # 현재 대기 중인 웨이팅 목록
+    waiting_list = db.query(Waiting).filter(
+        Waiting.status == "waiting"
+    ).order_by(Waiting.created_at.asc()).all()
+
+    # 최근 완료된 웨이팅 (오늘, 착석/취소 시각 순)
+    recent_completed = db.query(Waiting).filter(
+        Waiting.created_at >= get_kst_today_start(),
+        Waiting.status.in_(["seated", "cancelled"])
+    ).order_by(func.coalesce(Waiting.seated_at, Waiting.cancelled_at).desc()).limit(BOARD_RECENT_LIMIT).all()
+
+    return {
+        "waiting_list": waiting_list,
+        "today_stats": get_waiting_today_stats(db),
+        "recent_completed": recent_completed
+    }
+
 @app.get("/admin/waiting", response_class=HTMLResponse)
 async def admin_waiting(
     request: Request,
@@ -1897,50 +4602,20 @@ async def admin_waiting(
     username: str = Depends(verify_admin)
 ):
     """웨이팅 관리 페이지"""
-    # 현재 대기 중인 웨이팅 목록
-    waiting_list = db.query(Waiting).filter(
-        Waiting.status == "waiting"
-    ).order_by(Waiting.created_at.asc()).all()
-    
-    # 오늘의 웨이팅 통계
-    today_start = get_kst_today_start()
-    
-    today_stats = {
-        "total": db.query(Waiting).filter(Waiting.created_at >= today_start).count(),
-        "waiting": db.query(Waiting).filter(
-            Waiting.created_at >= today_start,
-            Waiting.status == "waiting"
-        ).count(),
-        "called": db.query(Waiting).filter(
-            Waiting.created_at >= today_start,
-            Waiting.status == "called"
-        ).count(),
-        "seated": db.query(Waiting).filter(
-            Waiting.created_at >= today_start,
-            Waiting.status == "seated"
-        ).count(),
-        "cancelled": db.query(Waiting).filter(
-            Waiting.created_at >= today_start,
-            Waiting.status == "cancelled"
-        ).count()
-    }
-    
-    # 최근 완료된 웨이팅 (오늘)
-    recent_completed = db.query(Waiting).filter(
-        Waiting.created_at >= today_start,
-        Waiting.status.in_(["seated", "cancelled"])
-    ).order_by(Waiting.seated_at.desc(), Waiting.cancelled_at.desc()).limit(10).all()
-    
-    return templates.TemplateResponse(
-        "admin_waiting.html",
-        {
-            "request": request,
-            "waiting_list": waiting_list,
-            "today_stats": today_stats,
-            "recent_completed": recent_completed,
-            "username": username
-        }
-    )
+    board = board_context(CHANNEL_ADMIN_WAITING)
+
+    def render():
+        return templates.TemplateResponse(
+            "admin_waiting.html",
+            {
+                "request": request,
+                **load_waiting_board(db),
+                **board,
+                "username": username
+            }
+        )
+
+    return await run_db(render)
 
 @app.post("/admin/waiting/call/{waiting_id}")
 async def call_waiting(
@@ -1949,18 +4624,23 @@ async def call_waiting(
     username: str = Depends(verify_admin)
 ):
     """웨이팅 호출"""
-    waiting = db.query(Waiting).filter(Waiting.id == waiting_id).first()
-    if not waiting:
-        raise HTTPException(status_code=404, detail="웨이팅을 찾을 수 없습니다.")
-    
-    if waiting.status != "waiting":
-        raise HTTPException(status_code=400, detail="대기 중인 웨이팅만 호출할 수 있습니다.")
-    
-    waiting.status = "called"
-    waiting.called_at = get_kst_now()
-    db.commit()
-    
-    return {"success": True, "message": f"{waiting.name}님을 호출했습니다."}
+    def call():
+        waiting = db.query(Waiting).filter(Waiting.id == waiting_id).first()
+        if not waiting:
+            raise HTTPException(status_code=404, detail="웨이팅을 찾을 수 없습니다.")
+
+        if waiting.status != "waiting":
+            raise HTTPException(status_code=400, detail="대기 중인 웨이팅만 호출할 수 있습니다.")
+
+        waiting.status = "called"
+        waiting.called_at = get_kst_now()
+        db.commit()
+
+        return {"success": True, "message": f"{waiting.name}님을 호출했습니다."}
+
+    result = await run_db(call)
+    await publish_waiting_board(db, "waiting_called", waiting_id)
+    return result
 
 @app.post("/admin/waiting/seat/{waiting_id}")
 async def seat_waiting(
@@ -1970,19 +4650,24 @@ async def seat_waiting(
     username: str = Depends(verify_admin)
 ):
     """웨이팅 착석 처리"""
-    waiting = db.query(Waiting).filter(Waiting.id == waiting_id).first()
-    if not waiting:
-        raise HTTPException(status_code=404, detail="웨이팅을 찾을 수 없습니다.")
-    
-    if waiting.status not in ["waiting", "called"]:
-        raise HTTPException(status_code=400, detail="대기 중이거나 호출된 웨이팅만 착석 처리할 수 있습니다.")
-    
-    waiting.status = "seated"
-    waiting.seated_at = get_kst_now()
-    waiting.table_id = table_id
-    db.commit()
-    
-    return {"success": True, "message": f"{waiting.name}님이 {table_id}번 테이블에 착석했습니다."}
+    def seat():
+        waiting = db.query(Waiting).filter(Waiting.id == waiting_id).first()
+        if not waiting:
+            raise HTTPException(status_code=404, detail="웨이팅을 찾을 수 없습니다.")
+
+        if waiting.status not in ["waiting", "called"]:
+            raise HTTPException(status_code=400, detail="대기 중이거나 호출된 웨이팅만 착석 처리할 수 있습니다.")
+
+        waiting.status = "seated"
+        waiting.seated_at = get_kst_now()
+        waiting.table_id = table_id
+        db.commit()
+
+        return {"success": True, "message": f"{waiting.name}님이 {table_id}번 테이블에 착석했습니다."}
+
+    result = await run_db(seat)
+    await publish_waiting_board(db, "waiting_seated", waiting_id)
+    return result
 
 @app.post("/admin/waiting/cancel/{waiting_id}")
 async def cancel_waiting(
@@ -1991,18 +4676,23 @@ async def cancel_waiting(
     username: str = Depends(verify_admin)
 ):
     """웨이팅 취소"""
-    waiting = db.query(Waiting).filter(Waiting.id == waiting_id).first()
-    if not waiting:
-        raise HTTPException(status_code=404, detail="웨이팅을 찾을 수 없습니다.")
-    
-    if waiting.status not in ["waiting", "called"]:
-        raise HTTPException(status_code=400, detail="대기 중이거나 호출된 웨이팅만 취소할 수 있습니다.")
-    
-    waiting.status = "cancelled"
-    waiting.cancelled_at = get_kst_now()
-    db.commit()
-    
-    return {"success": True, "message": f"{waiting.name}님의 웨이팅이 취소되었습니다."}
+    def cancel():
+        waiting = db.query(Waiting).filter(Waiting.id == waiting_id).first()
+        if not waiting:
+            raise HTTPException(status_code=404, detail="웨이팅을 찾을 수 없습니다.")
+
+        if waiting.status not in ["waiting", "called"]:
+            raise HTTPException(status_code=400, detail="대기 중이거나 호출된 웨이팅만 취소할 수 있습니다.")
+
+        waiting.status = "cancelled"
+        waiting.cancelled_at = get_kst_now()
+        db.commit()
+
+        return {"success": True, "message": f"{waiting.name}님의 웨이팅이 취소되었습니다."}
+
+    result = await run_db(cancel)
+    await publish_waiting_board(db, "waiting_cancelled", waiting_id)
+    return result
 
 if __name__ == "__main__":
     import uvicorn
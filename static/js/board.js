@@ -0,0 +1,270 @@
+// 주방/관리자 보드 실시간 갱신
+//
+// 페이지는 처음에 전체를 렌더링하고, 이후에는 WebSocket으로 받은 board_delta 이벤트의 행만
+// 교체/이동/제거합니다. 연결(재연결 포함) 직후에는 /admin/board/state에서 페이지가 가진
+// 버전 이후의 변경을 받아오고, 서버 이력에 없으면 스냅샷으로 목록 전체를 교체합니다.
+//
+// 마크업 약속 (templates/_board_rows.html 참고)
+//   [data-board]              보드 루트 (data-board-epoch, data-board-version)
+//   [data-board-section]      행 목록 (data-sort-order="asc|desc", data-limit)
+//   [data-row-key]            행 (data-sort로 정렬 위치 결정)
+//   [data-board-hide-empty]   해당 섹션이 비면 숨김
+//   [data-board-empty]        나열된 섹션이 모두 비면 표시
+//   [data-count-selector]     선택자에 맞는 행 수 표시
+//   [data-board-count]        서버가 보낸 counts 값 표시
+//   form[data-board-submit]   페이지 이동 없이 제출 (실패하면 일반 제출)
+(function() {
+    const root = document.querySelector('[data-board]');
+    if (!root) {
+        return;
+    }
+
+    const board = root.dataset.board;
+    let epoch = root.dataset.boardEpoch;
+    let version = parseInt(root.dataset.boardVersion, 10) || 0;
+    const token = root.dataset.boardToken;
+    let socket = null;
+    let reconnectDelay = 1000;
+    let pending = null;  // 따라잡는 동안 소켓으로 받은 변경 (끝난 뒤 순서대로 적용)
+    let catchUpRunning = null;  // 진행 중인 따라잡기 (한 번에 하나만 실행)
+    let catchUpQueued = null;  // 진행 중에 다시 요청된 따라잡기 (끝난 뒤 한 번만 더 실행)
+    let eventEpoch = null;  // 재연결 시 놓친 이벤트를 이어받기 위한 서버 이벤트 순번
+    let lastEventSeq = null;
+
+    function findAll(selector) {
+        const found = Array.from(root.querySelectorAll(selector));
+        return root.matches(selector) ? [root, ...found] : found;
+    }
+
+    function section(name) {
+        return findAll(`[data-board-section="${name}"]`)[0] || null;
+    }
+
+    function parseRow(html) {
+        const template = document.createElement('template');
+        template.innerHTML = html.trim();
+        return template.content.firstElementChild;
+    }
+
+    function sortValue(element) {
+        return parseFloat(element.dataset.sort) || 0;
+    }
+
+    function insertSorted(container, element) {
+        const descending = container.dataset.sortOrder === 'desc';
+        const value = sortValue(element);
+        const next = Array.from(container.children).find(child =>
+            descending ? sortValue(child) < value : sortValue(child) > value
+        );
+        container.insertBefore(element, next || null);
+
+        const limit = parseInt(container.dataset.limit, 10);
+        while (limit && container.children.length > limit) {
+            container.lastElementChild.remove();
+        }
+    }
+
+    function applyRow(row) {
+        const existing = findAll(`[data-row-key="${row.key}"]`)[0];
+        const container = row.section ? section(row.section) : null;
+        if (!container) {
+            if (existing) {
+                existing.remove();
+            }
+            return;
+        }
+
+        const element = parseRow(row.html);
+        if (existing && existing.parentElement === container && existing.dataset.sort === element.dataset.sort) {
+            existing.replaceWith(element);
+        } else {
+            if (existing) {
+                existing.remove();
+            }
+            insertSorted(container, element);
+        }
+    }
+
+    function applyCounts(counts) {
+        findAll('[data-board-count]').forEach(element => {
+            if (element.dataset.boardCount in counts) {
+                element.textContent = counts[element.dataset.boardCount];
+            }
+        });
+    }
+
+    function refresh() {
+        findAll('[data-board-hide-empty]').forEach(element => {
+            const container = section(element.dataset.boardHideEmpty);
+            element.classList.toggle('d-none', !container || container.children.length === 0);
+        });
+        findAll('[data-board-empty]').forEach(element => {
+            const empty = element.dataset.boardEmpty.split(' ').every(name => {
+                const container = section(name);
+                return !container || container.children.length === 0;
+            });
+            element.classList.toggle('d-none', !empty);
+        });
+        findAll('[data-board-section]').forEach(container => {
+            Array.from(container.children).forEach((row, index) => {
+                const position = row.querySelector('[data-board-position]');
+                if (position) {
+                    position.textContent = index + 1;
+                }
+            });
+        });
+        findAll('[data-count-selector]').forEach(element => {
+            element.textContent = root.querySelectorAll(element.dataset.countSelector).length;
+        });
+        root.dispatchEvent(new CustomEvent('board:updated'));
+    }
+
+    function applyDelta(delta) {
+        delta.rows.forEach(applyRow);
+        if (delta.counts) {
+            applyCounts(delta.counts);
+        }
+        // 다른 워커에서 온 변경은 그 워커의 버전이므로 이 페이지의 버전은 올리지 않음
+        if (delta.epoch === epoch && delta.version > version) {
+            version = delta.version;
+        }
+    }
+
+    function applySnapshot(state) {
+        Object.entries(state.snapshot.sections).forEach(([name, rows]) => {
+            const container = section(name);
+            if (container) {
+                container.replaceChildren(...rows.map(row => parseRow(row.html)));
+            }
+        });
+        if (state.snapshot.counts) {
+            applyCounts(state.snapshot.counts);
+        }
+        epoch = state.epoch;
+        version = state.version;
+    }
+
+    async function fetchAndApply() {
+        pending = [];
+        try {
+            const params = new URLSearchParams({ board: board, epoch: epoch, since: version });
+            const response = await fetch(`/admin/board/state?${params}`);
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+            const state = await response.json();
+            if (state.deltas) {
+                state.deltas.forEach(applyDelta);
+            } else {
+                applySnapshot(state);
+            }
+        } catch (error) {
+            console.error('Board catch-up failed:', error);
+        } finally {
+            const buffered = pending;
+            pending = null;
+            buffered.forEach(applyDelta);
+            refresh();
+        }
+    }
+
+    // 따라잡기는 겹치지 않게 하나씩 실행 (진행 중에 요청되면 그 뒤의 변경까지 받도록 끝난 뒤 한 번 더)
+    function catchUp() {
+        if (!catchUpRunning) {
+            catchUpRunning = fetchAndApply().finally(() => {
+                catchUpRunning = null;
+            });
+            return catchUpRunning;
+        }
+        if (!catchUpQueued) {
+            catchUpQueued = catchUpRunning.then(() => {
+                catchUpQueued = null;
+                return catchUp();
+            });
+        }
+        return catchUpQueued;
+    }
+
+    function connect() {
+        const wsProtocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
+        // 보드 채널은 관리자 소켓만 구독할 수 있어 페이지에 실린 토큰을 함께 보냄
+        const params = new URLSearchParams({ token: token });
+        if (lastEventSeq !== null) {
+            params.set('last_seq', lastEventSeq);
+            params.set('epoch', eventEpoch);
+        }
+        socket = new WebSocket(`${wsProtocol}//${window.location.host}/ws/0?${params}`);
+        window.websocketConnection = socket;
+
+        socket.onopen = function() {
+            reconnectDelay = 1000;
+            socket.send(JSON.stringify({ type: 'subscribe', channels: [board] }));
+        };
+
+        socket.onmessage = function(event) {
+            let data;
+            try {
+                data = JSON.parse(event.data);
+            } catch (error) {
+                return;
+            }
+
+            if (data.seq > lastEventSeq) {
+                lastEventSeq = data.seq;
+            }
+
+            if (data.type === 'subscribed') {
+                // 구독 이후의 변경은 소켓으로 오므로, 그 전까지 놓친 변경만 따라잡음
+                // (재연결이면 놓친 이벤트가 이미 재전송되어 보통 받을 것이 없음)
+                eventEpoch = data.epoch;
+                lastEventSeq = data.seq;
+                catchUp();
+            } else if (data.type === 'board_delta' && data.board === board) {
+                if (pending) {
+                    pending.push(data);
+                } else {
+                    applyDelta(data);
+                    refresh();
+                }
+            }
+            document.dispatchEvent(new CustomEvent('board:message', { detail: data }));
+        };
+
+        socket.onclose = function() {
+            setTimeout(connect, reconnectDelay);
+            reconnectDelay = Math.min(reconnectDelay * 2, 10000);
+        };
+    }
+
+    // 보드의 작업 버튼은 페이지를 다시 읽지 않고 제출 (결과는 board_delta로 반영됨)
+    document.addEventListener('submit', async function(event) {
+        const form = event.target;
+        if (!form.matches('[data-board-submit]')) {
+            return;
+        }
+        event.preventDefault();
+
+        try {
+            const response = await fetch(form.action, {
+                method: 'POST',
+                body: new FormData(form),
+                redirect: 'manual'
+            });
+            if (!response.ok && response.type !== 'opaqueredirect') {
+                throw new Error(`HTTP ${response.status}`);
+            }
+            const modal = form.closest('.modal');
+            if (modal) {
+                bootstrap.Modal.getInstance(modal)?.hide();
+            }
+            if (!socket || socket.readyState !== WebSocket.OPEN) {
+                catchUp();
+            }
+        } catch (error) {
+            // 오류 화면을 보여주던 기존 동작대로 일반 제출
+            form.submit();
+        }
+    });
+
+    connect();
+})();
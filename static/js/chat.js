@@ -3,6 +3,14 @@ let currentTableId = null;
 let websocket = null;
 let isConnected = false;
 
+// 재연결 시 놓친 이벤트를 이어받기 위한 서버 이벤트 순번
+let eventEpoch = null;
+let lastEventSeq = null;
+
+// 접속 중인 테이블 (presence 이벤트로 갱신)
+let onlineTables = new Map();  // table_id: nickname
+let presenceVersion = null;
+
 // 개인 메시지 관련 변수
 let isPrivateMode = false;
 let targetTableId = null;
@@ -16,9 +24,7 @@ let menuData = {};
 
 // 페이지 로드 시 초기화 (테이블 ID가 있는 경우)
 function initializeChat(tableId) {
-    console.log('initializeChat called with tableId:', tableId);
     currentTableId = parseInt(tableId);
-    console.log('currentTableId set to:', currentTableId);
     
     if (isNaN(currentTableId)) {
         console.error('Invalid table ID provided:', tableId);
@@ -51,8 +57,12 @@ function initializeChat(tableId) {
         });
     }
     
-    // 5초마다 온라인 사용자 목록 업데이트
-    setInterval(loadOnlineUsers, 5000);
+    // WebSocket이 끊긴 동안에만 5초마다 온라인 사용자 목록 확인 (바뀐 것이 없으면 304)
+    setInterval(function() {
+        if (!isConnected) {
+            loadOnlineUsers();
+        }
+    }, 5000);
 }
 
 // 테이블 입장 (테이블 ID가 없는 경우)
@@ -88,29 +98,33 @@ function connectWebSocket() {
     }
     
     const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-    const wsUrl = `${protocol}//${window.location.host}/ws/${currentTableId}`;
-    
-    console.log('Attempting WebSocket connection to:', wsUrl);
+    let wsUrl = `${protocol}//${window.location.host}/ws/${currentTableId}`;
+    if (lastEventSeq !== null) {
+        // 재연결: 마지막으로 받은 이벤트 이후만 다시 받음
+        wsUrl += `?last_seq=${lastEventSeq}&epoch=${encodeURIComponent(eventEpoch)}`;
+    }
     
     try {
         websocket = new WebSocket(wsUrl);
         
         websocket.onopen = function(event) {
             isConnected = true;
+            window.wsRetryCount = 0;
             updateConnectionStatus('connected');
-            console.log('WebSocket 연결 성공:', wsUrl);
-            
+
+            // 공개 채팅, 접속 상태, 우리 테이블(귓속말/선물) 채널 구독
+            websocket.send(JSON.stringify({
+                type: 'subscribe',
+                channels: ['chat.global', 'presence', `table.${currentTableId}`]
+            }));
+
             // 연결 성공 시 폴링 중지
-            if (window.messagePollingInterval) {
-                clearInterval(window.messagePollingInterval);
-                window.messagePollingInterval = null;
-            }
+            stopMessagePolling();
             
             // 하트비트 시작 (30초마다 ping)
             window.wsHeartbeat = setInterval(() => {
                 if (websocket.readyState === WebSocket.OPEN) {
                     websocket.send('ping');
-                    console.log('Sent heartbeat ping');
                 }
             }, 30000);
         };
@@ -118,20 +132,10 @@ function connectWebSocket() {
         websocket.onmessage = function(event) {
             try {
                 const data = JSON.parse(event.data);
-                console.log('WebSocket message received:', data);
-                
-                if (data.type === 'chat_message') {
-                    addMessageToChat(data);
-                } else if (data.type === 'gift_order') {
-                    handleGiftOrderNotification(data);
-                } else if (data.type === 'gift_announcement') {
-                    handleGiftAnnouncement(data);
-                }
+                handleServerEvent(data);
             } catch (error) {
                 // pong 응답 등 JSON이 아닌 메시지 처리
-                if (event.data === 'pong') {
-                    console.log('Received heartbeat pong');
-                } else {
+                if (event.data !== 'pong') {
                     console.error('Error parsing WebSocket message:', error, event.data);
                 }
             }
@@ -140,7 +144,6 @@ function connectWebSocket() {
         websocket.onclose = function(event) {
             isConnected = false;
             updateConnectionStatus('disconnected');
-            console.log('WebSocket 연결 끊어짐. Code:', event.code, 'Reason:', event.reason);
             
             // 하트비트 정리
             if (window.wsHeartbeat) {
@@ -151,14 +154,12 @@ function connectWebSocket() {
             // WebSocket 실패 시 폴링으로 대체
             startMessagePolling();
             
-            // 5초 후 재연결 시도 (최대 3번)
+            // 재연결은 놓친 이벤트만 받으므로 계속 시도 (5초부터 최대 30초 간격)
             if (!window.wsRetryCount) window.wsRetryCount = 0;
-            if (window.wsRetryCount < 3) {
-                window.wsRetryCount++;
-                console.log(`WebSocket 재연결 시도 ${window.wsRetryCount}/3`);
-                setTimeout(connectWebSocket, 5000);
-            } else {
-                console.log('WebSocket 재연결 포기. 폴링 모드로 전환.');
+            window.wsRetryCount++;
+            setTimeout(connectWebSocket, Math.min(5000 * window.wsRetryCount, 30000));
+            if (window.wsRetryCount > 3) {
+                // 그 사이에는 폴링으로 메시지를 받음
                 updateConnectionStatus('polling');
             }
         };
@@ -175,13 +176,56 @@ function connectWebSocket() {
     }
 }
 
+// WebSocket/이벤트 스트림으로 받은 서버 이벤트 처리
+function handleServerEvent(data) {
+    if (data.seq > lastEventSeq) {
+        lastEventSeq = data.seq;
+    }
+
+    if (data.type === 'subscribed') {
+        // 놓친 이벤트는 이 응답보다 먼저 도착하므로 여기부터 이어받으면 됨
+        eventEpoch = data.epoch;
+        lastEventSeq = data.seq;
+        // 연결이 끊긴 사이의 접속 상태 변경은 목록을 다시 받아 맞춤
+        loadOnlineUsers();
+    } else if (data.type === 'presence') {
+        applyPresence(data);
+    } else if (data.type === 'resync') {
+        // 서버에 남은 이력으로 따라잡을 수 없으면 최근 메시지를 다시 불러옴
+        loadRecentMessages();
+    } else if (data.type === 'chat_message') {
+        addMessageToChat(data);
+    } else if (data.type === 'gift_order') {
+        handleGiftOrderNotification(data);
+    } else if (data.type === 'gift_announcement') {
+        handleGiftAnnouncement(data);
+    }
+}
+
 // 메시지 폴링 시작 (WebSocket 대안)
+// 서버가 새 이벤트를 보낼 때만 응답하는 이벤트 스트림(SSE)을 사용하고,
+// EventSource를 지원하지 않는 브라우저에서만 주기적으로 조회
 function startMessagePolling() {
-    if (window.messagePollingInterval) {
+    if (window.messagePollingInterval || window.messageEventSource) {
         return; // 이미 폴링 중
     }
-    
-    console.log('Starting message polling as WebSocket fallback');
+
+    if (window.EventSource && currentTableId) {
+        let url = `/chat/events?table_id=${currentTableId}`;
+        if (lastEventSeq !== null) {
+            url += `&last_seq=${lastEventSeq}&epoch=${encodeURIComponent(eventEpoch)}`;
+        }
+        // 끊기면 브라우저가 Last-Event-ID로 이어서 다시 연결함
+        window.messageEventSource = new EventSource(url);
+        window.messageEventSource.onmessage = function(event) {
+            try {
+                handleServerEvent(JSON.parse(event.data));
+            } catch (error) {
+                console.error('Error parsing event stream message:', error, event.data);
+            }
+        };
+        return;
+    }
     
     let lastMessageId = 0;
     
@@ -207,6 +251,18 @@ function startMessagePolling() {
     }, 3000); // 3초마다 새 메시지 확인
 }
 
+// 메시지 폴링/이벤트 스트림 중지
+function stopMessagePolling() {
+    if (window.messageEventSource) {
+        window.messageEventSource.close();
+        window.messageEventSource = null;
+    }
+    if (window.messagePollingInterval) {
+        clearInterval(window.messagePollingInterval);
+        window.messagePollingInterval = null;
+    }
+}
+
 // 연결 상태 업데이트
 function updateConnectionStatus(status) {
     const statusElement = document.getElementById('chat-status');
@@ -241,14 +297,12 @@ async function loadRecentMessages() {
     try {
         const url = `/chat/messages?limit=30${currentTableId ? `&table_id=${currentTableId}` : ''}`;
         const response = await fetch(url);
-        console.log('Messages response status:', response.status);
         
         if (!response.ok) {
             throw new Error(`HTTP error! status: ${response.status}`);
         }
         
         const data = await response.json();
-        console.log('Messages response data:', data);
         
         const chatMessages = document.getElementById('chat-messages');
         if (!chatMessages) return;
@@ -282,9 +336,8 @@ async function loadRecentMessages() {
 // 온라인 사용자 로드
 async function loadOnlineUsers() {
     try {
-        console.log('Loading online users...');
+        // 서버가 ETag를 붙이므로 바뀐 것이 없으면 브라우저 캐시의 응답을 그대로 받음
         const response = await fetch('/chat/online-tables');
-        console.log('Online users response status:', response.status);
         
         if (!response.ok) {
             const errorText = await response.text();
@@ -293,63 +346,84 @@ async function loadOnlineUsers() {
         }
         
         const data = await response.json();
-        console.log('Online users response data:', data);
-        
-        const onlineList = document.getElementById('online-users-list');
-        const onlineCount = document.getElementById('online-count');
-        
-        // DOM 요소가 존재하지 않으면 리턴
-        if (!onlineList || !onlineCount) {
-            console.warn('Online users DOM elements not found');
-            return;
-        }
         
         // 응답 데이터 유효성 검사
         if (!data || !Array.isArray(data.online_tables)) {
             console.warn('Invalid response format:', data);
-            onlineList.innerHTML = '<div class="online-user">접속자 정보를 불러올 수 없습니다</div>';
-            onlineCount.textContent = '0명';
+            renderOnlineUsers(null);
             return;
         }
-        
-        if (data.online_tables.length === 0) {
-            onlineList.innerHTML = '<div class="online-user">아직 접속자가 없습니다</div>';
-            onlineCount.textContent = '0명';
-        } else {
-            // 자신을 제외한 온라인 테이블만 표시
-            const otherTables = data.online_tables.filter(table => table.table_id !== currentTableId);
-            
-            if (otherTables.length === 0) {
-                onlineList.innerHTML = '<div class="online-user">다른 접속자가 없습니다</div>';
-                onlineCount.textContent = '1명 (나만)';
-            } else {
-                onlineList.innerHTML = otherTables.map(table => 
-                    `<div class="online-user clickable" data-table-id="${table.table_id}" data-nickname="${table.nickname}">
-                        ${table.nickname || `테이블${table.table_id}`}
-                        <small class="text-muted ms-1">💬</small>
-                    </div>`
-                ).join('');
-                onlineCount.textContent = `${data.online_tables.length}명`;
-                
-                // 클릭 이벤트 리스너 추가
-                const clickableUsers = onlineList.querySelectorAll('.online-user.clickable');
-                clickableUsers.forEach(userEl => {
-                    userEl.addEventListener('click', function() {
-                        const tableId = parseInt(this.dataset.tableId);
-                        const nickname = this.dataset.nickname;
-                        startPrivateChat(tableId, nickname);
-                    });
-                });
-            }
-        }
+
+        onlineTables = new Map(data.online_tables.map(table => [table.table_id, table.nickname]));
+        presenceVersion = data.version;
+        renderOnlineUsers(onlineTables);
     } catch (error) {
         console.error('온라인 사용자 로드 오류:', error);
-        const onlineList = document.getElementById('online-users-list');
-        const onlineCount = document.getElementById('online-count');
-        if (onlineList && onlineCount) {
-            onlineList.innerHTML = '<div class="online-user">접속자 정보를 불러올 수 없습니다</div>';
-            onlineCount.textContent = '0명';
-        }
+        renderOnlineUsers(null);
+    }
+}
+
+// presence 이벤트(접속/퇴장/닉네임 변경)를 온라인 사용자 목록에 반영
+function applyPresence(data) {
+    if (presenceVersion === null || data.version !== presenceVersion + 1) {
+        // 중간 변경을 놓쳤으면 전체 목록을 다시 받음
+        loadOnlineUsers();
+        return;
+    }
+    data.online.forEach(table => onlineTables.set(table.table_id, table.nickname));
+    data.offline.forEach(tableId => onlineTables.delete(tableId));
+    presenceVersion = data.version;
+    renderOnlineUsers(onlineTables);
+}
+
+// 온라인 사용자 목록 표시 (tables가 null이면 오류 표시)
+function renderOnlineUsers(tables) {
+    const onlineList = document.getElementById('online-users-list');
+    const onlineCount = document.getElementById('online-count');
+    
+    // DOM 요소가 존재하지 않으면 리턴
+    if (!onlineList || !onlineCount) {
+        console.warn('Online users DOM elements not found');
+        return;
+    }
+
+    if (tables === null) {
+        onlineList.innerHTML = '<div class="online-user">접속자 정보를 불러올 수 없습니다</div>';
+        onlineCount.textContent = '0명';
+        return;
+    }
+    
+    if (tables.size === 0) {
+        onlineList.innerHTML = '<div class="online-user">아직 접속자가 없습니다</div>';
+        onlineCount.textContent = '0명';
+        return;
+    }
+
+    // 자신을 제외한 온라인 테이블만 표시
+    const otherTables = Array.from(tables, ([tableId, nickname]) => ({ table_id: tableId, nickname: nickname }))
+        .filter(table => table.table_id !== currentTableId);
+    
+    if (otherTables.length === 0) {
+        onlineList.innerHTML = '<div class="online-user">다른 접속자가 없습니다</div>';
+        onlineCount.textContent = '1명 (나만)';
+    } else {
+        onlineList.innerHTML = otherTables.map(table => 
+            `<div class="online-user clickable" data-table-id="${table.table_id}" data-nickname="${table.nickname}">
+                ${table.nickname || `테이블${table.table_id}`}
+                <small class="text-muted ms-1">💬</small>
+            </div>`
+        ).join('');
+        onlineCount.textContent = `${tables.size}명`;
+        
+        // 클릭 이벤트 리스너 추가
+        const clickableUsers = onlineList.querySelectorAll('.online-user.clickable');
+        clickableUsers.forEach(userEl => {
+            userEl.addEventListener('click', function() {
+                const tableId = parseInt(this.dataset.tableId);
+                const nickname = this.dataset.nickname;
+                startPrivateChat(tableId, nickname);
+            });
+        });
     }
 }
 
@@ -367,12 +441,6 @@ async function sendMessage() {
     const message = messageInput.value.trim();
     if (!message) return;
     
-    // 디버깅 로그 추가
-    console.log('Current table ID:', currentTableId);
-    console.log('Message:', message);
-    console.log('Is private mode:', isPrivateMode);
-    console.log('Target table ID:', targetTableId);
-    
     if (!currentTableId) {
         console.error('Table ID is not set');
         alert('테이블 ID가 설정되지 않았습니다. 페이지를 새로고침해주세요.');
@@ -391,20 +459,12 @@ async function sendMessage() {
             const nickname = nicknameInput.value.trim();
             if (nickname) {
                 formData.append('nickname', nickname);
-                console.log('Nickname:', nickname);
             }
         }
         
         // 개인 메시지인 경우 target_table_id 추가
         if (isPrivateMode && targetTableId) {
             formData.append('target_table_id', targetTableId.toString());
-            console.log('Target table ID:', targetTableId);
-        }
-        
-        // FormData 내용 로깅
-        console.log('FormData contents:');
-        for (let [key, value] of formData.entries()) {
-            console.log(key, value);
         }
         
         const response = await fetch('/chat/send', {
@@ -412,11 +472,11 @@ async function sendMessage() {
             body: formData
         });
         
-        console.log('Response status:', response.status);
-        
         if (response.ok) {
             messageInput.value = '';
-            loadOnlineUsers(); // 온라인 사용자 목록 업데이트
+            if (!isConnected) {
+                loadOnlineUsers(); // 온라인 사용자 목록 업데이트 (연결 중이면 presence 이벤트로 받음)
+            }
         } else {
             const errorText = await response.text();
             console.error('Error response:', errorText);
@@ -436,6 +496,11 @@ async function sendMessage() {
 function addMessageToChat(messageData, shouldScroll = true) {
     const chatMessages = document.getElementById('chat-messages');
     if (!chatMessages) return;
+
+    // 폴링과 재연결 재전송으로 같은 메시지가 두 번 올 수 있음
+    if (messageData.id && chatMessages.querySelector(`[data-message-id="${messageData.id}"]`)) {
+        return;
+    }
     
     // 로딩 메시지 제거
     const loadingElements = chatMessages.querySelectorAll('.loading');
@@ -450,6 +515,9 @@ function addMessageToChat(messageData, shouldScroll = true) {
         messageClass += ' private-message';
     }
     messageElement.className = messageClass;
+    if (messageData.id) {
+        messageElement.dataset.messageId = messageData.id;
+    }
     
     let headerText = '';
     let messagePrefix = '';
@@ -1104,7 +1172,6 @@ function startPrivateChat(tableId, nickname) {
     targetTableId = tableId;
     targetNickname = nickname;
     updateChatModeUI();
-    console.log('Private chat started with tableId:', tableId, 'and nickname:', nickname);
 }
 
 // 전체 채팅으로 돌아가기
@@ -1113,7 +1180,6 @@ function stopPrivateChat() {
     targetTableId = null;
     targetNickname = null;
     updateChatModeUI();
-    console.log('Switched back to public chat');
 }
 
 // 채팅 모드 UI 업데이트
@@ -1166,10 +1232,7 @@ window.addEventListener('beforeunload', function() {
         websocket.close();
     }
     
-    if (window.messagePollingInterval) {
-        clearInterval(window.messagePollingInterval);
-        window.messagePollingInterval = null;
-    }
+    stopMessagePolling();
     
     if (window.wsHeartbeat) {
         clearInterval(window.wsHeartbeat);
@@ -1179,10 +1242,7 @@ window.addEventListener('beforeunload', function() {
 
 // 페이지 로드 시 자동 초기화
 document.addEventListener('DOMContentLoaded', function() {
-    console.log('DOMContentLoaded event fired');
-    
     const container = document.getElementById('chat-container');
-    console.log('Chat container element:', container);
     
     if (!container) {
         console.error('Chat container element not found');
@@ -1193,23 +1253,15 @@ document.addEventListener('DOMContentLoaded', function() {
     setupEventListeners();
     
     const hasTableIdAttr = container.hasAttribute('data-table-id');
-    console.log('Has data-table-id attribute:', hasTableIdAttr);
-    
     if (hasTableIdAttr) {
         const tableId = container.getAttribute('data-table-id');
-        console.log('Table ID from data attribute:', tableId);
-        console.log('Table ID type:', typeof tableId);
-        console.log('Table ID length:', tableId ? tableId.length : 'N/A');
-        
         if (tableId && tableId.trim() !== '') {
-            console.log('Calling initializeChat with table ID:', tableId);
             // 테이블 ID가 있는 경우 채팅 초기화
             initializeChat(tableId);
         } else {
             console.error('data-table-id attribute exists but is empty');
         }
     } else {
-        console.log('No data-table-id attribute found, calling initializeTableInput');
         // 테이블 ID가 없는 경우 입력 폼 초기화
         initializeTableInput();
     }
@@ -1217,45 +1269,37 @@ document.addEventListener('DOMContentLoaded', function() {
 
 // 이벤트 리스너 설정
 function setupEventListeners() {
-    console.log('Setting up event listeners');
-    
     // 채팅 입장 버튼
     const joinChatBtn = document.getElementById('join-chat-btn');
     if (joinChatBtn) {
         joinChatBtn.addEventListener('click', joinChat);
-        console.log('Join chat button event listener added');
     }
     
     // 메시지 전송 버튼
     const sendButton = document.getElementById('send-button');
     if (sendButton) {
         sendButton.addEventListener('click', sendMessage);
-        console.log('Send message button event listener added');
     }
     
     // 주문 모달 토글 버튼
     const toggleOrderBtn = document.getElementById('toggle-order-btn');
     if (toggleOrderBtn) {
         toggleOrderBtn.addEventListener('click', toggleOrderModal);
-        console.log('Toggle order modal button event listener added');
     }
     
     // 모달 네비게이션 버튼들
     const prevBtn = document.getElementById('prev-btn');
     if (prevBtn) {
         prevBtn.addEventListener('click', previousStep);
-        console.log('Previous step button event listener added');
     }
     
     const nextBtn = document.getElementById('next-btn');
     if (nextBtn) {
         nextBtn.addEventListener('click', nextStep);
-        console.log('Next step button event listener added');
     }
     
     const submitBtn = document.getElementById('submit-btn');
     if (submitBtn) {
         submitBtn.addEventListener('click', submitGiftOrder);
-        console.log('Submit order button event listener added');
     }
 } 
\ No newline at end of file